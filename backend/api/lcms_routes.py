@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import Field, conint
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional
+from backend.api.peptide_retention_routes import PredictionOptions
+from backend.api.proteolytic_digestion_routes import ProteomeDigestRequest
+from backend.logic.lcms_map import LCMSMap
+
+router = APIRouter(prefix="/lcms", tags=["LC-MS Map"])
+
+MAX_CHARGE = 20
+
+
+class LCMSMapRequest(ProteomeDigestRequest, PredictionOptions):
+    # Fast mode by default: full mode embeds conformers for every unique peptide of the proteome.
+    mode: str = "fast"
+    min_length: int = Field(6, ge=1)
+    # Peptides are de-duplicated as fixed-width byte strings, so their length is bounded.
+    max_length: int = Field(40, ge=1, le=100)
+    charges: List[conint(ge=1, le=MAX_CHARGE)] = Field(
+        [1, 2, 3], min_items=1, description="Charge states to place features at"
+    )
+    mz_min: Optional[float] = Field(None, ge=0)
+    mz_max: Optional[float] = Field(None, ge=0)
+    raster: bool = Field(True, description="Also return an intensity density raster")
+    raster_rt_bins: int = Field(200, ge=1, le=2000)
+    raster_mz_bins: int = Field(200, ge=1, le=2000)
+    features: bool = Field(
+        True, description="Return the feature arrays (off for raster-only maps)"
+    )
+
+
+@router.post("/map", response_model=Dict[str, Any])
+async def build_map(body: LCMSMapRequest, request: Request) -> Any:
+    """
+    Digests a FASTA (or stored proteome), predicts the retention time of every unique peptide
+    and places it at each charge state's m/z. Returns the RT x m/z feature map as columnar
+    arrays, plus an optional density raster (rows are m/z bins, columns RT bins).
+    Prediction stops if the client disconnects.
+    """
+    mz_range = None
+    if body.mz_min is not None or body.mz_max is not None:
+        mz_range = (
+            body.mz_min or 0.0,
+            body.mz_max if body.mz_max is not None else float("inf"),
+        )
+        if mz_range[0] > mz_range[1]:
+            raise HTTPException(status_code=400, detail="mz_min must not exceed mz_max")
+
+    stop_event = threading.Event()
+
+    def build():
+        # Parsing and digesting the proteome run here too, off the event loop.
+        proteome = body.load_proteome()
+        digest = body.digest(proteome.sequences)
+        feature_map = LCMSMap.build(
+            digest, body.charges, mz_range, stop_event=stop_event, **body.as_kwargs()
+        )
+        raster = None
+        if body.raster:
+            raster = LCMSMap.raster(
+                feature_map, (body.raster_mz_bins, body.raster_rt_bins)
+            )
+            raster["values"] = raster["values"].round(6).tolist()
+        return proteome, digest, feature_map, raster
+
+    async def watch_disconnect():
+        while not stop_event.is_set():
+            if await request.is_disconnected():
+                stop_event.set()
+                return
+            await asyncio.sleep(0.5)
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        proteome, digest, feature_map, raster = await run_in_threadpool(build)
+    finally:
+        stop_event.set()
+        watcher.cancel()
+
+    result = {
+        "proteins": len(proteome),
+        "digest_peptides": len(digest),
+        "unique_peptides": len(feature_map.sequences),
+        "failed": feature_map.failed,
+        "count": len(feature_map),
+        "raster": raster,
+    }
+    if body.features:
+        result["sequences"] = feature_map.sequences
+        result["features"] = {
+            "peptide": feature_map.peptide.tolist(),
+            "charge": feature_map.charge.tolist(),
+            "rt": feature_map.rt.round(4).tolist(),
+            "mz": feature_map.mz.round(5).tolist(),
+            "intensity": feature_map.intensity.tolist(),
+        }
+    return result
@@ -1,37 +1,170 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import Any, Dict, List
+import asyncio
+import json
+import threading
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
 from backend.logic.peptide_retention import PeptideRetentionPredictor
+from backend.logic.peptide_retention_calibration import RetentionCalibration
 
 router = APIRouter(
     prefix="/pr",
     tags=["Peptide Retention Time Prediction"]
 )
 
-class SinglePeptideRequest(BaseModel):
+class FeatureOptions(BaseModel):
+    mode: str = "full"
+    num_conformers: int = Field(PeptideRetentionPredictor.DEFAULT_CONFORMERS, ge=1, le=100)
+    max_embed_attempts: int = Field(PeptideRetentionPredictor.DEFAULT_EMBED_ATTEMPTS, ge=0,
+                                    description="RDKit embedding attempts; 0 uses RDKit's default")
+    timeout: Optional[float] = Field(None, gt=0, description="Wall-clock limit per peptide, in seconds")
+
+    def as_kwargs(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "num_conformers": self.num_conformers,
+            "max_embed_attempts": self.max_embed_attempts,
+            "timeout": self.timeout,
+        }
+
+class PredictionOptions(FeatureOptions):
+    calibration: Optional[str] = Field(None, description="Name of a stored calibration to predict with")
+
+    def as_kwargs(self) -> Dict[str, Any]:
+        return {**super().as_kwargs(), "calibration": self.calibration}
+
+class SinglePeptideRequest(PredictionOptions):
     peptide: str
 
-class MultiplePeptidesRequest(BaseModel):
+class MultiplePeptidesRequest(PredictionOptions):
     peptides: List[str]
 
+class CalibrationPoint(BaseModel):
+    peptide: str
+    rt: float
+
+class CalibrationRequest(FeatureOptions):
+    name: str
+    points: List[CalibrationPoint]
+    robust: bool = False
+
+
+DISCONNECT_POLL = 0.5  # seconds between client disconnect checks while streaming
 
+
+async def _watch_disconnect(request: Request, stop_event: threading.Event) -> None:
+    while not stop_event.is_set():
+        if await request.is_disconnected():
+            stop_event.set()
+            return
+        await asyncio.sleep(DISCONNECT_POLL)
+
+
+# Plain defs: FastAPI runs them in its threadpool, so waiting on worker processes doesn't block the event loop.
 @router.post("/predict", response_model=Dict[str, Any])
-async def predict_single(body: SinglePeptideRequest) -> Any:
+def predict_single(body: SinglePeptideRequest) -> Any:
     peptide = body.peptide.strip()
 
     if not peptide:
         return {"error": "No valid peptide provided."}
 
-    result = PeptideRetentionPredictor.predict(peptide)
+    result = PeptideRetentionPredictor.predict(peptide, **body.as_kwargs())
     return result
 
 
 @router.post("/predict-multiple", response_model=List[Dict[str, Any]])
-async def predict_multiple(body: MultiplePeptidesRequest) -> Any:
+def predict_multiple(body: MultiplePeptidesRequest) -> Any:
     peptides = [p.strip() for p in body.peptides if p.strip()]
 
     if not peptides:
         return {"error": "No valid peptides provided."}
 
-    results = PeptideRetentionPredictor.predict_multiple(peptides)
+    results = PeptideRetentionPredictor.predict_multiple(peptides, **body.as_kwargs())
     return results
+
+
+@router.post("/predict-stream")
+async def predict_stream(body: MultiplePeptidesRequest, request: Request):
+    """
+    Same as /predict-multiple, but streamed as NDJSON: one line per peptide as it completes,
+    {"index", "completed", "total", "result"}, then a final {"done", "completed", "total"} line.
+    Work stops when the client disconnects.
+    """
+    peptides = [p.strip() for p in body.peptides if p.strip()]
+
+    if not peptides:
+        return {"error": "No valid peptides provided."}
+
+    async def lines():
+        stop_event = threading.Event()
+        results = PeptideRetentionPredictor.predict_stream(peptides, **body.as_kwargs(), stop_event=stop_event)
+        # Checked on a timer, not only between results, so a disconnect stops the workers
+        # even while a slow peptide is still running.
+        watcher = asyncio.ensure_future(_watch_disconnect(request, stop_event))
+        completed = 0
+        try:
+            async for index, result in iterate_in_threadpool(results):
+                if stop_event.is_set():
+                    break
+                completed += 1
+                yield json.dumps({"index": index, "completed": completed, "total": len(peptides), "result": result}) + "\n"
+            # A stopped run also ends the loop normally, without its remaining results.
+            if not stop_event.is_set():
+                yield json.dumps({"done": True, "completed": completed, "total": len(peptides)}) + "\n"
+        finally:
+            stop_event.set()
+            watcher.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/calibrations", response_model=Dict[str, Any])
+def create_calibration(body: CalibrationRequest) -> Any:
+    """
+    Fits the retention model to observed (peptide, RT) pairs and stores it under body.name.
+    """
+    points = [point for point in body.points if point.peptide.strip()]
+
+    if not points:
+        return {"error": "No valid peptides provided."}
+
+    try:
+        return PeptideRetentionPredictor.calibrate(
+            body.name,
+            [point.peptide.strip() for point in points],
+            [point.rt for point in points],
+            robust=body.robust,
+            **body.as_kwargs(),
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+@router.get("/calibrations", response_model=List[Dict[str, Any]])
+def list_calibrations() -> Any:
+    return RetentionCalibration.list()
+
+
+def _get_calibration(name: str) -> Dict[str, Any]:
+    try:
+        calibration = RetentionCalibration.load(name)
+    except ValueError:
+        calibration = None
+    if calibration is None:
+        raise HTTPException(status_code=404, detail="Calibration not found")
+    return calibration
+
+
+@router.get("/calibrations/{name}", response_model=Dict[str, Any])
+def get_calibration(name: str) -> Any:
+    return _get_calibration(name)
+
+
+@router.delete("/calibrations/{name}")
+def delete_calibration(name: str) -> Any:
+    _get_calibration(name)
+    RetentionCalibration.delete(name)
+    return {"deleted": name}
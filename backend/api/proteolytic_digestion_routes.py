@@ -1,14 +1,34 @@
-from typing import Any
-from fastapi import APIRouter, UploadFile
-from pydantic import BaseModel
+import json
+import math
+
+import numpy as np
+
+from typing import Any, List, Optional
+from fastapi import APIRouter, HTTPException, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from backend.logic.enzyme_digestion import CleavageRule, Digest, EnzymeDigestion
+from backend.logic.peptide_mass_index import PeptideMassIndex
+from backend.logic.peptide_protein_index import PeptideProteinIndex
+from backend.logic.protein_graph_rendering import ProteinGraphRenderer
+from backend.logic.proteome_store import Proteome, ProteomeStore
+from backend.logic.proteome_suffix_array import ProteomeSuffixArray
 from backend.logic.proteolytic_digestion_logic import ProteolyticDigestion
 
 router = APIRouter(prefix="/proteolytic_digestion", tags=["Proteolytic Digestion"])
 
 
 @router.post("/parse_fasta", response_model=list[Any])
-async def getProteinInfoFromFile(file: UploadFile) -> Any:
-    return ProteolyticDigestion.fileGetProteinInfo(file)
+async def getProteinInfoFromFile(file: UploadFile, response: Response) -> Any:
+    """
+    Parses the FASTA file. The ID of its digestion graph is returned in the X-Graph-Id header;
+    the image is served from /graph/{id}.
+    """
+    proteins = ProteolyticDigestion.fileGetProteinInfo(file)
+    names = [protein["name"] for protein in proteins if "sequence" in protein]
+    response.headers["X-Graph-Id"] = ProteolyticDigestion.updateGraph(names)
+    return proteins
 
 
 class ProteinRequest(BaseModel):
@@ -21,6 +41,436 @@ async def breakProteinIntoPeptides(req: ProteinRequest) -> Any:
     return ProteolyticDigestion.breakUpProtein(req.sequence, req.aminoAcid)
 
 
+class GraphRequest(BaseModel):
+    names: List[str] = []
+    seed: int = Field(0, description="Seed of the band colors")
+
+
+def _graph_response(graph_id: str, request: Request) -> Response:
+    # Graph IDs are content hashes of (names, seed, size), so the image never changes.
+    if not ProteinGraphRenderer.registered(graph_id):
+        raise HTTPException(status_code=404, detail="Graph not found or expired")
+    etag = f'"{graph_id}"'
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    png = ProteinGraphRenderer.image(graph_id)
+    if png is None:
+        raise HTTPException(status_code=404, detail="Graph not found or expired")
+    return Response(content=png, media_type="image/png", headers=headers)
+
+
+@router.post("/graph", response_model=dict[str, Any])
+def createGraph(req: GraphRequest) -> Any:
+    graph_id = ProteolyticDigestion.updateGraph(req.names, req.seed)
+    return {"graph_id": graph_id, "url": f"/proteolytic_digestion/graph/{graph_id}"}
+
+
+@router.get("/graph/{graph_id}")
+def getGraph(graph_id: str, request: Request):
+    return _graph_response(graph_id, request)
+
+
 @router.get("/resetProteinGraph")
-async def resetProteinGraph():
-    ProteolyticDigestion.updateGraph([])
+def resetProteinGraph(request: Request):
+    """
+    The empty graph, as an image.
+    """
+    return _graph_response(ProteolyticDigestion.updateGraph([]), request)
+
+
+class CustomRule(BaseModel):
+    residues: str = Field(
+        ..., min_length=1, description="Residues next to which the enzyme cleaves"
+    )
+    terminus: str = Field(
+        "C", regex="^[CN]$", description="'C': after the residue, 'N': before it"
+    )
+    exceptions: str = Field(
+        "", description="No cleavage if the residue across the bond is one of these"
+    )
+    p2_prime_exceptions: str = Field(
+        "",
+        description="No cleavage if the second residue after the bond is one of these",
+    )
+
+
+class DigestOptions(BaseModel):
+    enzymes: List[str] = ["trypsin"]
+    rules: List[CustomRule] = []
+    missed_cleavages: int = Field(0, ge=0, le=10)
+    min_length: int = Field(1, ge=1)
+    max_length: Optional[int] = Field(None, ge=1)
+    min_mass: Optional[float] = Field(None, ge=0)
+    max_mass: Optional[float] = Field(None, ge=0)
+
+    def digest(self, sequences: List[str]) -> Digest:
+        enzymes = self.enzymes + [
+            CleavageRule(
+                r.residues.upper(),
+                r.terminus,
+                r.exceptions.upper(),
+                r.p2_prime_exceptions.upper(),
+            )
+            for r in self.rules
+        ]
+        if not enzymes:
+            raise HTTPException(
+                status_code=400, detail="No enzymes or cleavage rules given"
+            )
+        try:
+            return EnzymeDigestion.digest(
+                sequences,
+                enzymes,
+                self.missed_cleavages,
+                self.min_length,
+                self.max_length,
+                self.min_mass,
+                self.max_mass,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+class DigestRequest(DigestOptions):
+    sequences: List[str]
+
+
+class ProteomeSource(BaseModel):
+    fasta: Optional[str] = Field(None, description="FASTA content")
+    proteome: Optional[str] = Field(None, description="Name of a stored proteome")
+
+    def load_proteome(self) -> Proteome:
+        if (self.fasta is None) == (self.proteome is None):
+            raise HTTPException(
+                status_code=400, detail="Give exactly one of 'fasta' or 'proteome'"
+            )
+        if self.fasta is not None:
+            return ProteomeStore.parse_fasta(self.fasta)
+        try:
+            proteome = ProteomeStore.load(self.proteome)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if proteome is None:
+            raise HTTPException(status_code=404, detail="Proteome not found")
+        return proteome
+
+
+class ProteomeDigestRequest(DigestOptions, ProteomeSource):
+    charges: List[int] = Field([1, 2, 3], description="Charge states to report m/z for")
+
+    def load_proteome(self) -> Proteome:
+        if not self.charges or any(z < 1 for z in self.charges):
+            raise HTTPException(
+                status_code=400, detail="Charge states must be positive integers"
+            )
+        return super().load_proteome()
+
+
+class MassQueryRequest(BaseModel):
+    mz: List[float] = Field(..., min_items=1, description="m/z values to look up")
+    tolerance: float = Field(10.0, gt=0)
+    unit: str = Field("ppm", regex="^(ppm|da)$")
+    charges: Optional[List[int]] = Field(
+        None, description="Charge states to consider; default: the index's"
+    )
+    limit: int = Field(
+        100, ge=0, le=10000, description="Matches returned per query (all are counted)"
+    )
+
+
+class SubstringSearchRequest(BaseModel):
+    peptides: List[str] = Field(
+        ..., min_items=1, max_items=100000, description="Peptides to locate"
+    )
+    mismatches: int = Field(0, ge=0, le=1, description="Substitutions allowed (0 or 1)")
+    limit: int = Field(
+        100,
+        ge=0,
+        le=10000,
+        description="Occurrences returned per peptide (all are counted)",
+    )
+
+
+class PeptideLookupRequest(BaseModel):
+    peptides: List[str] = Field(
+        ..., min_items=1, max_items=100000, description="Peptides to look up"
+    )
+
+
+@router.get("/enzymes", response_model=dict[str, Any])
+def listEnzymes() -> Any:
+    return {
+        name: [rule.__dict__ for rule in rules]
+        for name, rules in EnzymeDigestion.ENZYMES.items()
+    }
+
+
+@router.post("/digest", response_model=list[Any])
+def digestProteins(req: DigestRequest) -> Any:
+    digest = req.digest(req.sequences)
+    positions = digest.position().tolist()
+    return [
+        {
+            "protein": protein,
+            "position": position,
+            "sequence": peptide,
+            "missed_cleavages": missed,
+            "mass": None if math.isnan(mass) else round(mass, 5),
+        }
+        for protein, position, peptide, missed, mass in zip(
+            digest.protein.tolist(),
+            positions,
+            digest.peptides(),
+            digest.missed_cleavages.tolist(),
+            digest.mass.tolist(),
+        )
+    ]
+
+
+DIGEST_STREAM_BATCH = 5000
+
+
+@router.post("/digest-proteome")
+async def digestProteome(req: ProteomeDigestRequest, request: Request):
+    """
+    Digests a whole FASTA (or a stored proteome) and streams the peptides as NDJSON:
+    a {"proteins", "peptides", "charges"} header line, one line per peptide with its protein
+    of origin, 1-based position, monoisotopic mass and m/z per charge state, then {"done", "count"}.
+    """
+    # Parsing and digesting a proteome takes seconds; keep them off the event loop too.
+    proteome = await run_in_threadpool(req.load_proteome)
+    digest = await run_in_threadpool(req.digest, proteome.sequences)
+    charges = list(req.charges)
+
+    def batches():
+        # Numbers for a batch are computed as arrays and formatted through one %-template,
+        # which is several times faster than json.dumps per peptide.
+        accessions = [json.dumps(accession) for accession in proteome.accessions]
+        plain = bool(
+            np.all(
+                (digest.sequence > 0x20)
+                & (digest.sequence < 0x7F)
+                & (digest.sequence != ord('"'))
+                & (digest.sequence != ord("\\"))
+            )
+        )
+        template = (
+            '{"protein":%s,"protein_index":%d,"position":%d,"sequence":'
+            + ('"%s"' if plain else "%s")
+            + ',"missed_cleavages":%d,"mass":%.5f,"mz":{'
+            + ",".join(f'"{z}":%.5f' for z in charges)
+            + "}}"
+        )
+        peptides = digest.peptides() if plain else map(json.dumps, digest.peptides())
+        positions = digest.position()
+        for first in range(0, len(digest), DIGEST_STREAM_BATCH):
+            batch = slice(first, first + DIGEST_STREAM_BATCH)
+            mass = digest.mass[batch]
+            mz = EnzymeDigestion.mz(mass, charges).tolist()
+            lines = []
+            for protein, position, missed, peptide_mass, peptide_mz in zip(
+                digest.protein[batch].tolist(),
+                positions[batch].tolist(),
+                digest.missed_cleavages[batch].tolist(),
+                mass.tolist(),
+                mz,
+            ):
+                peptide = next(peptides)
+                if math.isnan(peptide_mass):
+                    # Contains a residue of unknown mass.
+                    lines.append(
+                        json.dumps(
+                            {
+                                "protein": proteome.accessions[protein],
+                                "protein_index": protein,
+                                "position": position,
+                                "sequence": peptide if plain else json.loads(peptide),
+                                "missed_cleavages": missed,
+                                "mass": None,
+                                "mz": None,
+                            },
+                            separators=(",", ":"),
+                        )
+                    )
+                else:
+                    lines.append(
+                        template
+                        % (
+                            accessions[protein],
+                            protein,
+                            position,
+                            peptide,
+                            missed,
+                            peptide_mass,
+                            *peptide_mz,
+                        )
+                    )
+            yield "\n".join(lines) + "\n"
+
+    async def lines():
+        yield (
+            json.dumps(
+                {"proteins": len(proteome), "peptides": len(digest), "charges": charges}
+            )
+            + "\n"
+        )
+        async for chunk in iterate_in_threadpool(batches()):
+            if await request.is_disconnected():
+                return
+            yield chunk
+        yield json.dumps({"done": True, "count": len(digest)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/mass-index", response_model=dict[str, Any])
+def buildMassIndex(req: ProteomeDigestRequest) -> Any:
+    """
+    Digests a FASTA or stored proteome and indexes its peptides by mass for /query.
+    Identical requests reuse the same index.
+    """
+    proteome = req.load_proteome()
+    # Re-uploading a stored proteome must not hit an index of its old content.
+    version = ProteomeStore.modified(req.proteome) if req.proteome is not None else None
+    index_id, index = PeptideMassIndex.build(
+        (req.dict(), version),
+        lambda: PeptideMassIndex(
+            req.digest(proteome.sequences), proteome.accessions, req.charges
+        ),
+    )
+    return {
+        "index_id": index_id,
+        "proteins": len(proteome),
+        "peptides": len(index),
+        "charges": list(index.charges),
+    }
+
+
+@router.post("/mass-index/{index_id}/query", response_model=list[Any])
+def queryMassIndex(index_id: str, req: MassQueryRequest) -> Any:
+    """
+    Peptides within the tolerance of each m/z, for single or batch lookups.
+    """
+    index = PeptideMassIndex.get(index_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Mass index not found or expired")
+    if req.charges is not None and any(z < 1 for z in req.charges):
+        raise HTTPException(
+            status_code=400, detail="Charge states must be positive integers"
+        )
+    return index.search(req.mz, req.tolerance, req.unit, req.charges, req.limit)
+
+
+@router.post("/peptide-index", response_model=dict[str, Any])
+def buildPeptideIndex(req: ProteomeDigestRequest) -> Any:
+    """
+    Digests a FASTA or stored proteome and indexes which proteins each peptide occurs in.
+    Identical requests reuse the same index.
+    """
+    proteome = req.load_proteome()
+    version = ProteomeStore.modified(req.proteome) if req.proteome is not None else None
+    options = req.dict(exclude={"charges"})
+    index_id, index = PeptideProteinIndex.build(
+        (options, version),
+        lambda: PeptideProteinIndex(
+            req.digest(proteome.sequences), proteome.accessions
+        ),
+    )
+    return {"index_id": index_id, **index.stats()}
+
+
+def _peptide_index(index_id: str) -> PeptideProteinIndex:
+    index = PeptideProteinIndex.get(index_id)
+    if index is None:
+        raise HTTPException(
+            status_code=404, detail="Peptide index not found or expired"
+        )
+    return index
+
+
+@router.get(
+    "/peptide-index/{index_id}/peptides/{peptide}", response_model=dict[str, Any]
+)
+def describePeptide(index_id: str, peptide: str) -> Any:
+    """
+    Proteins containing the peptide, and whether it is proteotypic (found in exactly one).
+    """
+    return _peptide_index(index_id).describe([peptide])[0]
+
+
+@router.post("/peptide-index/{index_id}/lookup", response_model=list[Any])
+def lookupPeptides(index_id: str, req: PeptideLookupRequest) -> Any:
+    return _peptide_index(index_id).describe(req.peptides)
+
+
+@router.get(
+    "/peptide-index/{index_id}/proteins/{accession}/unique-peptides",
+    response_model=dict[str, Any],
+)
+def proteinUniquePeptides(index_id: str, accession: str) -> Any:
+    """
+    Peptides of the digest found in this protein and no other.
+    """
+    index = _peptide_index(index_id)
+    protein = index.protein_index(accession)
+    if protein is None:
+        raise HTTPException(status_code=404, detail="Protein not found in the index")
+    peptides = index.unique_peptides(protein)
+    return {"protein": accession, "count": len(peptides), "peptides": peptides}
+
+
+@router.post("/suffix-array", response_model=dict[str, Any])
+def buildSuffixArray(req: ProteomeSource) -> Any:
+    """
+    Indexes every substring of a FASTA or stored proteome for /search. The array is cached
+    per proteome: the same content (or stored version) reuses it.
+    """
+    proteome = req.load_proteome()
+    if req.fasta is not None:
+        source = ("fasta", req.fasta)
+    else:
+        source = ("proteome", req.proteome, ProteomeStore.modified(req.proteome))
+    index_id = ProteomeSuffixArray.build(source, lambda: ProteomeSuffixArray(proteome))
+    residues = sum(len(sequence) for sequence in proteome.sequences)
+    return {"index_id": index_id, "proteins": len(proteome), "residues": residues}
+
+
+@router.post("/suffix-array/{index_id}/search", response_model=list[Any])
+def searchSuffixArray(index_id: str, req: SubstringSearchRequest) -> Any:
+    """
+    Every protein and 1-based position at which each peptide occurs, exactly or with one
+    substituted residue.
+    """
+    index = ProteomeSuffixArray.get(index_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Suffix array not found or expired")
+    try:
+        return index.search(req.peptides, req.mismatches, req.limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/proteomes", response_model=list[Any])
+def listProteomes() -> Any:
+    return ProteomeStore.list()
+
+
+@router.put("/proteomes/{name}", response_model=dict[str, Any])
+async def uploadProteome(name: str, file: UploadFile) -> Any:
+    content = (await file.read()).decode("utf-8")
+    try:
+        return ProteomeStore.save(name, content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/proteomes/{name}")
+def deleteProteome(name: str) -> Any:
+    try:
+        deleted = ProteomeStore.delete(name)
+    except ValueError:
+        deleted = False
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Proteome not found")
+    return {"deleted": name}
@@ -1,6 +1,16 @@
-from typing import List, Dict, Any
-from fastapi import APIRouter, UploadFile, File
+import asyncio
+import math
+
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import Response
 from backend.logic.two_de_simulation import Simulation_2de
+from backend.logic.two_de_rendering import GelDensityRenderer
+from backend.logic.two_de_spatial_index import GelSpatialIndex
+from backend.logic.two_de_ipg import IPGFocusing
+from backend.logic.two_de_comigration import CoMigrationDetector
+from backend.logic.two_de_tiles import GelTilePyramid
+from backend.logic.two_de_session import TwoDESession, TwoDESessionStore
 
 
 router = APIRouter(
@@ -10,30 +20,302 @@ router = APIRouter(
 
 
 @router.post("/parse-fasta")
-async def parse_fasta(files: List[UploadFile] = File(...)):
+async def parse_fasta(response: Response, files: List[UploadFile] = File(...)):
+    """
+    Parses the uploaded FASTA files into 2DE proteins. The proteins are also kept in a
+    server-side session whose ID is returned in the X-Session-Id header.
+    """
     new_proteins = []
+    contents = [(await file.read()).decode("utf-8") for file in files]
+
+    # Files are analyzed concurrently in worker processes; gather keeps upload order,
+    # so colors are assigned exactly as when the files were parsed one after another.
+    loop = asyncio.get_running_loop()
+    pool = Simulation_2de.get_parse_pool()
+    parsed = await asyncio.gather(*(
+        loop.run_in_executor(pool, Simulation_2de.parse_fasta_content, content) for content in contents
+    ))
 
-    for _, file in enumerate(files):
-        content = await file.read()
-        sequences = Simulation_2de.parse_fasta_content(content.decode("utf-8"))
-        Simulation_2de.parse_fasta(sequences,new_proteins)
-        
+    for sequences in parsed:
+        Simulation_2de.parse_fasta(sequences, new_proteins)
+
+    response.headers["X-Session-Id"] = TwoDESessionStore.create(new_proteins)
     return new_proteins
 
 
-@router.post("/simulate-ief")
-async def run_ief_simulation(data: Dict[str, Any]):
-    proteins = data.get("proteins", [])
+MAX_CANVAS = 16384
+MAX_SIGMA = 50.0
+
+
+def _positive(data: Dict[str, Any], key: str, default: float, maximum: Optional[float] = None) -> float:
+    """
+    data[key] (or the default) as a finite number above 0 and at most maximum; 400 otherwise.
+    """
+    value = data.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0 \
+            or (maximum is not None and value > maximum):
+        bound = f" and at most {maximum:g}" if maximum is not None else ""
+        raise HTTPException(status_code=400, detail=f"{key} must be a number above 0{bound}")
+    return value
+
+
+def _count(data: Dict[str, Any], key: str, default: Optional[int], minimum: int = 1,
+           maximum: Optional[int] = None) -> Optional[int]:
+    """
+    data[key] (or the default) as an integer in [minimum, maximum]; 400 otherwise.
+    An absent key with a None default stays None.
+    """
+    value = data.get(key, default)
+    if value is None and default is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum \
+            or (maximum is not None and value > maximum):
+        bound = f" and at most {maximum}" if maximum is not None else ""
+        raise HTTPException(status_code=400, detail=f"{key} must be an integer of at least {minimum}{bound}")
+    return value
+
+
+def _simulate_ief(proteins: List[Dict[str, Any]], data: Dict[str, Any]):
     ph_range = data.get("phRange", {"min": 0, "max": 14})
-    canvas_width = data.get("canvasWidth", 800)
-    canvas_height = data.get("canvasHeight", 600)
-    return Simulation_2de.simulate_ief(proteins, ph_range, canvas_width, canvas_height)
+    canvas_width = _positive(data, "canvasWidth", 800, MAX_CANVAS)
+    canvas_height = _positive(data, "canvasHeight", 600, MAX_CANVAS)
+    steps = _count(data, "steps", 25)
+    seed = _count(data, "seed", None, minimum=0)
+    mode = data.get("mode", "heuristic")
 
+    if mode == "ipg":
+        voltage = _positive(data, "voltage", 1.0)
+        duration = _positive(data, "duration", 1.0)
+        try:
+            return IPGFocusing.simulate(
+                proteins,
+                ph_range,
+                canvas_width,
+                canvas_height,
+                steps=steps,
+                seed=seed,
+                gradient=data.get("gradient", "linear"),
+                voltage=voltage,
+                duration=duration,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    if mode != "heuristic":
+        raise HTTPException(status_code=400, detail=f"Unknown IEF mode: {mode}")
 
-@router.post("/simulate-sds")
-async def run_sds_simulation(data: Dict[str, Any]):
-    proteins = data.get("proteins", [])
+    return Simulation_2de.simulate_ief(proteins, ph_range, canvas_width, canvas_height, steps=steps, seed=seed)
+
+
+def _simulate_sds(proteins: List[Dict[str, Any]], data: Dict[str, Any]):
     y_axis_mode = data.get("yAxisMode", "mw")
     acrylamide_percentage = data.get("acrylamidePercentage", 7.5)
     canvas_height = data.get("canvasHeight", 600)
     return Simulation_2de.simulate_sds(proteins, y_axis_mode, acrylamide_percentage, canvas_height)
+
+
+@router.post("/simulate-ief")
+async def run_ief_simulation(data: Dict[str, Any]):
+    return _simulate_ief(data.get("proteins", []), data)
+
+
+@router.post("/simulate-sds")
+async def run_sds_simulation(data: Dict[str, Any]):
+    return _simulate_sds(data.get("proteins", []), data)
+
+
+def _get_session(session_id: str) -> TwoDESession:
+    session = TwoDESessionStore.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="2DE session not found or expired")
+    return session
+
+
+@router.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    return TwoDESessionStore.describe(_get_session(session_id))
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not TwoDESessionStore.delete(session_id):
+        raise HTTPException(status_code=404, detail="2DE session not found or expired")
+    return {"deleted": session_id}
+
+
+@router.post("/sessions/{session_id}/simulate-ief")
+async def run_session_ief_simulation(session_id: str, data: Dict[str, Any]):
+    """
+    Same parameters as /simulate-ief, run on the session's proteins. Frames leave out the
+    proteins' sequences. The final frame is kept for a later /simulate-sds on the session.
+    """
+    session = _get_session(session_id)
+    frames = _simulate_ief(TwoDESessionStore.frame_proteins(session), data)
+    if isinstance(frames, list) and frames:
+        session.ief_final = frames[-1]
+    return frames
+
+
+@router.post("/sessions/{session_id}/simulate-sds")
+async def run_session_sds_simulation(session_id: str, data: Dict[str, Any]):
+    """
+    Same parameters as /simulate-sds, run on the final IEF positions of the session.
+    """
+    session = _get_session(session_id)
+    if session.ief_final is None:
+        raise HTTPException(status_code=409, detail="Run IEF on this session before SDS")
+    return _simulate_sds(session.ief_final, data)
+
+
+# A plain def: binning, blurring and encoding a large gel would otherwise block the event loop.
+@router.post("/render-density")
+def render_density(data: Dict[str, Any]):
+    """
+    Renders the finished gel as a spot density image (format "png"/"webp")
+    or as a downsampled intensity matrix (format "matrix").
+    """
+    proteins = data.get("proteins", [])
+    ph_range = data.get("phRange", {"min": 0, "max": 14})
+    canvas_width = _positive(data, "canvasWidth", 800, MAX_CANVAS)
+    canvas_height = _positive(data, "canvasHeight", 600, MAX_CANVAS)
+    scale = _positive(data, "scale", 1.0)
+    sigma_x = _positive(data, "sigmaX", 3.0, MAX_SIGMA)
+    sigma_y = _positive(data, "sigmaY", 3.0, MAX_SIGMA)
+    gamma = _positive(data, "gamma", 0.5)
+    downsample = _count(data, "downsample", 4)
+    output_format = data.get("format", "png")
+
+    if output_format not in GelDensityRenderer.IMAGE_FORMATS and output_format != "matrix":
+        return {"error": f"Unsupported format: {output_format}"}
+    if canvas_width * scale * canvas_height * scale > GelDensityRenderer.MAX_PIXELS:
+        raise HTTPException(status_code=400,
+                            detail=f"The rendered gel must have at most {GelDensityRenderer.MAX_PIXELS} pixels")
+
+    density, _ = GelDensityRenderer.render_gel(
+        proteins,
+        ph_range,
+        canvas_width,
+        canvas_height,
+        acrylamide_percentage=data.get("acrylamidePercentage", 7.5),
+        y_axis_mode=data.get("yAxisMode", "mw"),
+        sigma_x=sigma_x,
+        sigma_y=sigma_y,
+        scale=scale,
+    )
+
+    if output_format == "matrix":
+        matrix = GelDensityRenderer.downsample(density, downsample)
+        return {"rows": matrix.shape[0], "cols": matrix.shape[1], "max": float(matrix.max(initial=0.0)), "matrix": matrix.tolist()}
+
+    return Response(
+        content=GelDensityRenderer.to_image_bytes(density, output_format, gamma=gamma),
+        media_type=f"image/{output_format}",
+    )
+
+
+def _get_spatial_index(index_id: str) -> GelSpatialIndex:
+    index = GelSpatialIndex.get(index_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Spatial index not found or expired")
+    return index
+
+
+@router.post("/spatial-index")
+async def build_spatial_index(data: Dict[str, Any]):
+    """
+    Indexes the final spot positions of a gel for hit-testing and region queries.
+    """
+    proteins = data.get("proteins", [])
+    index_id = GelSpatialIndex.build_for_gel(
+        proteins,
+        data.get("phRange", {"min": 0, "max": 14}),
+        data.get("canvasWidth", 800),
+        data.get("canvasHeight", 600),
+        acrylamide_percentage=data.get("acrylamidePercentage", 7.5),
+        y_axis_mode=data.get("yAxisMode", "mw"),
+    )
+    return {"indexId": index_id, "count": len(proteins)}
+
+
+@router.get("/spatial-index/{index_id}/nearest")
+async def nearest_spots(index_id: str, x: float, y: float, k: int = 1, maxDistance: Optional[float] = None):
+    index = _get_spatial_index(index_id)
+    return index.spots_for(index.nearest(x, y, k, maxDistance))
+
+
+@router.get("/spatial-index/{index_id}/radius")
+async def spots_in_radius(index_id: str, x: float, y: float, r: float):
+    index = _get_spatial_index(index_id)
+    return index.spots_for(index.radius(x, y, r))
+
+
+@router.get("/spatial-index/{index_id}/rect")
+async def spots_in_rect(index_id: str, x0: float, y0: float, x1: float, y1: float):
+    index = _get_spatial_index(index_id)
+    return index.spots_for(index.rect(x0, y0, x1, y1))
+
+
+@router.post("/co-migration")
+async def find_co_migration(data: Dict[str, Any]):
+    """
+    Groups proteins whose final spots overlap into co-migration clusters.
+    """
+    return CoMigrationDetector.find_clusters(
+        data.get("proteins", []),
+        data.get("phRange", {"min": 0, "max": 14}),
+        data.get("canvasWidth", 800),
+        data.get("canvasHeight", 600),
+        acrylamide_percentage=data.get("acrylamidePercentage", 7.5),
+        y_axis_mode=data.get("yAxisMode", "mw"),
+        band_width=data.get("bandWidth", CoMigrationDetector.DEFAULT_BAND_WIDTH),
+        spot_height=data.get("spotHeight", CoMigrationDetector.DEFAULT_SPOT_HEIGHT),
+    )
+
+
+@router.post("/tiles")
+def build_tile_pyramid(data: Dict[str, Any]):
+    """
+    Registers a deep-zoom tile pyramid for the finished gel. Tiles are rendered lazily.
+    """
+    pyramid_id, pyramid = GelTilePyramid.build_for_gel(
+        data.get("proteins", []),
+        data.get("phRange", {"min": 0, "max": 14}),
+        _positive(data, "canvasWidth", 800, MAX_CANVAS),
+        _positive(data, "canvasHeight", 600, MAX_CANVAS),
+        acrylamide_percentage=data.get("acrylamidePercentage", 7.5),
+        y_axis_mode=data.get("yAxisMode", "mw"),
+        sigma_x=_positive(data, "sigmaX", 3.0, MAX_SIGMA),
+        sigma_y=_positive(data, "sigmaY", 3.0, MAX_SIGMA),
+    )
+    return {
+        "pyramidId": pyramid_id,
+        "tileUrl": f"/2d/tiles/{pyramid_id}/{{level}}/{{col}}_{{row}}.{{format}}",
+        **pyramid.describe(),
+    }
+
+
+@router.get("/tiles/{pyramid_id}/{level}/{tile_name}")
+def get_tile(pyramid_id: str, level: int, tile_name: str, request: Request):
+    pyramid = GelTilePyramid.get(pyramid_id)
+    if pyramid is None:
+        raise HTTPException(status_code=404, detail="Tile pyramid not found or expired")
+
+    try:
+        coords, fmt = tile_name.rsplit(".", 1)
+        col, row = (int(part) for part in coords.split("_"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Tile name must look like {col}_{row}.{format}")
+    if fmt not in GelDensityRenderer.IMAGE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Tile format must be one of {', '.join(GelDensityRenderer.IMAGE_FORMATS)}")
+    if not pyramid.contains(level, col, row):
+        raise HTTPException(status_code=404, detail="Tile not found")
+
+    # Pyramid IDs are content hashes, so a tile's bytes never change once rendered.
+    etag = f'"{pyramid_id}-{level}-{col}-{row}-{fmt}"'
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    tile = pyramid.tile(level, col, row, fmt)
+    if tile is None:
+        raise HTTPException(status_code=404, detail="Tile not found")
+    return Response(content=tile, media_type=f"image/{fmt}", headers=headers)
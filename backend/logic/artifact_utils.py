@@ -1,10 +1,14 @@
-import fitz
 import json
 import time
 import shutil
 
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont
+from backend.utility.lazy_import import lazy_import
+
+fitz = lazy_import("fitz")
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+ImageFont = lazy_import("PIL.ImageFont")
 
 
 PREVIEW_SIZE = (400, 300)
@@ -5,10 +5,12 @@ import base64
 from pathlib import Path
 from typing import Optional
 
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
+from backend.utility.lazy_import import lazy_import
+
+backends = lazy_import("cryptography.hazmat.backends")
+serialization = lazy_import("cryptography.hazmat.primitives.serialization")
+rsa = lazy_import("cryptography.hazmat.primitives.asymmetric.rsa")
+padding = lazy_import("cryptography.hazmat.primitives.asymmetric.padding")
 
 
 class AuthService:
@@ -26,7 +28,7 @@ class AuthService:
 
 
     @classmethod
-    def _get_private_key(cls) -> RSAPrivateKey:
+    def _get_private_key(cls) -> "rsa.RSAPrivateKey":
         cls._ensure_data_dir()
         
         if cls.PRIVATE_KEY_FILE.exists():
@@ -34,9 +36,9 @@ class AuthService:
                 private_key = serialization.load_pem_private_key(
                     f.read(),
                     password=None,
-                    backend=default_backend()
+                    backend=backends.default_backend()
                 )
-                if not isinstance(private_key, RSAPrivateKey):
+                if not isinstance(private_key, rsa.RSAPrivateKey):
                     raise TypeError("Loaded key is not an RSA private key")
                 
                 return private_key
@@ -44,7 +46,7 @@ class AuthService:
         private_key = rsa.generate_private_key(
             public_exponent=65537,
             key_size=2048,
-            backend=default_backend()
+            backend=backends.default_backend()
         )
         
         with open(cls.PRIVATE_KEY_FILE, "wb") as f:
@@ -0,0 +1,295 @@
+import numpy as np
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+@dataclass(frozen=True)
+class CleavageRule:
+    """
+    Cleave next to any of `residues` on the given side ('C': after the residue, 'N': before it),
+    unless the residue across the bond is one of `exceptions`, or the second residue after the
+    bond (P2') is one of `p2_prime_exceptions`.
+    """
+
+    residues: str
+    terminus: str = "C"
+    exceptions: str = ""
+    p2_prime_exceptions: str = ""
+
+
+@dataclass
+class Digest:
+    """
+    Peptides of a digest as parallel arrays over the encoded, concatenated proteins:
+    peptide i is residues [start[i], end[i]) of protein protein[i] (offsets within the
+    concatenation, see `position`).
+    """
+
+    sequence: np.ndarray  # uint8, all proteins concatenated
+    protein_offsets: np.ndarray  # int64 (n_proteins + 1)
+    protein: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    missed_cleavages: np.ndarray
+    mass: np.ndarray  # monoisotopic [M], NaN if it contains an unknown residue
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def position(self) -> np.ndarray:
+        """
+        1-based start position of each peptide within its protein.
+        """
+        return self.start - self.protein_offsets[self.protein] + 1
+
+    def peptide(self, i: int) -> str:
+        return self.sequence[self.start[i] : self.end[i]].tobytes().decode("ascii")
+
+    def peptides(self) -> Iterator[str]:
+        data = self.sequence.tobytes()
+        for start, end in zip(self.start.tolist(), self.end.tolist()):
+            yield data[start:end].decode("ascii")
+
+    def unique_peptides(self) -> List[str]:
+        return sorted(set(self.peptides()))
+
+
+class EnzymeDigestion:
+    """
+    In-silico digestion with configurable cleavage rules.
+
+    All proteins are concatenated into one uint8 array and cleavage sites are found with
+    256-entry lookup tables over neighbouring residues, so a whole proteome is one set of
+    vectorized comparisons. Peptides with up to N missed cleavages are pairs of site
+    boundaries k apart (k = 1..N+1) that do not cross a protein end; masses come from a
+    prefix sum of residue masses.
+    """
+
+    # Cleavage specificities as in ExPASy PeptideCutter.
+    ENZYMES: Dict[str, Tuple[CleavageRule, ...]] = {
+        "trypsin": (CleavageRule("KR", "C", "P"),),
+        "trypsin/p": (CleavageRule("KR", "C"),),
+        "lys-c": (CleavageRule("K", "C"),),
+        "lys-n": (CleavageRule("K", "N"),),
+        "arg-c": (CleavageRule("R", "C", "P"),),
+        "glu-c": (CleavageRule("E", "C", "P"),),
+        "glu-c-phosphate": (CleavageRule("DE", "C", "P"),),
+        "asp-n": (CleavageRule("D", "N"),),
+        "chymotrypsin": (CleavageRule("FYW", "C", "P"),),
+        "chymotrypsin-low": (CleavageRule("FYWML", "C", "P"),),
+        "cnbr": (CleavageRule("M", "C"),),
+        "formic-acid": (CleavageRule("D", "C"),),
+        "proteinase-k": (CleavageRule("AFYWLIV", "C"),),
+        # Before A/F/I/L/M/V, not after D/E and not when the next residue (P2') is P.
+        "thermolysin": (CleavageRule("LFIVMA", "N", "DE", "P"),),
+    }
+
+    # Monoisotopic residue masses.
+    RESIDUE_MASSES = {
+        "G": 57.021464,
+        "A": 71.037114,
+        "S": 87.032028,
+        "P": 97.052764,
+        "V": 99.068414,
+        "T": 101.047679,
+        "C": 103.009185,
+        "L": 113.084064,
+        "I": 113.084064,
+        "N": 114.042927,
+        "D": 115.026943,
+        "Q": 128.058578,
+        "K": 128.094963,
+        "E": 129.042593,
+        "M": 131.040485,
+        "H": 137.058912,
+        "F": 147.068414,
+        "R": 156.101111,
+        "Y": 163.063329,
+        "W": 186.079313,
+        "U": 150.953636,
+        "O": 237.147727,
+    }
+    WATER = 18.010565
+    PROTON = 1.007276
+
+    _mass_table = None
+
+    @staticmethod
+    def resolve_rules(
+        enzymes: Iterable[Union[str, CleavageRule]],
+    ) -> List[CleavageRule]:
+        rules = []
+        for enzyme in enzymes:
+            if isinstance(enzyme, CleavageRule):
+                rules.append(enzyme)
+                continue
+            key = enzyme.strip().lower()
+            if key not in EnzymeDigestion.ENZYMES:
+                raise ValueError(
+                    f"Unknown enzyme '{enzyme}'. Known: {', '.join(EnzymeDigestion.ENZYMES)}"
+                )
+            rules.extend(EnzymeDigestion.ENZYMES[key])
+        for rule in rules:
+            if rule.terminus not in ("C", "N"):
+                raise ValueError(
+                    f"Cleavage terminus must be 'C' or 'N', got '{rule.terminus}'"
+                )
+        return rules
+
+    @staticmethod
+    def _lookup(residues: str) -> np.ndarray:
+        table = np.zeros(256, dtype=bool)
+        table[np.frombuffer(residues.upper().encode("ascii"), dtype=np.uint8)] = True
+        return table
+
+    @staticmethod
+    def mass_table() -> np.ndarray:
+        if EnzymeDigestion._mass_table is None:
+            table = np.full(256, np.nan)
+            for aa, mass in EnzymeDigestion.RESIDUE_MASSES.items():
+                table[ord(aa)] = mass
+            EnzymeDigestion._mass_table = table
+        return EnzymeDigestion._mass_table
+
+    @staticmethod
+    def mz(mass: np.ndarray, charges: Sequence[int]) -> np.ndarray:
+        """
+        [M + zH]z+ m/z, one column per charge state.
+        """
+        charges = np.asarray(charges, dtype=float)
+        return (
+            np.asarray(mass, dtype=float)[:, None] + charges * EnzymeDigestion.PROTON
+        ) / charges
+
+    @staticmethod
+    def encode(sequences: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Concatenated uppercase uint8 sequence and int64 protein offsets.
+        """
+        encoded = [s.upper().encode("ascii", errors="replace") for s in sequences]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    @staticmethod
+    def site_mask(
+        sequence: np.ndarray,
+        rules: Sequence[CleavageRule],
+        protein_offsets: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        mask[i] is True if the bond between residues i and i + 1 is cleaved by any rule.
+        With protein_offsets, a P2' residue in the next protein never blocks a cleavage.
+        """
+        left, right = sequence[:-1], sequence[1:]
+        mask = np.zeros(max(len(sequence) - 1, 0), dtype=bool)
+        for rule in rules:
+            site, across = (left, right) if rule.terminus == "C" else (right, left)
+            hit = EnzymeDigestion._lookup(rule.residues)[site]
+            if rule.exceptions:
+                hit &= ~EnzymeDigestion._lookup(rule.exceptions)[across]
+            if rule.p2_prime_exceptions and len(mask) > 1:
+                blocked = EnzymeDigestion._lookup(rule.p2_prime_exceptions)[
+                    sequence[2:]
+                ]
+                if protein_offsets is not None:
+                    starts = protein_offsets[
+                        (protein_offsets >= 2) & (protein_offsets < len(sequence))
+                    ]
+                    blocked[starts - 2] = False
+                hit[:-1] &= ~blocked
+            mask |= hit
+        return mask
+
+    @staticmethod
+    def digest(
+        sequences: Sequence[str],
+        enzymes: Iterable[Union[str, CleavageRule]] = ("trypsin",),
+        missed_cleavages: int = 0,
+        min_length: int = 1,
+        max_length: Optional[int] = None,
+        min_mass: Optional[float] = None,
+        max_mass: Optional[float] = None,
+    ) -> Digest:
+        """
+        Digests all sequences with the union of the enzymes' cleavage rules.
+        """
+        if missed_cleavages < 0:
+            raise ValueError("missed_cleavages must be >= 0")
+        rules = EnzymeDigestion.resolve_rules(enzymes)
+        sequence, offsets = EnzymeDigestion.encode(sequences)
+
+        # Boundaries are cleavage sites (as the index of the residue after the bond) plus every
+        # protein start/end. A "site" across two proteins is a protein boundary anyway.
+        is_boundary = np.zeros(len(sequence) + 1, dtype=bool)
+        is_boundary[1:-1] = EnzymeDigestion.site_mask(sequence, rules, offsets)
+        is_boundary[offsets] = True
+        boundaries = np.flatnonzero(is_boundary)
+        protein_end = offsets[1:]
+        # Protein of each boundary taken as a peptide start (the last boundary never is).
+        boundary_protein = np.searchsorted(offsets, boundaries, side="right") - 1
+
+        # Unknown residues (X, B, Z, ...) count as 0 in the prefix sum and are counted separately,
+        # so a NaN only marks the peptides that contain one.
+        residue_mass = EnzymeDigestion.mass_table()[sequence]
+        unknown = np.isnan(residue_mass)
+        cumulative_mass = np.concatenate(
+            ([0.0], np.cumsum(np.where(unknown, 0.0, residue_mass)))
+        )
+        cumulative_unknown = np.concatenate(([0], np.cumsum(unknown)))
+
+        parts = {"protein": [], "start": [], "end": [], "missed": []}
+        for missed in range(missed_cleavages + 1):
+            step = missed + 1
+            if len(boundaries) <= step:
+                break
+            start = boundaries[:-step]
+            end = boundaries[step:]
+            protein = boundary_protein[:-step]
+            in_protein = protein < len(protein_end)
+            protein = np.minimum(protein, len(protein_end) - 1)
+            keep = in_protein & (end <= protein_end[protein])
+            length = end - start
+            keep &= length >= min_length
+            if max_length is not None:
+                keep &= length <= max_length
+            parts["protein"].append(protein[keep])
+            parts["start"].append(start[keep])
+            parts["end"].append(end[keep])
+            parts["missed"].append(np.full(int(keep.sum()), missed, dtype=np.int64))
+
+        if parts["start"]:
+            protein, start, end, missed = (
+                np.concatenate(parts[k]) for k in ("protein", "start", "end", "missed")
+            )
+        else:
+            protein = start = end = missed = np.zeros(0, dtype=np.int64)
+
+        mass = cumulative_mass[end] - cumulative_mass[start] + EnzymeDigestion.WATER
+        mass[cumulative_unknown[end] != cumulative_unknown[start]] = np.nan
+        if min_mass is not None or max_mass is not None:
+            keep = ~np.isnan(mass)
+            if min_mass is not None:
+                keep &= mass >= min_mass
+            if max_mass is not None:
+                keep &= mass <= max_mass
+            protein, start, end, missed, mass = (
+                protein[keep],
+                start[keep],
+                end[keep],
+                missed[keep],
+                mass[keep],
+            )
+
+        # Levels were appended by increasing missed cleavages, so a stable sort on start also orders by end.
+        order = np.argsort(start, kind="stable")
+        return Digest(
+            sequence,
+            offsets,
+            protein[order],
+            start[order],
+            end[order],
+            missed[order],
+            mass[order],
+        )
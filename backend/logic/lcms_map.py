@@ -0,0 +1,162 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.logic.enzyme_digestion import Digest, EnzymeDigestion
+from backend.logic.peptide_retention import PeptideRetentionPredictor
+from backend.logic.two_de_rendering import GelDensityRenderer
+
+
+@dataclass
+class LCMSFeatureMap:
+    """
+    Columnar RT x m/z feature map. Feature i is unique peptide peptide[i] at charge[i];
+    intensity is the number of times the peptide occurs in the digest.
+    """
+
+    sequences: List[str]
+    peptide: np.ndarray
+    charge: np.ndarray
+    rt: np.ndarray
+    mz: np.ndarray
+    intensity: np.ndarray
+    failed: int
+
+    def __len__(self) -> int:
+        return len(self.peptide)
+
+
+class LCMSMap:
+    """
+    Virtual LC-MS map of a proteome: digestion -> unique peptides -> retention time -> m/z.
+
+    Each stage hands arrays to the next. The digest is a set of index arrays over the encoded
+    proteome, peptides are de-duplicated with np.unique on fixed-width byte strings, and
+    retention predictions are consumed from PeptideRetentionPredictor.predict_stream (its
+    index, cache and worker pool) straight into a float array, one result at a time.
+    """
+
+    DEFAULT_CHARGES = (1, 2, 3)
+
+    @staticmethod
+    def unique_peptides(digest: Digest) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (sorted unique peptides as bytes, index of each one's first digest row, row -> unique index).
+        """
+        lengths = digest.end - digest.start
+        width = max(int(lengths.max()), 1) if len(lengths) else 1
+        # Every peptide as a zero-padded fixed-width byte string (n x width bytes; callers
+        # bound the peptide length), filled one residue column at a time.
+        padded = np.zeros((len(lengths), width), dtype=np.uint8)
+        for column in range(width):
+            inside = np.flatnonzero(lengths > column)
+            padded[inside, column] = digest.sequence[digest.start[inside] + column]
+        keys = padded.view(f"S{width}").ravel()
+        keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        return keys, first, inverse.ravel()
+
+    @staticmethod
+    def predict_rt(
+        peptides: Sequence[str], stop_event=None, **prediction_options
+    ) -> np.ndarray:
+        """
+        Predicted retention times in input order, NaN where a prediction failed.
+        """
+        rt = np.full(len(peptides), np.nan)
+        for index, result in PeptideRetentionPredictor.predict_stream(
+            list(peptides), stop_event=stop_event, **prediction_options
+        ):
+            rt[index] = result.get("predicted_tr", np.nan)
+        return rt
+
+    @staticmethod
+    def build(
+        digest: Digest,
+        charges: Sequence[int] = DEFAULT_CHARGES,
+        mz_range: Optional[Tuple[float, float]] = None,
+        stop_event=None,
+        **prediction_options,
+    ) -> LCMSFeatureMap:
+        """
+        Feature map of every unique peptide of the digest with a mass and a predicted RT,
+        at every charge state whose m/z falls in mz_range.
+        """
+        keys, first, inverse = LCMSMap.unique_peptides(digest)
+        sequences = [key.decode("ascii") for key in keys.tolist()]
+        occurrences = np.bincount(inverse, minlength=len(keys))
+        mass = digest.mass[first]
+
+        # Peptides with a residue of unknown mass can't be placed on the map, so aren't predicted.
+        placeable = np.flatnonzero(np.isfinite(mass))
+        rt = np.full(len(keys), np.nan)
+        rt[placeable] = LCMSMap.predict_rt(
+            [sequences[i] for i in placeable.tolist()],
+            stop_event=stop_event,
+            **prediction_options,
+        )
+        peptide = placeable[np.isfinite(rt[placeable])]
+        failed = len(placeable) - len(peptide)
+
+        charges = np.asarray(charges, dtype=np.int64)
+        mz = EnzymeDigestion.mz(mass[peptide], charges)  # (peptides, charges)
+        keep = np.ones(mz.shape, dtype=bool)
+        if mz_range is not None:
+            keep = (mz >= mz_range[0]) & (mz <= mz_range[1])
+        rows, cols = np.nonzero(keep)
+        return LCMSFeatureMap(
+            sequences=sequences,
+            peptide=peptide[rows],
+            charge=charges[cols],
+            rt=rt[peptide[rows]],
+            mz=mz[rows, cols],
+            intensity=occurrences[peptide[rows]],
+            failed=failed,
+        )
+
+    @staticmethod
+    def _padded_range(values: np.ndarray, bins: int) -> Tuple[float, float]:
+        """
+        Data range plus three bins on each side, so one-bin peaks at the edges stay in view.
+        """
+        low, high = (
+            (float(values.min()), float(values.max())) if len(values) else (0.0, 1.0)
+        )
+        # A single feature still gets a non-empty extent.
+        span = max(high - low, 1e-6)
+        pad = 3 * span / max(bins - 6, 1)
+        return low - pad, high + pad
+
+    @staticmethod
+    def raster(
+        feature_map: LCMSFeatureMap,
+        shape: Tuple[int, int] = (200, 200),
+        rt_range: Optional[Tuple[float, float]] = None,
+        mz_range: Optional[Tuple[float, float]] = None,
+        rt_sigma: Optional[float] = None,
+        mz_sigma: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Intensity-weighted density of the features on a (m/z bins, RT bins) grid, with a
+        Gaussian peak shape. Ranges default to the data's, padded; sigmas to one bin.
+        """
+        rows, cols = shape
+        rt_range = rt_range or LCMSMap._padded_range(feature_map.rt, cols)
+        mz_range = mz_range or LCMSMap._padded_range(feature_map.mz, rows)
+        rt_sigma = rt_sigma or (rt_range[1] - rt_range[0]) / cols
+        mz_sigma = mz_sigma or (mz_range[1] - mz_range[0]) / rows
+
+        density = GelDensityRenderer.render(
+            feature_map.rt,
+            feature_map.mz,
+            (rt_range[0], mz_range[0], rt_range[1], mz_range[1]),
+            (rows, cols),
+            rt_sigma,
+            mz_sigma,
+            weights=feature_map.intensity,
+        )
+        return {
+            "rt_range": list(rt_range),
+            "mz_range": list(mz_range),
+            "shape": [rows, cols],
+            "values": density,
+        }
@@ -0,0 +1,93 @@
+from typing import List, Optional, Tuple
+
+from backend.utility.lru_cache import LRUCache
+from backend.utility.lazy_import import lazy_import
+
+Chem = lazy_import("rdkit.Chem")
+
+
+class PeptideFragments:
+    """
+    SMILES fragments for the 20 standard L-amino acids and the BILN terminal caps.
+
+    A residue fragment is written N-to-C without its terminal OH, so a linear peptide
+    is just the fragments concatenated, closed by "O" (free acid) or "N" (-am amide).
+    Stereocentres are written for the natural L configuration (S, or R for Cys;
+    Ile 2S,3S and Thr 2S,3R).
+    """
+
+    SIDE_CHAINS = {
+        "A": "C",
+        "R": "CCCNC(=N)N",
+        "N": "CC(N)=O",
+        "D": "CC(=O)O",
+        "C": "CS",
+        "E": "CCC(=O)O",
+        "Q": "CCC(N)=O",
+        "H": "Cc1c[nH]cn1",
+        "I": "[C@@H](C)CC",
+        "L": "CC(C)C",
+        "K": "CCCCN",
+        "M": "CCSC",
+        "F": "Cc1ccccc1",
+        "S": "CO",
+        "T": "[C@H](O)C",
+        "W": "Cc1c[nH]c2ccccc12",
+        "Y": "Cc1ccc(O)cc1",
+        "V": "C(C)C",
+    }
+    RESIDUES = {
+        **{aa: f"N[C@@H]({side_chain})C(=O)" for aa, side_chain in SIDE_CHAINS.items()},
+        "G": "NCC(=O)",
+        # The ring closes inside the residue, so the label can be reused by the next proline.
+        "P": "N1[C@@H](CCC1)C(=O)",
+    }
+    N_CAPS = {"": "", "ac": "CC(=O)"}
+    C_CAPS = {"": "O", "am": "N"}
+
+    SMILES_CACHE = LRUCache(maxsize=8192)
+
+    @staticmethod
+    def parse_biln(biln: str) -> Optional[Tuple[str, List[str], str]]:
+        """
+        Splits a BILN string from normalize_to_biln into (N-cap, residues, C-cap).
+        Returns None if any monomer is not one of the standard residues.
+        """
+        monomers = biln.split("-")
+        n_cap = monomers.pop(0) if monomers and monomers[0] == "ac" else ""
+        c_cap = monomers.pop() if monomers and monomers[-1] == "am" else ""
+        if not monomers or any(
+            monomer not in PeptideFragments.RESIDUES for monomer in monomers
+        ):
+            return None
+        return n_cap, monomers, c_cap
+
+    @staticmethod
+    def linear_smiles(residues, n_cap: str = "", c_cap: str = "") -> str:
+        """
+        (Non-canonical) SMILES of a linear peptide from its residue letters and caps.
+        """
+        return (
+            PeptideFragments.N_CAPS[n_cap]
+            + "".join(PeptideFragments.RESIDUES[aa] for aa in residues)
+            + PeptideFragments.C_CAPS[c_cap]
+        )
+
+    @staticmethod
+    def assemble_smiles(biln: str) -> Optional[str]:
+        """
+        Canonical isomeric SMILES of a BILN peptide joined from the fragments,
+        or None if it has residues outside the table (callers fall back to pyPept).
+        """
+        cached = PeptideFragments.SMILES_CACHE.get(biln)
+        if cached is not None:
+            return cached
+
+        parsed = PeptideFragments.parse_biln(biln)
+        if parsed is None:
+            return None
+        n_cap, residues, c_cap = parsed
+        mol = Chem.MolFromSmiles(PeptideFragments.linear_smiles(residues, n_cap, c_cap))
+        smiles = Chem.MolToSmiles(mol, isomericSmiles=True)
+        PeptideFragments.SMILES_CACHE.put(biln, smiles)
+        return smiles
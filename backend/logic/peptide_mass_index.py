@@ -0,0 +1,175 @@
+import numpy as np
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from backend.logic.enzyme_digestion import Digest, EnzymeDigestion
+from backend.utility.lru_cache import LRUCache
+
+
+class PeptideMassIndex:
+    """
+    Digest peptides sorted by monoisotopic mass, for m/z tolerance queries.
+
+    For a fixed charge z, m/z = (M + z * proton) / z is monotonic in M, so one mass-sorted
+    array serves every charge state: an m/z window is converted to a mass window and
+    answered with two `searchsorted` calls. Batches of queries are fully vectorized.
+    Peptides with an unknown residue (no mass) are left out.
+    """
+
+    REGISTRY = LRUCache(maxsize=8)
+    UNITS = ("ppm", "da")
+
+    def __init__(
+        self,
+        digest: Digest,
+        accessions: Optional[Sequence[str]] = None,
+        charges: Sequence[int] = (1, 2, 3),
+    ):
+        self.digest = digest
+        self.accessions = accessions
+        self.charges = tuple(int(z) for z in charges)
+        valid = np.flatnonzero(~np.isnan(digest.mass))
+        self.rows = valid[np.argsort(digest.mass[valid], kind="stable")]
+        self.mass = np.ascontiguousarray(digest.mass[self.rows])
+        self._sequence = digest.sequence.tobytes()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @staticmethod
+    def window(
+        values, tolerance: float, unit: str = "ppm"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        values = np.asarray(values, dtype=float)
+        if unit == "ppm":
+            delta = values * tolerance * 1e-6
+        elif unit == "da":
+            delta = np.full_like(values, tolerance)
+        else:
+            raise ValueError(
+                f"Unknown tolerance unit '{unit}', expected one of {PeptideMassIndex.UNITS}"
+            )
+        return values - delta, values + delta
+
+    def mass_ranges(self, low, high) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        [start, end) into the sorted arrays of the peptides with low <= mass <= high.
+        """
+        return np.searchsorted(self.mass, low, side="left"), np.searchsorted(
+            self.mass, high, side="right"
+        )
+
+    def query_mz(
+        self,
+        mz,
+        tolerance: float = 10.0,
+        unit: str = "ppm",
+        charges: Optional[Sequence[int]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        All (query, charge, peptide) hits for a batch of m/z values, as parallel arrays
+        ordered by query, then charge, then mass. `peptide` indexes the sorted arrays.
+        """
+        mz = np.asarray(mz, dtype=float).ravel()
+        low, high = PeptideMassIndex.window(mz, tolerance, unit)
+        charges = self.charges if charges is None else tuple(int(z) for z in charges)
+
+        hits = {"query": [], "charge": [], "peptide": []}
+        for z in charges:
+            start, end = self.mass_ranges(
+                z * (low - EnzymeDigestion.PROTON), z * (high - EnzymeDigestion.PROTON)
+            )
+            counts = np.maximum(end - start, 0)
+            total = int(counts.sum())
+            query = np.repeat(np.arange(len(mz)), counts)
+            # Expand each [start, end) into its positions without a Python loop.
+            first = np.repeat(
+                start - np.concatenate(([0], np.cumsum(counts)[:-1])), counts
+            )
+            hits["query"].append(query)
+            hits["charge"].append(np.full(total, z, dtype=np.int64))
+            hits["peptide"].append(first + np.arange(total))
+
+        if not charges:
+            return {key: np.zeros(0, dtype=np.int64) for key in hits}
+        hits = {key: np.concatenate(parts) for key, parts in hits.items()}
+        order = np.argsort(hits["query"], kind="stable")
+        return {key: values[order] for key, values in hits.items()}
+
+    def search(
+        self,
+        mz,
+        tolerance: float = 10.0,
+        unit: str = "ppm",
+        charges: Optional[Sequence[int]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Per query: its m/z, the total number of hits and up to `limit` described hits.
+        """
+        mz = np.asarray(mz, dtype=float).ravel()
+        hits = self.query_mz(mz, tolerance, unit, charges)
+        counts = np.bincount(hits["query"], minlength=len(mz))
+        if limit is not None:
+            bounds = np.concatenate(([0], np.cumsum(counts)))
+            rank = np.arange(len(hits["query"])) - bounds[hits["query"]]
+            hits = {key: values[rank < limit] for key, values in hits.items()}
+
+        # Gather every reported hit's fields as arrays first; only the dicts are built per hit.
+        digest = self.digest
+        rows = self.rows[hits["peptide"]]
+        protein = digest.protein[rows]
+        mass = self.mass[hits["peptide"]]
+        charge = hits["charge"]
+        hit_mz = (mass + charge * EnzymeDigestion.PROTON) / charge
+        error_ppm = (mz[hits["query"]] - hit_mz) / hit_mz * 1e6
+        position = digest.start[rows] - digest.protein_offsets[protein] + 1
+        names = (
+            protein.tolist()
+            if self.accessions is None
+            else [self.accessions[p] for p in protein.tolist()]
+        )
+
+        results = [
+            {"mz": query_mz, "count": int(count), "matches": []}
+            for query_mz, count in zip(mz.tolist(), counts)
+        ]
+        for query, start, end, name, pos, missed, z, m, m_z, error in zip(
+            hits["query"].tolist(),
+            digest.start[rows].tolist(),
+            digest.end[rows].tolist(),
+            names,
+            position.tolist(),
+            digest.missed_cleavages[rows].tolist(),
+            charge.tolist(),
+            mass.round(5).tolist(),
+            hit_mz.round(5).tolist(),
+            error_ppm.round(3).tolist(),
+        ):
+            results[query]["matches"].append(
+                {
+                    "sequence": self._sequence[start:end].decode("ascii"),
+                    "protein": name,
+                    "position": pos,
+                    "missed_cleavages": missed,
+                    "charge": z,
+                    "mass": m,
+                    "mz": m_z,
+                    "error_ppm": error,
+                }
+            )
+        return results
+
+    @staticmethod
+    def build(
+        key_parts: Any, factory: Callable[[], "PeptideMassIndex"]
+    ) -> Tuple[str, "PeptideMassIndex"]:
+        """
+        Builds (or reuses) the index identified by key_parts and registers it; returns its ID
+        and the index. The index is returned directly since the registry may evict it at any time.
+        """
+        index_id = LRUCache.make_key("mass-index", key_parts)
+        return index_id, PeptideMassIndex.REGISTRY.get_or_create(index_id, factory)
+
+    @staticmethod
+    def get(index_id: str) -> Optional["PeptideMassIndex"]:
+        return PeptideMassIndex.REGISTRY.get(index_id)
@@ -0,0 +1,253 @@
+import numpy as np
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from backend.logic.enzyme_digestion import Digest, EnzymeDigestion
+from backend.utility.lru_cache import LRUCache
+
+
+class PeptideProteinIndex:
+    """
+    Inverted index from digest peptide to the proteins that contain it.
+
+    Every peptide of the digest is hashed straight from the concatenated sequence with a
+    polynomial rolling hash (prefix sums of s[j] * B^j, mod 2^64), so no peptide strings are
+    built. Distinct peptides get an entry holding one occurrence (start, length) and a
+    CSR slice of posting arrays listing their proteins; keys live in an open-addressing
+    table (linear probing, load <= 1/2) of entry numbers. A lookup hashes the query the same
+    way, probes the table and verifies the candidate byte for byte, so hash collisions can
+    never produce a wrong answer. Memory is proportional to the number of distinct peptides
+    plus the protein sequences.
+    """
+
+    REGISTRY = LRUCache(maxsize=8)
+    BASE = 0x100000001B3
+    # A second, independent hash only separates colliding keys while entries are built.
+    CHECK_BASE = 0x9E3779B97F4A7C15
+    EMPTY = -1
+
+    def __init__(self, digest: Digest, accessions: Optional[Sequence[str]] = None):
+        self.accessions = list(accessions) if accessions is not None else None
+        self.n_proteins = len(digest.protein_offsets) - 1
+        self._sequence = digest.sequence.tobytes()
+        self._accession_index: Dict[str, int] = {}
+        for i, accession in enumerate(self.accessions or []):
+            self._accession_index.setdefault(accession, i)
+
+        length = digest.end - digest.start
+        keys = PeptideProteinIndex.hash(
+            digest.sequence, digest.start, digest.end, PeptideProteinIndex.BASE
+        )
+        check = PeptideProteinIndex.hash(
+            digest.sequence, digest.start, digest.end, PeptideProteinIndex.CHECK_BASE
+        )
+
+        # Group digest rows by key, one group per distinct peptide. Keys of different peptides
+        # collide with probability ~n^2 / 2^64; if the check hash shows one, split by it too.
+        order = np.argsort(keys, kind="stable")
+        same_key = keys[order][1:] == keys[order][:-1]
+        if np.any(same_key & (check[order][1:] != check[order][:-1])):
+            order = np.lexsort((check, keys))
+        new_entry = np.ones(len(order), dtype=bool)
+        new_entry[1:] = (keys[order][1:] != keys[order][:-1]) | (
+            check[order][1:] != check[order][:-1]
+        )
+        entry = np.cumsum(new_entry) - 1
+        firsts = order[new_entry]
+        self.keys = keys[firsts]
+        self.start = digest.start[firsts]
+        self.length = length[firsts].astype(np.int32)
+
+        # Postings: the distinct proteins of each entry, ascending. Both sorts are stable and
+        # digest rows are ordered by start, hence by protein, so each group is already sorted.
+        protein = digest.protein[order]
+        distinct = np.ones(len(entry), dtype=bool)
+        distinct[1:] = (entry[1:] != entry[:-1]) | (protein[1:] != protein[:-1])
+        entry, self.postings = entry[distinct], protein[distinct].astype(np.int32)
+        self.offsets = np.zeros(len(self.keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(entry, minlength=len(self.keys)), out=self.offsets[1:])
+
+        # Proteotypic entries (exactly one protein), grouped by that protein.
+        proteotypic = np.flatnonzero(np.diff(self.offsets) == 1)
+        owner = self.postings[self.offsets[proteotypic]]
+        by_owner = np.argsort(owner, kind="stable")
+        self.unique_entries = proteotypic[by_owner]
+        self.unique_offsets = np.zeros(self.n_proteins + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(owner, minlength=self.n_proteins), out=self.unique_offsets[1:]
+        )
+
+        self.table = PeptideProteinIndex.build_table(self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @staticmethod
+    def _mix(values: np.ndarray) -> np.ndarray:
+        """
+        splitmix64 finalizer, so that the low bits used as the table slot are well spread.
+        """
+        values = values ^ (values >> np.uint64(30))
+        values = values * np.uint64(0xBF58476D1CE4E5B9)
+        values = values ^ (values >> np.uint64(27))
+        values = values * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+    @staticmethod
+    def hash(
+        sequence: np.ndarray, start: np.ndarray, end: np.ndarray, base: int = BASE
+    ) -> np.ndarray:
+        """
+        64-bit hash of every residue range [start, end) of an encoded sequence.
+
+        With P[i] = sum_{j < i} s[j] * B^j (mod 2^64), the range's polynomial hash is
+        (P[end] - P[start]) * B^-start; B is odd, so it is invertible mod 2^64.
+        """
+
+        def powers(factor: int) -> np.ndarray:
+            values = np.full(len(sequence) + 1, factor % 2**64, dtype=np.uint64)
+            values[0] = 1
+            return np.cumprod(values, out=values)
+
+        prefix = np.zeros(len(sequence) + 1, dtype=np.uint64)
+        np.cumsum(sequence.astype(np.uint64) * powers(base)[:-1], out=prefix[1:])
+        values = (prefix[end] - prefix[start]) * powers(pow(base, -1, 2**64))[start]
+        length = (end - start).astype(np.uint64)
+        return PeptideProteinIndex._mix(values + length * np.uint64(0x9E3779B97F4A7C15))
+
+    @staticmethod
+    def build_table(keys: np.ndarray) -> np.ndarray:
+        """
+        Open-addressing table (a power of two, at least twice the entries) of entry numbers,
+        EMPTY where free. Inserted in vectorized rounds: every pending entry tries its next
+        slot, the first claimant of each free slot wins and the rest probe on.
+        """
+        size = 1 << max(int(2 * len(keys) - 1).bit_length(), 4)
+        mask = np.uint64(size - 1)
+        table = np.full(
+            size,
+            PeptideProteinIndex.EMPTY,
+            dtype=np.int32 if len(keys) < 2**31 else np.int64,
+        )
+        pending = np.arange(len(keys))
+        slot = (keys & mask).astype(np.int64)
+        while len(pending):
+            free = table[slot] == PeptideProteinIndex.EMPTY
+            claimed, winner = np.unique(slot[free], return_index=True)
+            placed = np.flatnonzero(free)[winner]
+            table[claimed] = pending[placed]
+            left = np.ones(len(pending), dtype=bool)
+            left[placed] = False
+            pending, slot = pending[left], (slot[left] + 1) & (size - 1)
+        return table
+
+    def lookup(self, peptides: Sequence[str]) -> np.ndarray:
+        """
+        Entry number of each peptide, EMPTY for peptides not in the digest.
+        """
+        sequence, offsets = EnzymeDigestion.encode(peptides)
+        keys = PeptideProteinIndex.hash(sequence, offsets[:-1], offsets[1:])
+        lengths = np.diff(offsets)
+        queries, stored = sequence.tobytes(), self._sequence
+        found = np.full(len(lengths), PeptideProteinIndex.EMPTY, dtype=np.int64)
+
+        size = len(self.table)
+        pending = np.arange(len(lengths))
+        slot = (keys & np.uint64(size - 1)).astype(np.int64)
+        while len(pending):
+            entry = self.table[slot].astype(np.int64)
+            occupied = np.flatnonzero(entry != PeptideProteinIndex.EMPTY)
+            same = (self.keys[entry[occupied]] == keys[pending[occupied]]) & (
+                self.length[entry[occupied]] == lengths[pending[occupied]]
+            )
+            candidate = occupied[same]
+            # Exact check of the key matches against the stored occurrence.
+            match = np.array(
+                [
+                    stored[start : start + length] == queries[offset : offset + length]
+                    for start, offset, length in zip(
+                        self.start[entry[candidate]].tolist(),
+                        offsets[pending[candidate]].tolist(),
+                        lengths[pending[candidate]].tolist(),
+                    )
+                ],
+                dtype=bool,
+            )
+            found[pending[candidate[match]]] = entry[candidate[match]]
+            # Stop at a free slot (absent) or a verified match; probe on otherwise.
+            left = np.zeros(len(pending), dtype=bool)
+            left[occupied] = True
+            left[candidate[match]] = False
+            pending, slot = pending[left], (slot[left] + 1) & (size - 1)
+        return found
+
+    def peptide(self, entry: int) -> str:
+        start = int(self.start[entry])
+        return self._sequence[start : start + int(self.length[entry])].decode("ascii")
+
+    def proteins(self, entry: int) -> np.ndarray:
+        return self.postings[self.offsets[entry] : self.offsets[entry + 1]]
+
+    def protein_name(self, protein: int) -> Any:
+        return protein if self.accessions is None else self.accessions[protein]
+
+    def protein_index(self, protein: Any) -> Optional[int]:
+        """
+        Index of a protein given its accession (or its index, for unnamed digests).
+        """
+        if self.accessions is not None:
+            return self._accession_index.get(protein)
+        if isinstance(protein, int) and 0 <= protein < self.n_proteins:
+            return protein
+        return None
+
+    def describe(self, peptides: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Per peptide: whether it is in the digest, its proteins and whether it is proteotypic.
+        """
+        results = []
+        for peptide, entry in zip(peptides, self.lookup(peptides).tolist()):
+            proteins = (
+                []
+                if entry == PeptideProteinIndex.EMPTY
+                else self.proteins(entry).tolist()
+            )
+            results.append(
+                {
+                    "peptide": peptide,
+                    "found": entry != PeptideProteinIndex.EMPTY,
+                    "proteotypic": len(proteins) == 1,
+                    "proteins": [self.protein_name(p) for p in proteins],
+                }
+            )
+        return results
+
+    def unique_peptides(self, protein: int) -> List[str]:
+        """
+        Peptides found in this protein only, sorted.
+        """
+        entries = self.unique_entries[
+            self.unique_offsets[protein] : self.unique_offsets[protein + 1]
+        ]
+        return sorted(self.peptide(e) for e in entries.tolist())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "proteins": self.n_proteins,
+            "peptides": len(self),
+            "proteotypic": len(self.unique_entries),
+        }
+
+    @staticmethod
+    def build(
+        key_parts: Any, factory: Callable[[], "PeptideProteinIndex"]
+    ) -> Tuple[str, "PeptideProteinIndex"]:
+        """
+        Builds (or reuses) the index identified by key_parts and registers it; returns its ID
+        and the index.
+        """
+        index_id = LRUCache.make_key("peptide-protein-index", key_parts)
+        return index_id, PeptideProteinIndex.REGISTRY.get_or_create(index_id, factory)
+
+    @staticmethod
+    def get(index_id: str) -> Optional["PeptideProteinIndex"]:
+        return PeptideProteinIndex.REGISTRY.get(index_id)
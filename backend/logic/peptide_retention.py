@@ -1,9 +1,24 @@
-from rdkit import Chem
-from rdkit.Chem import Descriptors, AllChem
 import math
-from pyPept.sequence import Sequence, correct_pdb_atoms
-from pyPept.molecule import Molecule
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import os
+import threading
+import numpy as np
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from backend.logic.peptide_retention_cache import PeptideRetentionCache
+from backend.logic.peptide_retention_fast import FastRetentionFeatures
+from backend.logic.peptide_fragments import PeptideFragments
+from backend.logic.peptide_retention_calibration import RetentionCalibration
+from backend.logic.peptide_retention_index import RetentionIndex
+from backend.utility.lru_cache import LRUCache
+from backend.utility.supervised_pool import SupervisedPool
+from backend.utility.lazy_import import lazy_import
+
+Chem = lazy_import("rdkit.Chem")
+AllChem = lazy_import("rdkit.Chem.AllChem")
+Descriptors = lazy_import("rdkit.Chem.Descriptors")
+pypept_sequence = lazy_import("pyPept.sequence")
+pypept_molecule = lazy_import("pyPept.molecule")
 
 class PeptideRetentionPredictor:
     AA_RETENTION_TIMES = {
@@ -12,6 +27,70 @@ class PeptideRetentionPredictor:
         'Y': 8.63, 'V': 4.17
     }
 
+    # Batch prediction is CPU-bound and mostly holds the GIL (pyPept, RDKit embedding),
+    # so it runs in a process pool. Every server process has its own pool, so by default the
+    # CPUs are split between the WEB_CONCURRENCY server processes (uvicorn's --workers);
+    # PROSEP_PR_WORKERS sets the count per server process instead.
+    WORKERS = int(os.environ.get("PROSEP_PR_WORKERS")
+                  or max(1, (os.cpu_count() or 1) // max(1, int(os.environ.get("WEB_CONCURRENCY") or 1))))
+    CHUNKS_PER_WORKER = 4
+    MAX_CHUNK = 64  # keeps streamed results flowing on very large batches
+    # Chunk cap for stoppable runs: a chunk already in a worker runs to the end after a stop.
+    STOP_CHUNK = 4
+    STOP_POLL = 0.5  # seconds between stop_event checks while waiting on workers
+    _pool = None
+    _pool_lock = threading.Lock()
+    # Requests with a per-peptide time limit run here instead, where an overrunning
+    # peptide's worker can be killed.
+    _supervised_pool = None
+
+    # Conformer embedding budget; only predictions with the defaults are cached.
+    DEFAULT_CONFORMERS = 10
+    DEFAULT_EMBED_ATTEMPTS = 0  # RDKit's own default
+
+    # tR = a + b * log_sum_aa + c * log_vdw_vol + d * clog_p
+    COEFFICIENTS = (8.02, 14.86, -5.77, 0.28)
+    # Bump when the feature computation changes, so cached features are recomputed.
+    FEATURE_VERSION = 2
+    _cache = None
+
+    # "full" embeds conformers for the VdW volume; "fast" uses FastRetentionFeatures
+    # and falls back to full for non-standard residues.
+    MODES = ('full', 'fast')
+
+    @staticmethod
+    def _warm_worker():
+        # Builds the residue fragment tables and loads RDKit's embedding code once per worker,
+        # so the first chunk a worker receives doesn't pay for it. pyPept is not warmed: it is
+        # only imported for peptides with non-standard residues.
+        PeptideRetentionPredictor.compute_prediction("GG")
+
+    @staticmethod
+    def get_pool() -> ProcessPoolExecutor:
+        """
+        Shared, warm process pool for predict_multiple, started on first use.
+        """
+        if PeptideRetentionPredictor._pool is None:
+            with PeptideRetentionPredictor._pool_lock:
+                if PeptideRetentionPredictor._pool is None:
+                    PeptideRetentionPredictor._pool = ProcessPoolExecutor(
+                        max_workers=PeptideRetentionPredictor.WORKERS,
+                        mp_context=multiprocessing.get_context(SupervisedPool.START_METHOD),
+                        initializer=PeptideRetentionPredictor._warm_worker,
+                    )
+        return PeptideRetentionPredictor._pool
+
+    @staticmethod
+    def get_supervised_pool() -> SupervisedPool:
+        if PeptideRetentionPredictor._supervised_pool is None:
+            with PeptideRetentionPredictor._pool_lock:
+                if PeptideRetentionPredictor._supervised_pool is None:
+                    PeptideRetentionPredictor._supervised_pool = SupervisedPool(
+                        PeptideRetentionPredictor.WORKERS,
+                        initializer=PeptideRetentionPredictor._warm_worker,
+                    )
+        return PeptideRetentionPredictor._supervised_pool
+
     @staticmethod
     def normalize_to_biln(peptide: str) -> str:
         seq = peptide.strip()
@@ -32,9 +111,13 @@ class PeptideRetentionPredictor:
     def peptide_to_smiles(peptide):
         try:
             biln = PeptideRetentionPredictor.normalize_to_biln(peptide)
-            seq = Sequence(biln)
-            seq = correct_pdb_atoms(seq)
-            mol = Molecule(seq).get_molecule(fmt='ROMol')
+            # Standard residues are joined from cached fragments; pyPept only builds exotic ones.
+            smiles = PeptideFragments.assemble_smiles(biln)
+            if smiles is not None:
+                return smiles
+            seq = pypept_sequence.Sequence(biln)
+            seq = pypept_sequence.correct_pdb_atoms(seq)
+            mol = pypept_molecule.Molecule(seq).get_molecule(fmt='ROMol')
             return Chem.MolToSmiles(mol, isomericSmiles=True)
         except Exception:
             return None
@@ -47,15 +130,15 @@ class PeptideRetentionPredictor:
         return math.log10(total)
 
     @staticmethod
-    def compute_rdkit_features(smiles):
+    def compute_rdkit_features(smiles, num_conformers=DEFAULT_CONFORMERS, max_embed_attempts=DEFAULT_EMBED_ATTEMPTS):
         mol = Chem.MolFromSmiles(smiles)
         if mol is None:
             raise ValueError("Invalid SMILES")
         mol = Chem.AddHs(mol)
-        cids = AllChem.EmbedMultipleConfs(mol, numConfs=10)
+        cids = AllChem.EmbedMultipleConfs(mol, numConfs=num_conformers, maxAttempts=max_embed_attempts)
         
         if not cids:
-            AllChem.EmbedMolecule(mol)
+            AllChem.EmbedMolecule(mol, maxAttempts=max_embed_attempts)
             vdw_vol = 1
         else:
             vdw_vol = AllChem.ComputeMolVolume(mol, confId=cids[0])
@@ -64,14 +147,36 @@ class PeptideRetentionPredictor:
         return math.log10(vdw_vol), clog_p
 
     @staticmethod
-    def predict(peptide: str) -> dict:
+    def apply_model(log_sum: float, log_vdw: float, clog_p: float, coefficients=None) -> float:
+        a, b, c, d = coefficients or PeptideRetentionPredictor.COEFFICIENTS
+        return a + b * log_sum + c * log_vdw + d * clog_p
+
+    @staticmethod
+    def model_hash() -> str:
+        return LRUCache.make_key(PeptideRetentionPredictor.COEFFICIENTS, PeptideRetentionPredictor.FEATURE_VERSION)
+
+    @staticmethod
+    def get_cache() -> PeptideRetentionCache:
+        """
+        Shared prediction cache, opened on first use. It lives in the serving process only;
+        pool workers just compute.
+        """
+        if PeptideRetentionPredictor._cache is None:
+            PeptideRetentionPredictor._cache = PeptideRetentionCache(PeptideRetentionPredictor.model_hash())
+        return PeptideRetentionPredictor._cache
+
+    @staticmethod
+    def compute_prediction(peptide: str, num_conformers=DEFAULT_CONFORMERS, max_embed_attempts=DEFAULT_EMBED_ATTEMPTS) -> dict:
+        """
+        Uncached prediction: SMILES, conformer embedding, descriptors, then the model.
+        """
         try:
             smiles = PeptideRetentionPredictor.peptide_to_smiles(peptide)
             if not smiles:
                 raise ValueError("Invalid peptide sequence")
             log_sum = PeptideRetentionPredictor.log_sum_aa(peptide)
-            log_vdw, clog_p = PeptideRetentionPredictor.compute_rdkit_features(smiles)
-            tr_pred = 8.02 + 14.86 * log_sum - 5.77 * log_vdw + 0.28 * clog_p
+            log_vdw, clog_p = PeptideRetentionPredictor.compute_rdkit_features(smiles, num_conformers, max_embed_attempts)
+            tr_pred = PeptideRetentionPredictor.apply_model(log_sum, log_vdw, clog_p)
             return {
                 'peptide': peptide,
                 'smiles': smiles,
@@ -87,9 +192,243 @@ class PeptideRetentionPredictor:
             }
 
     @staticmethod
-    def predict_multiple(peptides: list[str]) -> list[dict]:
-        results = []
-        with ThreadPoolExecutor() as executor:
-            results = list(executor.map(PeptideRetentionPredictor.predict, peptides))
+    def compute_fast_prediction(peptide: str):
+        """
+        Prediction from tabulated residue contributions, or None if the peptide has
+        residues the fast tables don't cover.
+        """
+        biln = PeptideRetentionPredictor.normalize_to_biln(peptide)
+        parsed = PeptideFragments.parse_biln(biln)
+        if parsed is None:
+            return None
+        try:
+            log_sum = PeptideRetentionPredictor.log_sum_aa(peptide)
+        except ValueError as e:
+            return {'peptide': peptide, 'error': str(e), 'mode': 'fast'}
+        log_vdw, clog_p = FastRetentionFeatures.features(biln)
+        return {
+            'peptide': peptide,
+            # Uncanonicalized: canonical SMILES would cost more than the rest of the prediction.
+            'smiles': PeptideFragments.linear_smiles(parsed[1], parsed[0], parsed[2]),
+            'log_sum_aa': log_sum,
+            'log_vdw_vol': log_vdw,
+            'clog_p': clog_p,
+            'predicted_tr': PeptideRetentionPredictor.apply_model(log_sum, log_vdw, clog_p),
+            'mode': 'fast'
+        }
+
+    @staticmethod
+    def _failed_prediction(peptide: str, message: str) -> dict:
+        # Partial result: log_sum_aa needs no structure, so it is still reported when it can be.
+        result = {'peptide': peptide, 'error': message}
+        try:
+            result['log_sum_aa'] = PeptideRetentionPredictor.log_sum_aa(peptide)
+        except ValueError:
+            pass
+        return result
+
+    @staticmethod
+    def compute_predictions(peptides: list[str], num_conformers=DEFAULT_CONFORMERS,
+                            max_embed_attempts=DEFAULT_EMBED_ATTEMPTS) -> list[dict]:
+        # One pool task per chunk of peptides.
+        return [PeptideRetentionPredictor.compute_prediction(peptide, num_conformers, max_embed_attempts)
+                for peptide in peptides]
+
+    @staticmethod
+    def _compute_full(peptides: list[str], num_conformers, max_embed_attempts, timeout, stop_event=None):
+        """
+        Yields (position, result) as full-mode predictions for distinct peptides finish,
+        bypassing the cache. With a timeout each peptide runs alone in a supervised worker
+        and is killed at the limit. Setting stop_event abandons the remaining work.
+        """
+        if timeout is not None:
+            task = partial(PeptideRetentionPredictor.compute_prediction,
+                           num_conformers=num_conformers, max_embed_attempts=max_embed_attempts)
+            pool = PeptideRetentionPredictor.get_supervised_pool()
+            for position, status, value in pool.run_iter(task, peptides, timeout, stop_event):
+                if status == 'ok':
+                    yield position, value
+                elif status == 'timeout':
+                    yield position, PeptideRetentionPredictor._failed_prediction(peptides[position], f"Timed out after {timeout:g} s")
+                else:
+                    yield position, PeptideRetentionPredictor._failed_prediction(peptides[position], value)
+            return
+
+        if len(peptides) <= 1:
+            for position, peptide in enumerate(peptides):
+                if stop_event is not None and stop_event.is_set():
+                    return
+                yield position, PeptideRetentionPredictor.compute_prediction(peptide, num_conformers, max_embed_attempts)
+            return
+
+        workers = PeptideRetentionPredictor.WORKERS
+        chunksize = min(PeptideRetentionPredictor.MAX_CHUNK if stop_event is None else PeptideRetentionPredictor.STOP_CHUNK,
+                        max(1, len(peptides) // (workers * PeptideRetentionPredictor.CHUNKS_PER_WORKER)))
+        pool = PeptideRetentionPredictor.get_pool()
+        futures = {
+            pool.submit(PeptideRetentionPredictor.compute_predictions, peptides[start:start + chunksize],
+                        num_conformers, max_embed_attempts): start
+            for start in range(0, len(peptides), chunksize)
+        }
+        remaining = set(futures)
+        try:
+            while remaining:
+                done, remaining = wait(remaining, timeout=PeptideRetentionPredictor.STOP_POLL, return_when=FIRST_COMPLETED)
+                if stop_event is not None and stop_event.is_set():
+                    return
+                for future in done:
+                    for offset, result in enumerate(future.result()):
+                        yield futures[future] + offset, result
+        finally:
+            for future in remaining:
+                future.cancel()
+
+    @staticmethod
+    def predict_stream(peptides: list[str], mode: str = 'full', num_conformers: int = DEFAULT_CONFORMERS,
+                       max_embed_attempts: int = DEFAULT_EMBED_ATTEMPTS, timeout: float = None, stop_event=None,
+                       calibration: str = None):
+        """
+        Yields (index, result) for every input peptide as its prediction completes.
+        In fast mode every standard peptide is answered in-process. Otherwise cached
+        peptides are answered first, and each distinct uncached peptide is computed once
+        in a worker process. timeout (seconds) bounds each peptide; peptides over it get
+        an error result. Setting stop_event stops the remaining work.
+        With a calibration name, predicted_tr uses that calibration's coefficients.
+        """
+        results = PeptideRetentionPredictor._predict_stream(
+            peptides, mode, num_conformers, max_embed_attempts, timeout, stop_event)
+        if calibration is None:
+            yield from results
+            return
+
+        try:
+            record = RetentionCalibration.load(calibration)
+        except ValueError:
+            record = None
+        if record is None:
+            for index, peptide in enumerate(peptides):
+                yield index, {'peptide': peptide, 'error': f"Unknown calibration: {calibration}"}
+            return
+        # Coefficients fitted on one mode's features don't carry over to the other's.
+        fitted_mode = record.get('mode', 'full')
+        if fitted_mode != mode:
+            for index, peptide in enumerate(peptides):
+                yield index, {'peptide': peptide,
+                              'error': f"Calibration {calibration} was fitted in {fitted_mode} mode, not {mode}"}
+            return
+
+        coefficients = record['coefficients']
+        for index, result in results:
+            if 'error' not in result:
+                result = {
+                    **result,
+                    'predicted_tr': PeptideRetentionPredictor.apply_model(
+                        result['log_sum_aa'], result['log_vdw_vol'], result['clog_p'], coefficients),
+                    'calibration': calibration,
+                }
+            yield index, result
+
+    @staticmethod
+    def _predict_stream(peptides, mode, num_conformers, max_embed_attempts, timeout, stop_event):
+        if mode not in PeptideRetentionPredictor.MODES:
+            for index, peptide in enumerate(peptides):
+                yield index, {'peptide': peptide, 'error': f"Unknown mode: {mode}"}
+            return
+
+        pending = []
+        for index, peptide in enumerate(peptides):
+            result = PeptideRetentionPredictor.compute_fast_prediction(peptide) if mode == 'fast' else None
+            if result is None:
+                pending.append(index)
+            else:
+                yield index, result
+        if not pending:
+            return
+
+        bilns = {index: PeptideRetentionPredictor.normalize_to_biln(peptides[index]) for index in pending}
+        use_cache = (num_conformers == PeptideRetentionPredictor.DEFAULT_CONFORMERS
+                     and max_embed_attempts == PeptideRetentionPredictor.DEFAULT_EMBED_ATTEMPTS)
+
+        # Reference-proteome peptides are answered from the precomputed index, if one is installed.
+        rt_index = RetentionIndex.get(PeptideRetentionPredictor.model_hash()) if use_cache else None
+        if rt_index is not None:
+            remaining = []
+            for index in pending:
+                biln = bilns[index]
+                capped = biln.startswith('ac-') or biln.endswith('-am')
+                hit = None if capped else rt_index.lookup(biln.replace('-', ''))
+                if hit is None:
+                    remaining.append(index)
+                else:
+                    yield index, {'peptide': peptides[index], **hit, 'mode': 'full'}
+            pending = remaining
+
+        cache = PeptideRetentionPredictor.get_cache() if use_cache else None
+        cached = cache.get_many(bilns.values()) if use_cache else {}
+
+        waiting = {}  # uncached BILN -> indices of the peptides that normalize to it
+        for index in pending:
+            biln = bilns[index]
+            if biln in cached:
+                yield index, {'peptide': peptides[index], **cached[biln], 'mode': 'full'}
+            else:
+                waiting.setdefault(biln, []).append(index)
+
+        keys = list(waiting)
+        fresh = {}
+        try:
+            for position, result in PeptideRetentionPredictor._compute_full(
+                    [peptides[waiting[biln][0]] for biln in keys], num_conformers, max_embed_attempts, timeout, stop_event):
+                fresh[keys[position]] = result
+                if use_cache and len(fresh) >= PeptideRetentionPredictor.MAX_CHUNK:
+                    cache.put_many(fresh)
+                    fresh = {}
+                for index in waiting[keys[position]]:
+                    yield index, {**result, 'peptide': peptides[index], 'mode': 'full'}
+        finally:
+            if use_cache:
+                cache.put_many(fresh)
+
+    @staticmethod
+    def predict(peptide: str, mode: str = 'full', num_conformers: int = DEFAULT_CONFORMERS,
+                max_embed_attempts: int = DEFAULT_EMBED_ATTEMPTS, timeout: float = None, calibration: str = None) -> dict:
+        return PeptideRetentionPredictor.predict_multiple(
+            [peptide], mode, num_conformers, max_embed_attempts, timeout, calibration)[0]
+
+    @staticmethod
+    def predict_multiple(peptides: list[str], mode: str = 'full', num_conformers: int = DEFAULT_CONFORMERS,
+                         max_embed_attempts: int = DEFAULT_EMBED_ATTEMPTS, timeout: float = None,
+                         calibration: str = None) -> list[dict]:
+        """
+        predict_stream collected into a list in input order.
+        """
+        results = [None] * len(peptides)
+        for index, result in PeptideRetentionPredictor.predict_stream(
+                peptides, mode, num_conformers, max_embed_attempts, timeout, calibration=calibration):
+            results[index] = result
         return results
-    
+
+    @staticmethod
+    def calibrate(name: str, peptides: list[str], observed_rt: list[float], robust: bool = False, mode: str = 'full',
+                  num_conformers: int = DEFAULT_CONFORMERS, max_embed_attempts: int = DEFAULT_EMBED_ATTEMPTS,
+                  timeout: float = None) -> dict:
+        """
+        Fits and stores a named calibration from observed (peptide, RT) pairs.
+        Features come from the normal prediction path, so cached descriptors are reused.
+        Peptides whose features can't be computed are left out and reported as skipped.
+        """
+        RetentionCalibration.validate_name(name)
+        features = np.full((len(peptides), 3), np.nan)
+        skipped = []
+        for index, result in PeptideRetentionPredictor.predict_stream(
+                peptides, mode, num_conformers, max_embed_attempts, timeout):
+            if 'error' in result:
+                skipped.append({'index': index, 'peptide': peptides[index], 'error': result['error']})
+            else:
+                features[index] = (result['log_sum_aa'], result['log_vdw_vol'], result['clog_p'])
+
+        usable = ~np.isnan(features).any(axis=1)
+        coefficients, stats = RetentionCalibration.fit(
+            features[usable], np.asarray(observed_rt, dtype=float)[usable], robust)
+        calibration = RetentionCalibration.save(name, coefficients, stats, mode=mode)
+        return {**calibration, 'skipped': sorted(skipped, key=lambda s: s['index'])}
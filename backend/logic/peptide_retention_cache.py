@@ -0,0 +1,113 @@
+import json
+import sqlite3
+import threading
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from backend.utility.lru_cache import LRUCache
+
+
+class PeptideRetentionCache:
+    """
+    Two-tier memo of retention predictions keyed by normalized BILN string:
+    an in-memory LRU in front of a SQLite table under data/.
+
+    Rows remember the model hash they were predicted with. A row from another model is a
+    miss, so changing the coefficients (or the feature computation) invalidates old predictions.
+    """
+
+    DB_PATH = Path("data/peptide_retention_cache.sqlite3")
+    MEMORY_SIZE = 4096
+    FIELDS = ("smiles", "log_sum_aa", "log_vdw_vol", "clog_p", "predicted_tr")
+
+    def __init__(
+        self,
+        model_hash: str,
+        db_path: Optional[Path] = None,
+        memory_size: int = MEMORY_SIZE,
+    ):
+        self.model_hash = model_hash
+        self.db_path = Path(db_path or PeptideRetentionCache.DB_PATH)
+        self.memory = LRUCache(maxsize=memory_size)
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(
+                str(self.db_path), check_same_thread=False
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "biln TEXT PRIMARY KEY, model_hash TEXT NOT NULL, result TEXT NOT NULL)"
+            )
+            self._connection.commit()
+        return self._connection
+
+    def get_many(self, bilns: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Cached results for whichever of the BILN strings have one under the current model.
+        """
+        found = {}
+        missing = []
+        for biln in dict.fromkeys(bilns):
+            result = self.memory.get(biln)
+            if result is None:
+                missing.append(biln)
+            else:
+                found[biln] = result
+
+        if missing:
+            with self._lock:
+                db = self._db()
+                # Chunked to stay under SQLite's bound-parameter limit.
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start : start + 500]
+                    rows = db.execute(
+                        f"SELECT biln, result FROM predictions WHERE model_hash = ? AND biln IN ({','.join('?' * len(chunk))})",
+                        [self.model_hash, *chunk],
+                    ).fetchall()
+                    for biln, payload in rows:
+                        found[biln] = json.loads(payload)
+
+            for biln in missing:
+                if biln in found:
+                    self.memory.put(biln, found[biln])
+
+        return found
+
+    def get(self, biln: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([biln]).get(biln)
+
+    def put_many(self, results: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Stores successful predictions; only FIELDS are kept, so the peptide as typed is not.
+        """
+        rows = []
+        for biln, result in results.items():
+            if "error" in result:
+                continue
+            stored = {field: result[field] for field in PeptideRetentionCache.FIELDS}
+            self.memory.put(biln, stored)
+            rows.append((biln, self.model_hash, json.dumps(stored)))
+
+        if rows:
+            with self._lock:
+                db = self._db()
+                db.executemany(
+                    "INSERT OR REPLACE INTO predictions (biln, model_hash, result) VALUES (?, ?, ?)",
+                    rows,
+                )
+                db.commit()
+
+    def put(self, biln: str, result: Dict[str, Any]) -> None:
+        self.put_many({biln: result})
+
+    def clear(self) -> None:
+        self.memory.clear()
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM predictions")
+            db.commit()
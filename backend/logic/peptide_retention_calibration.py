@@ -0,0 +1,129 @@
+import re
+import json
+import time
+
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RetentionCalibration:
+    """
+    Named calibrations of the linear retention model
+    tR = a + b * log_sum_aa + c * log_vdw_vol + d * clog_p, one JSON file each under data/.
+
+    Coefficients are fitted by ordinary least squares over the whole feature matrix at once,
+    or robustly by iteratively reweighted least squares with Huber weights, which keeps a few
+    misassigned or co-eluting peptides from dragging the fit.
+    """
+
+    BASE_DIR = Path("data/retention_calibrations")
+    NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+    HUBER_K = 1.345  # 95% efficiency at normally distributed residuals
+    MAX_ITERATIONS = 50
+
+    @staticmethod
+    def design_matrix(features) -> np.ndarray:
+        """
+        [1, log_sum_aa, log_vdw_vol, clog_p] rows from an (n x 3) feature array.
+        """
+        features = np.asarray(features, dtype=float).reshape(-1, 3)
+        return np.column_stack([np.ones(len(features)), features])
+
+    @staticmethod
+    def fit(features, rt, robust: bool = False) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Fitted coefficients (a, b, c, d) and goodness-of-fit statistics.
+        """
+        X = RetentionCalibration.design_matrix(features)
+        y = np.asarray(rt, dtype=float)
+        if len(y) < X.shape[1]:
+            raise ValueError(
+                f"At least {X.shape[1]} points are needed to fit the model, got {len(y)}"
+            )
+
+        coefficients = np.linalg.lstsq(X, y, rcond=None)[0]
+        iterations = 0
+        if robust:
+            for iterations in range(1, RetentionCalibration.MAX_ITERATIONS + 1):
+                residuals = y - X @ coefficients
+                # Robust residual scale from the median absolute deviation.
+                scale = 1.4826 * np.median(np.abs(residuals - np.median(residuals)))
+                if scale <= 0:
+                    break
+                u = np.abs(residuals) / (RetentionCalibration.HUBER_K * scale)
+                weights = np.sqrt(np.where(u <= 1, 1.0, 1.0 / np.maximum(u, 1e-12)))
+                updated = np.linalg.lstsq(
+                    X * weights[:, None], y * weights, rcond=None
+                )[0]
+                converged = np.allclose(updated, coefficients, rtol=1e-8, atol=1e-10)
+                coefficients = updated
+                if converged:
+                    break
+
+        residuals = y - X @ coefficients
+        total = float(((y - y.mean()) ** 2).sum())
+        stats = {
+            "n": int(len(y)),
+            "rmse": float(np.sqrt((residuals**2).mean())),
+            "mae": float(np.abs(residuals).mean()),
+            "r2": 1 - float((residuals**2).sum()) / total if total > 0 else None,
+            "robust": robust,
+            "iterations": iterations,
+        }
+        return coefficients, stats
+
+    @staticmethod
+    def validate_name(name: str) -> None:
+        if not RetentionCalibration.NAME_PATTERN.match(name):
+            raise ValueError(
+                "Calibration names may only contain letters, digits, '.', '_' and '-' (max 64)"
+            )
+
+    @staticmethod
+    def _path(name: str) -> Path:
+        RetentionCalibration.validate_name(name)
+        return RetentionCalibration.BASE_DIR / f"{name}.json"
+
+    @staticmethod
+    def save(
+        name: str, coefficients, stats: Dict[str, Any], **extra: Any
+    ) -> Dict[str, Any]:
+        calibration = {
+            "name": name,
+            "coefficients": [float(c) for c in coefficients],
+            **stats,
+            **extra,
+            "created": time.time(),
+        }
+        path = RetentionCalibration._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(calibration, f, indent=2)
+        return calibration
+
+    @staticmethod
+    def load(name: str) -> Optional[Dict[str, Any]]:
+        path = RetentionCalibration._path(name)
+        if not path.exists():
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def list() -> List[Dict[str, Any]]:
+        if not RetentionCalibration.BASE_DIR.exists():
+            return []
+        calibrations = []
+        for path in sorted(RetentionCalibration.BASE_DIR.glob("*.json")):
+            with open(path, "r") as f:
+                calibrations.append(json.load(f))
+        return calibrations
+
+    @staticmethod
+    def delete(name: str) -> bool:
+        path = RetentionCalibration._path(name)
+        if not path.exists():
+            return False
+        path.unlink()
+        return True
@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import threading
+
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+from Bio import SeqIO
+from backend.logic.enzyme_digestion import EnzymeDigestion
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionIndex:
+    """
+    Precomputed retention predictions for the tryptic peptides of a reference proteome,
+    written once by the CLI below and memory-mapped by the server.
+
+    Layout of an index version:
+        peptides.bin              sorted peptide sequences, concatenated ASCII
+        offsets.npy               int64 (n + 1) start offsets into peptides.bin
+        smiles.bin, smiles_offsets.npy    SMILES, same order and layout
+        features.npy              float64 (n x 4): log_sum_aa, log_vdw_vol, clog_p, predicted_tr
+        meta.json                 model hash, digest settings, counts
+
+    Each build writes a new version subdirectory of the index directory and then points the
+    CURRENT file at it, so a server can keep mapping the old files while an index is rebuilt.
+    A directory without CURRENT holds a single version directly.
+
+    Lookups are a binary search over the mapped arrays: O(log n), no RDKit work.
+    """
+
+    INDEX_DIR = Path("data/retention_index")
+    FEATURES = ("log_sum_aa", "log_vdw_vol", "clog_p", "predicted_tr")
+    POINTER = "CURRENT"
+
+    _loaded = None
+    _load_lock = threading.Lock()
+
+    def __init__(self, directory: Path):
+        directory = RetentionIndex.resolve(directory)
+        with open(directory / "meta.json", "r") as f:
+            self.meta = json.load(f)
+        self.peptides = (
+            np.memmap(directory / "peptides.bin", dtype=np.uint8, mode="r")
+            if (directory / "peptides.bin").stat().st_size
+            else np.empty(0, dtype=np.uint8)
+        )
+        self.offsets = np.load(directory / "offsets.npy", mmap_mode="r")
+        self.smiles = (
+            np.memmap(directory / "smiles.bin", dtype=np.uint8, mode="r")
+            if (directory / "smiles.bin").stat().st_size
+            else np.empty(0, dtype=np.uint8)
+        )
+        self.smiles_offsets = np.load(directory / "smiles_offsets.npy", mmap_mode="r")
+        self.features = np.load(directory / "features.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _key(self, i: int) -> bytes:
+        return self.peptides[self.offsets[i] : self.offsets[i + 1]].tobytes()
+
+    def find(self, sequence: str) -> int:
+        """
+        Position of the peptide in the index, or -1.
+        """
+        target = sequence.encode("ascii", errors="replace")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self) and self._key(lo) == target else -1
+
+    def lookup(self, sequence: str) -> Optional[Dict[str, Any]]:
+        """
+        Stored prediction fields for an uncapped peptide sequence, or None.
+        """
+        i = self.find(sequence)
+        if i < 0:
+            return None
+        result = {
+            "smiles": self.smiles[self.smiles_offsets[i] : self.smiles_offsets[i + 1]]
+            .tobytes()
+            .decode("ascii")
+        }
+        result.update(zip(RetentionIndex.FEATURES, self.features[i].tolist()))
+        return result
+
+    @staticmethod
+    def resolve(directory: Path) -> Path:
+        """
+        The directory holding the current version's files.
+        """
+        directory = Path(directory)
+        pointer = directory / RetentionIndex.POINTER
+        if pointer.exists():
+            return directory / pointer.read_text().strip()
+        return directory
+
+    @staticmethod
+    def get(model_hash: str) -> Optional["RetentionIndex"]:
+        """
+        The current index under INDEX_DIR, mapped on first use and remapped when a rebuild
+        publishes a new version. None if there is none, or if it was built with a different
+        model than the predictor's.
+        """
+        try:
+            version = RetentionIndex.resolve(RetentionIndex.INDEX_DIR)
+            key = (version, (version / "meta.json").stat().st_mtime_ns)
+        except OSError:
+            key = None
+        loaded = RetentionIndex._loaded
+        if loaded is None or loaded[1] != key:
+            with RetentionIndex._load_lock:
+                loaded = RetentionIndex._loaded
+                if loaded is None or loaded[1] != key:
+                    index = None
+                    if key is not None:
+                        try:
+                            index = RetentionIndex(key[0])
+                        except Exception:
+                            # Not remembered, so the next request tries again.
+                            logger.exception("Error loading retention index %s", key[0])
+                            return None
+                    loaded = RetentionIndex._loaded = (index, key)
+        index = loaded[0]
+        if index is None or index.meta.get("model_hash") != model_hash:
+            return None
+        return index
+
+    @staticmethod
+    def write(
+        directory: Path, records: Dict[str, Dict[str, Any]], meta: Dict[str, Any]
+    ) -> Path:
+        """
+        Writes an index from {peptide: prediction result} records as a new version of the
+        index directory, makes it current and returns its path. Files of the replaced version
+        are unlinked, never rewritten, so a process still mapping them is unaffected.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        previous = (
+            RetentionIndex.resolve(directory)
+            if (directory / RetentionIndex.POINTER).exists()
+            else None
+        )
+        version = directory / f"v{time.time_ns()}"
+        version.mkdir()
+        keys = sorted(records, key=lambda peptide: peptide.encode("ascii"))
+
+        def write_strings(name, strings):
+            encoded = [s.encode("ascii") for s in strings]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(s) for s in encoded], out=offsets[1:])
+            with open(version / f"{name}.bin", "wb") as f:
+                f.write(b"".join(encoded))
+            return offsets
+
+        np.save(version / "offsets.npy", write_strings("peptides", keys))
+        np.save(
+            version / "smiles_offsets.npy",
+            write_strings("smiles", [records[k]["smiles"] for k in keys]),
+        )
+        features = np.array(
+            [[records[k][field] for field in RetentionIndex.FEATURES] for k in keys],
+            dtype=np.float64,
+        )
+        np.save(
+            version / "features.npy",
+            features.reshape(len(keys), len(RetentionIndex.FEATURES)),
+        )
+        with open(version / "meta.json", "w") as f:
+            json.dump({**meta, "count": len(keys), "created": time.time()}, f, indent=2)
+
+        pointer = directory / f"{RetentionIndex.POINTER}.{os.getpid()}.tmp"
+        pointer.write_text(version.name)
+        os.replace(pointer, directory / RetentionIndex.POINTER)
+        if previous is not None and previous != version:
+            shutil.rmtree(previous, ignore_errors=True)
+        return version
+
+    @staticmethod
+    def tryptic_peptides(
+        sequence: str,
+        missed_cleavages: int = 1,
+        min_length: int = 6,
+        max_length: int = 30,
+    ) -> Set[str]:
+        """
+        Trypsin digest (after K/R, not before P) with up to missed_cleavages missed sites.
+        """
+        return set(
+            EnzymeDigestion.digest(
+                [sequence], ("trypsin",), missed_cleavages, min_length, max_length
+            ).peptides()
+        )
+
+    @staticmethod
+    def digest_fasta(
+        paths: Iterable[str],
+        missed_cleavages: int,
+        min_length: int,
+        max_length: int,
+        enzymes: Iterable[str] = ("trypsin",),
+    ) -> List[str]:
+        sequences = [
+            str(record.seq) for path in paths for record in SeqIO.parse(path, "fasta")
+        ]
+        return EnzymeDigestion.digest(
+            sequences, enzymes, missed_cleavages, min_length, max_length
+        ).unique_peptides()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Build a retention-time index for the digested peptides of a reference proteome."
+    )
+    parser.add_argument("fasta", nargs="+", help="Proteome FASTA file(s)")
+    parser.add_argument(
+        "--enzyme",
+        action="append",
+        choices=sorted(EnzymeDigestion.ENZYMES),
+        help="Enzyme(s) to digest with; repeat for several (default: trypsin)",
+    )
+    parser.add_argument(
+        "--out",
+        default=str(RetentionIndex.INDEX_DIR),
+        help="Index directory (default: %(default)s)",
+    )
+    parser.add_argument("--missed-cleavages", type=int, default=1)
+    parser.add_argument("--min-length", type=int, default=6)
+    parser.add_argument("--max-length", type=int, default=30)
+    parser.add_argument(
+        "--timeout", type=float, default=None, help="Per-peptide time limit in seconds"
+    )
+    args = parser.parse_args(argv)
+
+    # Imported here so the server can read indexes without this module depending on the predictor.
+    from backend.logic.peptide_retention import PeptideRetentionPredictor
+
+    enzymes = args.enzyme or ["trypsin"]
+    peptides = RetentionIndex.digest_fasta(
+        args.fasta, args.missed_cleavages, args.min_length, args.max_length, enzymes
+    )
+    print(f"{len(peptides)} unique peptides", file=sys.stderr)
+
+    # Straight to the workers: going through predict_stream would also fill the prediction cache
+    # with every peptide of the proteome.
+    records = {}
+    failed = 0
+    results = PeptideRetentionPredictor._compute_full(
+        peptides,
+        PeptideRetentionPredictor.DEFAULT_CONFORMERS,
+        PeptideRetentionPredictor.DEFAULT_EMBED_ATTEMPTS,
+        args.timeout,
+    )
+    for done, (position, result) in enumerate(results, 1):
+        if "error" in result:
+            failed += 1
+        else:
+            records[peptides[position]] = result
+        if done % 1000 == 0:
+            print(f"{done}/{len(peptides)} predicted", file=sys.stderr)
+
+    RetentionIndex.write(
+        args.out,
+        records,
+        {
+            "model_hash": PeptideRetentionPredictor.model_hash(),
+            "proteome": [Path(path).name for path in args.fasta],
+            "enzyme": "+".join(enzymes),
+            "missed_cleavages": args.missed_cleavages,
+            "min_length": args.min_length,
+            "max_length": args.max_length,
+            "failed": failed,
+        },
+    )
+    print(
+        f"Wrote {len(records)} peptides to {args.out} ({failed} failed)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import random
+import threading
+
+import numpy as np
+from io import BytesIO
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from backend.utility.lazy_import import lazy_import
+from backend.utility.lru_cache import LRUCache
+
+Image = lazy_import("PIL.Image")
+ImageDraw = lazy_import("PIL.ImageDraw")
+ImageFont = lazy_import("PIL.ImageFont")
+
+
+class ProteinGraphRenderer:
+    """
+    Draws the proteolytic digestion "tube" graph: a funnel bounded by y < x^3 and
+    y < (7 - x)^3 on a 7 x 12 plot, split into one colored horizontal band per protein.
+
+    The funnel mask depends only on the image size, so it is computed once and cached.
+    Bands are whole pixel rows, so coloring is one row-palette lookup broadcast over the
+    mask. Labels are drawn with PIL, and the PNG is saved at the fastest zlib level: the
+    flat bands compress well either way.
+    """
+
+    WIDTH_OF_GRAPH = 7
+    HEIGHT_OF_GRAPH = 12
+    SIZE = (600, 600)
+    LABEL_X = (WIDTH_OF_GRAPH - 1) / 2
+    FONT = "DejaVuSans.ttf"  # found through FreeType's font search path
+
+    _masks: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+    _fonts: Dict[int, object] = {}
+    # Graph ID -> (names, seed, size), and the rendered PNGs of the most recent ones. Specs are
+    # small and kept much longer, so an evicted image is simply rendered again.
+    GRAPHS = LRUCache(maxsize=1024)
+    IMAGES = LRUCache(maxsize=64)
+    _lock = threading.Lock()
+
+    @staticmethod
+    def geometry(size: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (funnel mask of shape (height, width) as 0/1 uint32, plot y of each pixel row), cached per size.
+        """
+        geometry = ProteinGraphRenderer._masks.get(size)
+        if geometry is None:
+            width, height = size
+            x = (np.arange(width) + 0.5) / width * ProteinGraphRenderer.WIDTH_OF_GRAPH
+            # Row 0 is the top of the image, i.e. the ceiling of the plot.
+            y = (
+                1 - (np.arange(height) + 0.5) / height
+            ) * ProteinGraphRenderer.HEIGHT_OF_GRAPH
+            X, Y = x[None, :], y[:, None]
+            mask = (
+                (Y < X**3) & (Y < (ProteinGraphRenderer.WIDTH_OF_GRAPH - X) ** 3)
+            ).astype(np.uint32)
+            mask.setflags(write=False)
+            geometry = (mask, y)
+            with ProteinGraphRenderer._lock:
+                ProteinGraphRenderer._masks[size] = geometry
+        return geometry
+
+    @staticmethod
+    def font(size: int):
+        font = ProteinGraphRenderer._fonts.get(size)
+        if font is None:
+            try:
+                font = ImageFont.truetype(ProteinGraphRenderer.FONT, size)
+            except OSError:
+                font = ImageFont.load_default()
+            with ProteinGraphRenderer._lock:
+                ProteinGraphRenderer._fonts[size] = font
+        return font
+
+    @staticmethod
+    def band_colors(count: int, seed: Optional[int] = None) -> np.ndarray:
+        rng = random.Random(seed)
+        return np.array(
+            [[int(rng.random() * 255) for _ in range(3)] + [255] for _ in range(count)],
+            dtype=np.uint8,
+        )
+
+    @staticmethod
+    def render(
+        names: Sequence[str], seed: Optional[int] = None, size: Tuple[int, int] = SIZE
+    ) -> bytes:
+        """
+        PNG bytes of the graph with one band per name, first name at the bottom.
+        """
+        mask, y = ProteinGraphRenderer.geometry(tuple(size))
+        width, height = size
+        names: List[str] = list(names)
+
+        # Row palette: transparent outside the funnel, black funnel, one color per band and a
+        # black separator row wherever the band changes.
+        palette = np.zeros((height, 4), dtype=np.uint8)
+        palette[:, 3] = 255
+        if names:
+            spacing = ProteinGraphRenderer.HEIGHT_OF_GRAPH / len(names)
+            band = np.minimum((y // spacing).astype(np.int64), len(names) - 1)
+            palette[:] = ProteinGraphRenderer.band_colors(len(names), seed)[band]
+            palette[1:][band[1:] != band[:-1]] = (0, 0, 0, 255)
+
+        # One RGBA pixel is one uint32, so masking the row colors is a single multiply.
+        pixels = (
+            (palette.view(np.uint32) * mask).view(np.uint8).reshape(height, width, 4)
+        )
+        image = Image.fromarray(pixels, "RGBA")
+        draw = ImageDraw.Draw(image)
+
+        x_label = (
+            ProteinGraphRenderer.LABEL_X / ProteinGraphRenderer.WIDTH_OF_GRAPH * width
+        )
+
+        def to_row(plot_y: float) -> float:
+            return (1 - plot_y / ProteinGraphRenderer.HEIGHT_OF_GRAPH) * height
+
+        def label(text: str, size: int, x: float, y: float) -> None:
+            # Left edge at x, vertically centered on y; the fallback font has no anchors.
+            font = ProteinGraphRenderer.font(size)
+            _, top, _, bottom = draw.textbbox((0, 0), text, font=font)
+            draw.text(
+                (x, y - (top + bottom) / 2), text, fill=(255, 255, 255, 255), font=font
+            )
+
+        if not names:
+            label(
+                "EMPTY",
+                max(height // 25, 8),
+                3 / ProteinGraphRenderer.WIDTH_OF_GRAPH * width,
+                to_row(5),
+            )
+        else:
+            font_size = int(min(max(height / len(names) * 0.8, 6), height / 60))
+            for i, name in enumerate(names):
+                label(name, font_size, x_label, to_row((i + 0.5) * spacing))
+
+        buffer = BytesIO()
+        image.save(buffer, "PNG", compress_level=1)
+        return buffer.getvalue()
+
+    @staticmethod
+    def register(
+        names: Sequence[str], seed: int = 0, size: Tuple[int, int] = SIZE
+    ) -> str:
+        """
+        Content-addressed ID of the graph for this ordered name list, seed and size.
+        """
+        spec = (tuple(names), seed, tuple(size))
+        graph_id = LRUCache.make_key("protein-graph", *spec)
+        ProteinGraphRenderer.GRAPHS.put(graph_id, spec)
+        return graph_id
+
+    @staticmethod
+    def registered(graph_id: str) -> bool:
+        return ProteinGraphRenderer.GRAPHS.get(graph_id) is not None
+
+    @staticmethod
+    def image(graph_id: str) -> Optional[bytes]:
+        """
+        PNG of a registered graph, rendered on first request; None for unknown IDs.
+        """
+        spec = ProteinGraphRenderer.GRAPHS.get(graph_id)
+        if spec is None:
+            return None
+        return ProteinGraphRenderer.IMAGES.get_or_create(
+            graph_id, lambda: ProteinGraphRenderer.render(*spec)
+        )
@@ -0,0 +1,122 @@
+import re
+import os
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from backend.utility.lru_cache import LRUCache
+
+
+@dataclass
+class Proteome:
+    accessions: List[str]
+    descriptions: List[str]
+    sequences: List[str]
+
+    def __len__(self) -> int:
+        return len(self.sequences)
+
+
+class ProteomeStore:
+    """
+    Reference proteomes kept server-side as FASTA files under data/proteomes, so clients can
+    digest or search a whole proteome by name instead of uploading it with every request.
+    Parsed proteomes are cached in memory, keyed by file modification time.
+    """
+
+    BASE_DIR = Path("data/proteomes")
+    NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+    _cache = LRUCache(4)
+
+    @staticmethod
+    def parse_fasta(text: str) -> Proteome:
+        """
+        Accession (first word of the header), description and sequence of every record.
+        A plain line-based parser: a whole proteome parses in well under a second.
+        """
+        accessions, descriptions, sequences = [], [], []
+        for record in ("\n" + text).split("\n>")[1:]:
+            header, _, body = record.partition("\n")
+            header = header.strip()
+            sequence = "".join(body.split()).rstrip("*").upper()
+            if not header and not sequence:
+                continue
+            accessions.append(header.split(maxsplit=1)[0] if header else "")
+            descriptions.append(header)
+            sequences.append(sequence)
+        return Proteome(accessions, descriptions, sequences)
+
+    @staticmethod
+    def validate_name(name: str) -> None:
+        if not ProteomeStore.NAME_PATTERN.match(name):
+            raise ValueError(
+                "Proteome names may only contain letters, digits, '.', '_' and '-' (max 64)"
+            )
+
+    @staticmethod
+    def _path(name: str) -> Path:
+        ProteomeStore.validate_name(name)
+        return ProteomeStore.BASE_DIR / f"{name}.fasta"
+
+    @staticmethod
+    def save(name: str, content: str) -> Dict[str, Any]:
+        proteome = ProteomeStore.parse_fasta(content)
+        if not len(proteome):
+            raise ValueError("No FASTA records found")
+        path = ProteomeStore._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        return ProteomeStore.describe(name)
+
+    @staticmethod
+    def modified(name: str) -> Optional[int]:
+        """
+        Modification time of the stored file in ns, or None if there is none.
+        """
+        path = ProteomeStore._path(name)
+        return os.stat(path).st_mtime_ns if path.exists() else None
+
+    @staticmethod
+    def load(name: str) -> Optional[Proteome]:
+        modified = ProteomeStore.modified(name)
+        if modified is None:
+            return None
+        path = ProteomeStore._path(name)
+        key = (name, modified)
+        proteome = ProteomeStore._cache.get(key)
+        if proteome is None:
+            with open(path, "r") as f:
+                proteome = ProteomeStore.parse_fasta(f.read())
+            ProteomeStore._cache.put(key, proteome)
+        return proteome
+
+    @staticmethod
+    def describe(name: str) -> Optional[Dict[str, Any]]:
+        proteome = ProteomeStore.load(name)
+        if proteome is None:
+            return None
+        return {
+            "name": name,
+            "proteins": len(proteome),
+            "residues": sum(len(sequence) for sequence in proteome.sequences),
+        }
+
+    @staticmethod
+    def list() -> List[Dict[str, Any]]:
+        if not ProteomeStore.BASE_DIR.exists():
+            return []
+        return [
+            ProteomeStore.describe(path.stem)
+            for path in sorted(ProteomeStore.BASE_DIR.glob("*.fasta"))
+            if ProteomeStore.NAME_PATTERN.match(path.stem)
+        ]
+
+    @staticmethod
+    def delete(name: str) -> bool:
+        path = ProteomeStore._path(name)
+        if not path.exists():
+            return False
+        path.unlink()
+        return True
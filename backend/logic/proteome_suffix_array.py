@@ -0,0 +1,228 @@
+import numpy as np
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from backend.logic.proteome_store import Proteome
+from backend.utility.lru_cache import LRUCache
+
+
+class ProteomeSuffixArray:
+    """
+    Suffix array over the concatenated sequences of a proteome, for locating arbitrary
+    peptide substrings (tryptic or not) in every protein at once.
+
+    Proteins are joined with a separator that never matches a query residue, so matches
+    cannot span two proteins. The array is built by prefix doubling: suffixes are sorted on
+    their first 8 residues, then on pairs of k-ranks for k = 8, 16, 32, ...; only groups that
+    are still tied are re-sorted, so late rounds touch a small fraction of the proteome.
+    An exact query is two binary searches over the array (O(m log n)); the occurrences are
+    the contiguous range between them. One-mismatch queries use the pigeonhole principle:
+    one substitution leaves either half of the peptide intact, so the exact hits of both
+    halves give every candidate position, which is then verified residue by residue.
+    """
+
+    REGISTRY = LRUCache(maxsize=4)
+    SEPARATOR = b"\n"
+    PACKED = 8
+
+    def __init__(self, proteome: Proteome):
+        self.accessions = list(proteome.accessions)
+        encoded = [
+            sequence.upper().encode("ascii", errors="replace")
+            for sequence in proteome.sequences
+        ]
+        self.text = (
+            ProteomeSuffixArray.SEPARATOR.join(encoded) + ProteomeSuffixArray.SEPARATOR
+        )
+        # starts[i] is the offset of protein i in the text; the separator follows each protein.
+        self.starts = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(sequence) + 1 for sequence in encoded], out=self.starts[1:])
+        self.array = ProteomeSuffixArray.build_array(
+            np.frombuffer(self.text, dtype=np.uint8)
+        )
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    @staticmethod
+    def build_array(text: np.ndarray) -> np.ndarray:
+        """
+        Suffix array of a uint8 text, by prefix doubling from k = PACKED.
+
+        rank[p] is the index in the array of the first suffix of p's group, i.e. of the
+        suffixes sharing p's first k residues. `active` holds the array slots of groups with
+        more than one suffix; each round sorts them by (rank[p], rank[p + k]), which keeps
+        every group inside its slots, and splits the groups where the pair changes.
+        """
+        n = len(text)
+        # Start from the first PACKED residues of every suffix as one big-endian uint64 (zero past
+        # the end), which settles most suffixes of a proteome in the first sort.
+        padded = np.zeros(n + ProteomeSuffixArray.PACKED, dtype=np.uint64)
+        padded[:n] = text
+        values = np.zeros(n, dtype=np.uint64)
+        for i in range(ProteomeSuffixArray.PACKED):
+            values = (values << np.uint64(8)) | padded[i : i + n]
+        del padded
+        array = np.argsort(values).astype(np.int64)
+        rank = np.empty(n, dtype=np.int64)
+        values = values[array]
+        new_group = np.ones(n, dtype=bool)
+        new_group[1:] = values[1:] != values[:-1]
+        rank[array] = np.maximum.accumulate(np.where(new_group, np.arange(n), 0))
+        active = ProteomeSuffixArray._tied(new_group, np.arange(n))
+
+        k = ProteomeSuffixArray.PACKED
+        while len(active):
+            positions = array[active]
+            # Past the end of the text counts as the smallest residue.
+            following = np.full(len(positions), -1, dtype=np.int64)
+            inside = positions + k < n
+            following[inside] = rank[positions[inside] + k]
+            keys = rank[positions] * (n + 1) + following + 1
+            order = np.argsort(keys)
+            positions, keys = positions[order], keys[order]
+            array[active] = positions
+
+            # The first slot of every group moved or split here starts a group; a suffix's new
+            # rank is the last group start at or before its slot.
+            new_group = np.ones(len(active), dtype=bool)
+            new_group[1:] = keys[1:] != keys[:-1]
+            rank[positions] = np.maximum.accumulate(np.where(new_group, active, 0))
+            active = active[ProteomeSuffixArray._tied(new_group, active)]
+            k *= 2
+        return array
+
+    @staticmethod
+    def _tied(new_group: np.ndarray, slots: np.ndarray) -> np.ndarray:
+        """
+        Indices (into slots) of the members of groups with more than one suffix. A group
+        also ends where the slots stop being consecutive.
+        """
+        starts = new_group.copy()
+        starts[1:] |= slots[1:] != slots[:-1] + 1
+        ends = np.ones(len(slots), dtype=bool)
+        ends[:-1] = starts[1:]
+        return np.flatnonzero(~(starts & ends))
+
+    def _bounds(self, pattern: bytes) -> Tuple[int, int]:
+        """
+        [first, last) slots of the suffixes that start with the pattern.
+        """
+        text, m = self.text, len(pattern)
+
+        def prefix(position: int) -> bytes:
+            return text[position : position + m]
+
+        return bisect_left(self.array, pattern, key=prefix), bisect_right(
+            self.array, pattern, key=prefix
+        )
+
+    def occurrences(self, pattern: bytes) -> np.ndarray:
+        """
+        Sorted text offsets of every exact occurrence of the pattern.
+        """
+        if not pattern or ProteomeSuffixArray.SEPARATOR in pattern:
+            return np.zeros(0, dtype=np.int64)
+        first, last = self._bounds(pattern)
+        return np.sort(self.array[first:last])
+
+    def mismatch_occurrences(self, pattern: bytes) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (sorted text offsets, mismatch position or -1) of every occurrence with at most one
+        substituted residue.
+        """
+        m = len(pattern)
+        if m < 2:
+            # Any single residue is one substitution away.
+            raise ValueError(
+                "One-mismatch search needs peptides of at least 2 residues"
+            )
+        half = m // 2
+        candidates = np.unique(
+            np.concatenate(
+                (
+                    self.occurrences(pattern[:half]),
+                    self.occurrences(pattern[half:]) - half,
+                )
+            )
+        )
+        candidates = candidates[(candidates >= 0) & (candidates + m <= len(self.text))]
+
+        window = np.frombuffer(self.text, dtype=np.uint8)[
+            candidates[:, None] + np.arange(m)
+        ]
+        differs = window != np.frombuffer(pattern, dtype=np.uint8)
+        # Windows that run into a separator span two proteins (or the end of one), so they are
+        # dropped even when the separator is the only difference.
+        separator = ProteomeSuffixArray.SEPARATOR[0]
+        keep = (differs.sum(axis=1) <= 1) & (window != separator).all(axis=1)
+        candidates, differs = candidates[keep], differs[keep]
+        mismatch = np.where(differs.any(axis=1), differs.argmax(axis=1), -1)
+        return candidates, mismatch
+
+    def locate(self, offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (protein index, 1-based position) of text offsets.
+        """
+        protein = np.searchsorted(self.starts, offsets, side="right") - 1
+        return protein, offsets - self.starts[protein] + 1
+
+    def search(
+        self, peptides: Sequence[str], mismatches: int = 0, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Per peptide: the number of occurrences and up to `limit` of them, with protein and
+        1-based position (and, for mismatch search, the substituted position and residue).
+        """
+        if mismatches not in (0, 1):
+            raise ValueError("Only exact (0) or one-mismatch (1) search is supported")
+        results = []
+        for peptide in peptides:
+            pattern = peptide.upper().encode("ascii", errors="replace")
+            if mismatches:
+                offsets, mismatch = self.mismatch_occurrences(pattern)
+            else:
+                offsets = self.occurrences(pattern)
+                mismatch = np.full(len(offsets), -1)
+            shown = slice(None) if limit is None else slice(limit)
+            protein, position = self.locate(offsets[shown])
+
+            matches = []
+            for offset, p, pos, substituted in zip(
+                offsets[shown].tolist(),
+                protein.tolist(),
+                position.tolist(),
+                mismatch[shown].tolist(),
+            ):
+                match = {
+                    "protein": self.accessions[p],
+                    "protein_index": p,
+                    "position": pos,
+                }
+                if mismatches:
+                    match["mismatch"] = (
+                        None
+                        if substituted < 0
+                        else {
+                            "position": substituted + 1,
+                            "residue": chr(self.text[offset + substituted]),
+                        }
+                    )
+                matches.append(match)
+            results.append(
+                {"peptide": peptide, "count": len(offsets), "matches": matches}
+            )
+        return results
+
+    @staticmethod
+    def build(key_parts: Any, factory: Callable[[], "ProteomeSuffixArray"]) -> str:
+        """
+        Builds (or reuses) the suffix array identified by key_parts and registers it; returns its ID.
+        """
+        index_id = LRUCache.make_key("suffix-array", key_parts)
+        ProteomeSuffixArray.REGISTRY.get_or_create(index_id, factory)
+        return index_id
+
+    @staticmethod
+    def get(index_id: str) -> Optional["ProteomeSuffixArray"]:
+        return ProteomeSuffixArray.REGISTRY.get(index_id)
@@ -0,0 +1,172 @@
+import numpy as np
+from typing import Any, Dict, List, Tuple
+
+from backend.logic.two_de_simulation import Simulation_2de
+
+
+class CoMigrationDetector:
+    """
+    Finds 2DE spots that overlap on the finished gel and groups them into clusters.
+
+    Spots are boxes centred on their final (pI, MW) position, bandWidth wide and
+    spotHeight tall. Instead of testing every pair, spots are bucketed into grid rows one
+    spot-height tall, and a sort-and-sweep along x within each row (and between each row
+    and the next) yields the candidate pairs: O(n log n) plus the number of near pairs.
+    """
+
+    DEFAULT_BAND_WIDTH = 3.0
+    DEFAULT_SPOT_HEIGHT = 3.0
+
+    @staticmethod
+    def _sweep(keys, x, limit) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pairs (i, j) with equal key and |x_i - x_j| < limit, via sort by (key, x) and a
+        vectorized sweep over increasing offsets in sorted order.
+        """
+        n = len(keys)
+        order = np.lexsort((x, keys))
+        sorted_keys = keys[order]
+        sorted_x = x[order]
+
+        firsts = []
+        seconds = []
+        active = np.arange(n - 1)
+        offset = 1
+        while active.size:
+            partner = active + offset
+            in_range = partner < n
+            active = active[in_range]
+            partner = partner[in_range]
+            near = (sorted_keys[partner] == sorted_keys[active]) & (
+                sorted_x[partner] - sorted_x[active] < limit
+            )
+            active = active[near]
+            firsts.append(order[active])
+            seconds.append(order[partner[near]])
+            offset += 1
+
+        if not firsts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(firsts), np.concatenate(seconds)
+
+    @staticmethod
+    def overlapping_pairs(x, y, widths, heights) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        All pairs of overlapping boxes, each unordered pair once.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        widths = np.asarray(widths, dtype=float)
+        heights = np.asarray(heights, dtype=float)
+        n = len(x)
+        if n < 2:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        row_height = max(float(heights.max()), 1e-9)
+        x_limit = float(widths.max())
+        rows = np.floor((y - y.min()) / row_height).astype(np.int64)
+
+        # Same row, then each row against the next one (shifted down a row and kept only
+        # when the pair mixes a shifted and an unshifted spot).
+        same_a, same_b = CoMigrationDetector._sweep(rows, x, x_limit)
+        ids = np.concatenate([np.arange(n), np.arange(n)])
+        shifted = np.concatenate([np.zeros(n, dtype=bool), np.ones(n, dtype=bool)])
+        cross_a, cross_b = CoMigrationDetector._sweep(
+            np.concatenate([rows, rows - 1]), np.concatenate([x, x]), x_limit
+        )
+        mixed = shifted[cross_a] != shifted[cross_b]
+
+        a = np.concatenate([same_a, ids[cross_a[mixed]]])
+        b = np.concatenate([same_b, ids[cross_b[mixed]]])
+        overlap = (np.abs(x[a] - x[b]) < (widths[a] + widths[b]) / 2) & (
+            np.abs(y[a] - y[b]) < (heights[a] + heights[b]) / 2
+        )
+        return a[overlap], b[overlap]
+
+    @staticmethod
+    def connected_labels(n: int, a, b) -> np.ndarray:
+        """
+        Connected-component label (smallest member index) for every node, given edges a-b.
+        Min-label propagation with pointer jumping, fully vectorized.
+        """
+        labels = np.arange(n)
+        if len(a) == 0:
+            return labels
+        while True:
+            lowest = np.minimum(labels[a], labels[b])
+            updated = labels.copy()
+            np.minimum.at(updated, a, lowest)
+            np.minimum.at(updated, b, lowest)
+            updated = updated[updated]
+            if np.array_equal(updated, labels):
+                return labels
+            labels = updated
+
+    @staticmethod
+    def find_clusters(
+        proteins,
+        ph_range,
+        canvas_width,
+        canvas_height,
+        acrylamide_percentage=7.5,
+        y_axis_mode="mw",
+        band_width=DEFAULT_BAND_WIDTH,
+        spot_height=DEFAULT_SPOT_HEIGHT,
+    ) -> Dict[str, Any]:
+        """
+        Clusters of proteins whose spots overlap at their final gel positions.
+        A protein's own 'bandWidth' overrides the default band width.
+        """
+        x, y = Simulation_2de.get_spot_positions(
+            proteins,
+            ph_range,
+            canvas_width,
+            canvas_height,
+            acrylamide_percentage,
+            y_axis_mode,
+        )
+        widths = np.array(
+            [p.get("bandWidth", band_width) for p in proteins], dtype=float
+        )
+        heights = np.full(len(proteins), float(spot_height))
+
+        a, b = CoMigrationDetector.overlapping_pairs(x, y, widths, heights)
+        labels = CoMigrationDetector.connected_labels(len(proteins), a, b)
+
+        roots, inverse, sizes = np.unique(
+            labels, return_inverse=True, return_counts=True
+        )
+        multi = sizes > 1
+        cluster_ids = np.full(len(roots), -1)
+        ranked = np.argsort(-sizes[multi], kind="stable")
+        cluster_ids[np.nonzero(multi)[0][ranked]] = np.arange(int(multi.sum()))
+        membership = cluster_ids[inverse]
+
+        clusters: List[Dict[str, Any]] = []
+        if multi.any():
+            order = np.argsort(membership, kind="stable")
+            order = order[membership[order] >= 0]
+            bounds = np.searchsorted(membership[order], np.arange(int(multi.sum()) + 1))
+            for cluster_id in range(int(multi.sum())):
+                members = order[bounds[cluster_id] : bounds[cluster_id + 1]]
+                clusters.append(
+                    {
+                        "clusterId": cluster_id,
+                        "size": int(members.size),
+                        "members": members.tolist(),
+                        "names": [proteins[i].get("name") for i in members],
+                        "x": float(x[members].mean()),
+                        "y": float(y[members].mean()),
+                    }
+                )
+
+        return {
+            "counts": {
+                "proteins": len(proteins),
+                "overlappingPairs": int(len(a)),
+                "clusters": len(clusters),
+                "clustered": int(sum(cluster["size"] for cluster in clusters)),
+            },
+            "clusters": clusters,
+            "membership": [None if m < 0 else int(m) for m in membership.tolist()],
+        }
@@ -0,0 +1,101 @@
+import time
+import uuid
+import threading
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class TwoDESession:
+    session_id: str
+    proteins: List[Dict[str, Any]]
+    last_access: float = field(default_factory=time.monotonic)
+    ief_final: Optional[List[Dict[str, Any]]] = None
+
+
+class TwoDESessionStore:
+    """
+    Server-side 2DE sessions, so IEF and SDS can run on proteins parsed earlier
+    without the client posting the whole protein list (sequences included) every time.
+    Sessions expire TTL_SECONDS after their last use; the least recently used are
+    dropped first once MAX_SESSIONS is reached.
+    """
+
+    TTL_SECONDS = 30 * 60
+    MAX_SESSIONS = 256
+    # Left out of session frames: clients already have them, and every frame would repeat them.
+    FRAME_EXCLUDED_FIELDS = ("sequence",)
+
+    _sessions: Dict[str, TwoDESession] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _evict(cls, now: float) -> None:
+        expired = [
+            sid
+            for sid, session in cls._sessions.items()
+            if now - session.last_access > cls.TTL_SECONDS
+        ]
+        for sid in expired:
+            del cls._sessions[sid]
+
+        while len(cls._sessions) >= cls.MAX_SESSIONS:
+            oldest = min(
+                cls._sessions.values(), key=lambda session: session.last_access
+            )
+            del cls._sessions[oldest.session_id]
+
+    @classmethod
+    def create(cls, proteins: List[Dict[str, Any]]) -> str:
+        now = time.monotonic()
+        session = TwoDESession(
+            session_id=uuid.uuid4().hex, proteins=proteins, last_access=now
+        )
+        with cls._lock:
+            cls._evict(now)
+            cls._sessions[session.session_id] = session
+        return session.session_id
+
+    @classmethod
+    def get(cls, session_id: str) -> Optional[TwoDESession]:
+        now = time.monotonic()
+        with cls._lock:
+            session = cls._sessions.get(session_id)
+            if session is None:
+                return None
+            if now - session.last_access > cls.TTL_SECONDS:
+                del cls._sessions[session_id]
+                return None
+            session.last_access = now
+            return session
+
+    @classmethod
+    def delete(cls, session_id: str) -> bool:
+        with cls._lock:
+            return cls._sessions.pop(session_id, None) is not None
+
+    @classmethod
+    def describe(cls, session: TwoDESession) -> Dict[str, Any]:
+        return {
+            "sessionId": session.session_id,
+            "proteinCount": len(session.proteins),
+            "hasIef": session.ief_final is not None,
+            "expiresIn": max(
+                0.0, cls.TTL_SECONDS - (time.monotonic() - session.last_access)
+            ),
+        }
+
+    @classmethod
+    def frame_proteins(cls, session: TwoDESession) -> List[Dict[str, Any]]:
+        """
+        The session's proteins without FRAME_EXCLUDED_FIELDS, in the same order, for simulating.
+        """
+        return [
+            {
+                key: value
+                for key, value in protein.items()
+                if key not in cls.FRAME_EXCLUDED_FIELDS
+            }
+            for protein in session.proteins
+        ]
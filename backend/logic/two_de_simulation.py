@@ -1,12 +1,16 @@
 import math
+import os
 import re
+import threading
 
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from io import StringIO
 from typing import Any, Dict, List
 from Bio.SeqUtils.ProtParam import ProteinAnalysis
 from Bio import SeqIO
 from backend.utility.protein import Protein
+from backend.utility.lru_cache import LRUCache
 
 
 class Simulation_2de():
@@ -14,24 +18,48 @@ class Simulation_2de():
         '#FF0000', '#00FF00', '#0000FF', '#FFFF00', '#FF00FF', '#00FFFF',
         '#FFA500', '#800080', '#008000', '#FFC0CB', '#A52A2A', '#808080'
     ]
+    IEF_CACHE = LRUCache(maxsize=32)
+    PARSE_WORKERS = min(4, os.cpu_count() or 1)
+    _parse_pool = None
+    _parse_pool_lock = threading.Lock()
 
     @staticmethod
-    def simulate_ief(proteins, ph_range, canvas_width, canvas_height, steps=25):
+    def simulate_ief(proteins, ph_range, canvas_width, canvas_height, steps=25, seed=None):
+        """
+        Eases every protein from a random start position toward its pH position.
+        With a seed the run is reproducible, and its frames are served from IEF_CACHE
+        (keyed by protein set, pH range, canvas size, seed and steps) on repeat requests.
+        Cached frames are shared between callers and must not be mutated.
+        """
+        if seed is None:
+            return Simulation_2de._run_ief(proteins, ph_range, canvas_width, canvas_height, steps, np.random.default_rng())
+
+        key = LRUCache.make_key('ief', proteins, ph_range, canvas_width, canvas_height, seed, steps)
+        return Simulation_2de.IEF_CACHE.get_or_create(
+            key,
+            lambda: Simulation_2de._run_ief(proteins, ph_range, canvas_width, canvas_height, steps, np.random.default_rng(seed)),
+        )
+
+
+    @staticmethod
+    def _run_ief(proteins, ph_range, canvas_width, canvas_height, steps, rng):
         min_ph = ph_range['min']
         max_ph = ph_range['max']
         simulation_results = []
+        start_xs = rng.uniform(50, canvas_width - 50, len(proteins))
+        spread_ys = rng.uniform(50, 70, len(proteins))
 
         for step in range(steps + 1):
             progress = step / steps
             step_results = []
-            for protein in proteins:
+            for i, protein in enumerate(proteins):
                 protein_data = protein.copy()
                 clampedPH = min(max(protein['pH'], min_ph), max_ph)
                 targetX = Simulation_2de.get_ph_position(clampedPH, canvas_width, min_ph, max_ph)
 
                 if step == 0:
-                    startX = np.random.uniform(50, canvas_width - 50)
-                    spreadY = np.random.uniform(50, 70)
+                    startX = float(start_xs[i])
+                    spreadY = float(spread_ys[i])
                     protein_data.update({
                         'x': startX,
                         'y': spreadY,
@@ -40,7 +68,7 @@ class Simulation_2de():
                         'settled': False
                     })
                 else:
-                    prev_data = simulation_results[step - 1][proteins.index(protein)]
+                    prev_data = simulation_results[step - 1][i]
                     dx = targetX - prev_data['x']
                     newX = prev_data['x'] + dx * (0.1 + progress * 0.2)
                     newBandWidth = max(3, prev_data['bandWidth'] * (1 - progress * 0.8))
@@ -134,6 +162,19 @@ class Simulation_2de():
 
             new_proteins.append(protein_info.copy())
         
+    @staticmethod
+    def get_parse_pool() -> ProcessPoolExecutor:
+        """
+        Shared process pool for parse_fasta_content, started on first use.
+        MW and pI computation are CPU-bound, so uploads are analyzed off the event loop.
+        """
+        if Simulation_2de._parse_pool is None:
+            with Simulation_2de._parse_pool_lock:
+                if Simulation_2de._parse_pool is None:
+                    Simulation_2de._parse_pool = ProcessPoolExecutor(max_workers=Simulation_2de.PARSE_WORKERS)
+        return Simulation_2de._parse_pool
+
+
     @staticmethod
     def parse_fasta_content(content: str) -> List[Dict[str, Any]]:
         sequences = []
@@ -183,6 +224,36 @@ class Simulation_2de():
         distance = max_distance_traveled * (1 - normalized_mw) * acrylamide_factor
         return 170 + (distance / (max_distance_traveled * acrylamide_factor)) * (canvas_height - 220)
 
+
+    @staticmethod
+    def get_spot_positions(proteins, ph_range, canvas_width, canvas_height, acrylamide_percentage=7.5, y_axis_mode='mw'):
+        """
+        Vectorized final (x, y) spot coordinates for a whole gel.
+        Matches get_ph_position and the SDS targets of simulate_sds (MW range taken from
+        the protein set, same 600px clamp), but computed for every protein at once.
+        """
+        min_ph = ph_range['min']
+        max_ph = ph_range['max']
+        ph = np.clip(np.array([p['pH'] for p in proteins], dtype=float), min_ph, max_ph)
+        x = 50 + ((ph - min_ph) / (max_ph - min_ph)) * (canvas_width - 100)
+
+        mws = np.array([p['mw'] for p in proteins], dtype=float)
+        if mws.size == 0:
+            return x, np.empty(0)
+
+        log_min = math.log10(mws.min())
+        log_max = math.log10(mws.max())
+        span = (log_max - log_min) or 1.0
+        log_mw = np.log10(mws)
+
+        if y_axis_mode == 'mw':
+            acrylamide_factor = 1 + (acrylamide_percentage - 7.5) / 15
+            y = 170 + ((log_max - log_mw) / span) * (canvas_height - 220) * acrylamide_factor
+        else:
+            y = 170 + (1 - (log_mw - log_min) / span) * (canvas_height - 220)
+
+        return x, np.minimum(y, 600)
+
 if (__name__ == '__main__'):
     print(Simulation_2de().parse_fasta_content("tests\data\singleProtein.fasta"))
     
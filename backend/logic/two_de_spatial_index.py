@@ -0,0 +1,211 @@
+import math
+
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+from backend.logic.two_de_simulation import Simulation_2de
+from backend.utility.lru_cache import LRUCache
+
+
+class GelSpatialIndex:
+    """
+    Uniform-grid index over the final spot coordinates of a 2DE gel.
+
+    Points are bucketed into square cells and stored cell-by-cell (CSR layout), so a
+    rectangle of cells in one grid row is a single contiguous slice of `order`.
+    Cell size is chosen for a couple of spots per cell, which keeps nearest, radius and
+    rectangle lookups at a handful of cells per query instead of a scan of every spot.
+    """
+
+    REGISTRY = LRUCache(maxsize=16)
+    SPOTS_PER_CELL = 2
+
+    def __init__(
+        self,
+        x,
+        y,
+        spots: Optional[List[Dict[str, Any]]] = None,
+        cell_size: Optional[float] = None,
+    ):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.spots = spots if spots is not None else [{} for _ in range(self.x.size)]
+
+        n = self.x.size
+        self.x0 = float(self.x.min()) if n else 0.0
+        self.y0 = float(self.y.min()) if n else 0.0
+        width = max(float(self.x.max()) - self.x0, 1.0) if n else 1.0
+        height = max(float(self.y.max()) - self.y0, 1.0) if n else 1.0
+
+        if cell_size is None:
+            cell_size = math.sqrt(
+                width * height * GelSpatialIndex.SPOTS_PER_CELL / max(n, 1)
+            )
+        self.cell_size = max(cell_size, 1e-6)
+        self.cols = int(width // self.cell_size) + 1
+        self.rows = int(height // self.cell_size) + 1
+
+        cell_ids = self._cell_y(self.y) * self.cols + self._cell_x(self.x)
+        self.order = np.argsort(cell_ids, kind="stable")
+        self.cell_start = np.searchsorted(
+            cell_ids[self.order], np.arange(self.rows * self.cols + 1)
+        )
+
+    def _cell_x(self, x):
+        return np.clip(
+            np.floor((np.asarray(x) - self.x0) / self.cell_size).astype(np.int64),
+            0,
+            self.cols - 1,
+        )
+
+    def _cell_y(self, y):
+        return np.clip(
+            np.floor((np.asarray(y) - self.y0) / self.cell_size).astype(np.int64),
+            0,
+            self.rows - 1,
+        )
+
+    def _block(self, cx0: int, cy0: int, cx1: int, cy1: int) -> np.ndarray:
+        """
+        Point indices in the inclusive cell block, one contiguous slice per grid row.
+        """
+        starts = self.cell_start[np.arange(cy0, cy1 + 1) * self.cols + cx0]
+        ends = self.cell_start[np.arange(cy0, cy1 + 1) * self.cols + cx1 + 1]
+        if len(starts) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.order[s:e] for s, e in zip(starts, ends)])
+
+    def _block_count(self, cx0: int, cy0: int, cx1: int, cy1: int) -> int:
+        rows = np.arange(cy0, cy1 + 1) * self.cols
+        return int(
+            (self.cell_start[rows + cx1 + 1] - self.cell_start[rows + cx0]).sum()
+        )
+
+    def rect(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """
+        Indices of spots inside the rectangle (inclusive), in index order.
+        """
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        if self.x.size == 0 or x1 < self.x0 or y1 < self.y0:
+            return np.empty(0, dtype=np.int64)
+
+        candidates = self._block(
+            int(self._cell_x(x0)),
+            int(self._cell_y(y0)),
+            int(self._cell_x(x1)),
+            int(self._cell_y(y1)),
+        )
+        cx = self.x[candidates]
+        cy = self.y[candidates]
+        hits = candidates[(cx >= x0) & (cx <= x1) & (cy >= y0) & (cy <= y1)]
+        return np.sort(hits)
+
+    def radius(self, x: float, y: float, r: float) -> np.ndarray:
+        """
+        Indices of spots within distance r of (x, y), nearest first.
+        """
+        return self._within(x, y, r, r * r)
+
+    def _within(self, x: float, y: float, r: float, r2: float) -> np.ndarray:
+        candidates = self.rect(x - r, y - r, x + r, y + r)
+        dist2 = (self.x[candidates] - x) ** 2 + (self.y[candidates] - y) ** 2
+        inside = dist2 <= r2
+        candidates = candidates[inside]
+        return candidates[np.argsort(dist2[inside], kind="stable")]
+
+    def nearest(
+        self, x: float, y: float, k: int = 1, max_distance: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        Indices of the k spots nearest to (x, y), nearest first.
+
+        Grows a block of cells around the query until it holds k spots; the k-th nearest of
+        those bounds the answer, so one radius query of that size is exact.
+        """
+        n = self.x.size
+        k = min(k, n)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+
+        cx = int(self._cell_x(x))
+        cy = int(self._cell_y(y))
+        ring = 0
+        while True:
+            block = (
+                max(cx - ring, 0),
+                max(cy - ring, 0),
+                min(cx + ring, self.cols - 1),
+                min(cy + ring, self.rows - 1),
+            )
+            if self._block_count(*block) >= k:
+                break
+            ring += 1
+
+        candidates = self._block(*block)
+        dist2 = (self.x[candidates] - x) ** 2 + (self.y[candidates] - y) ** 2
+        bound2 = float(np.partition(dist2, k - 1)[k - 1])
+        if max_distance is not None and max_distance * max_distance < bound2:
+            return self.radius(x, y, max_distance)[:k]
+
+        return self._within(x, y, math.sqrt(bound2) * (1 + 1e-9), bound2)[:k]
+
+    def spots_for(self, indices) -> List[Dict[str, Any]]:
+        return [
+            {
+                **self.spots[i],
+                "index": int(i),
+                "x": float(self.x[i]),
+                "y": float(self.y[i]),
+            }
+            for i in indices
+        ]
+
+    @staticmethod
+    def build_for_gel(
+        proteins,
+        ph_range,
+        canvas_width,
+        canvas_height,
+        acrylamide_percentage=7.5,
+        y_axis_mode="mw",
+    ) -> str:
+        """
+        Indexes the final spot positions of a gel and registers it; returns the index ID.
+        Sequences are dropped from the stored spots to keep query responses small.
+        """
+        index_id = LRUCache.make_key(
+            "spatial-index",
+            proteins,
+            ph_range,
+            canvas_width,
+            canvas_height,
+            acrylamide_percentage,
+            y_axis_mode,
+        )
+
+        def build():
+            x, y = Simulation_2de.get_spot_positions(
+                proteins,
+                ph_range,
+                canvas_width,
+                canvas_height,
+                acrylamide_percentage,
+                y_axis_mode,
+            )
+            spots = [
+                {
+                    key: value
+                    for key, value in p.items()
+                    if key not in ("sequence", "x", "y")
+                }
+                for p in proteins
+            ]
+            return GelSpatialIndex(x, y, spots)
+
+        GelSpatialIndex.REGISTRY.get_or_create(index_id, build)
+        return index_id
+
+    @staticmethod
+    def get(index_id: str) -> Optional["GelSpatialIndex"]:
+        return GelSpatialIndex.REGISTRY.get(index_id)
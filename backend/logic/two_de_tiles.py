@@ -0,0 +1,204 @@
+import math
+import threading
+
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+from backend.logic.two_de_simulation import Simulation_2de
+from backend.logic.two_de_rendering import GelDensityRenderer
+from backend.logic.two_de_spatial_index import GelSpatialIndex
+from backend.utility.lru_cache import LRUCache
+
+
+class GelTilePyramid:
+    """
+    Deep-zoom tile pyramid of a simulated 2DE gel.
+
+    Level 0 fits the whole gel in one tile; each further level doubles the resolution.
+    Tiles are rendered on first request from just the spots near the tile (found through
+    the gel's spatial index) and cached, so a client only ever pays for the tiles in view.
+    """
+
+    TILE_SIZE = 256
+    ZOOM_BEYOND_CANVAS = 2  # levels past 1 tile pixel per canvas pixel
+    REGISTRY = LRUCache(maxsize=8)
+    TILES_PER_PYRAMID = 512
+    PEAK_RESOLUTION = (
+        2048  # longest side, in pixels, of the grid the peak density is measured on
+    )
+
+    def __init__(
+        self,
+        x,
+        y,
+        weights,
+        canvas_width: float,
+        canvas_height: float,
+        sigma_x: float = 3.0,
+        sigma_y: float = 3.0,
+    ):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.weights = np.asarray(weights, dtype=float)
+        self.width = float(canvas_width)
+        self.height = float(canvas_height)
+        self.sigma_x = sigma_x
+        self.sigma_y = sigma_y
+        self.index = GelSpatialIndex(self.x, self.y)
+        self.tiles = LRUCache(maxsize=GelTilePyramid.TILES_PER_PYRAMID)
+
+        self.base_scale = GelTilePyramid.TILE_SIZE / max(self.width, self.height)
+        self.max_level = (
+            max(0, math.ceil(math.log2(1 / self.base_scale)))
+            + GelTilePyramid.ZOOM_BEYOND_CANVAS
+        )
+        self._peak_density = None
+        self._peak_lock = threading.Lock()
+
+    @property
+    def peak_density(self) -> float:
+        """
+        Peak spot density per canvas px^2, so every tile at every level shares one gray scale.
+        Measured when the first tile is rendered, on a grid of at most PEAK_RESOLUTION pixels a side.
+        """
+        if self._peak_density is None:
+            with self._peak_lock:
+                if self._peak_density is None:
+                    scale = min(
+                        1.0,
+                        GelTilePyramid.PEAK_RESOLUTION / max(self.width, self.height),
+                    )
+                    grid = GelDensityRenderer.render(
+                        self.x,
+                        self.y,
+                        (0, 0, self.width, self.height),
+                        (
+                            max(1, int(self.height * scale)),
+                            max(1, int(self.width * scale)),
+                        ),
+                        self.sigma_x,
+                        self.sigma_y,
+                        self.weights,
+                    )
+                    # One grid pixel covers 1 / scale^2 canvas px^2.
+                    self._peak_density = float(grid.max(initial=0.0)) * scale**2
+        return self._peak_density
+
+    def scale(self, level: int) -> float:
+        return self.base_scale * 2**level
+
+    def level_info(self, level: int) -> Dict[str, Any]:
+        scale = self.scale(level)
+        width = int(math.ceil(self.width * scale))
+        height = int(math.ceil(self.height * scale))
+        return {
+            "level": level,
+            "scale": scale,
+            "width": width,
+            "height": height,
+            "cols": int(math.ceil(width / GelTilePyramid.TILE_SIZE)),
+            "rows": int(math.ceil(height / GelTilePyramid.TILE_SIZE)),
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "tileSize": GelTilePyramid.TILE_SIZE,
+            "width": self.width,
+            "height": self.height,
+            "levels": [self.level_info(level) for level in range(self.max_level + 1)],
+        }
+
+    def contains(self, level: int, col: int, row: int) -> bool:
+        if level < 0 or level > self.max_level:
+            return False
+        info = self.level_info(level)
+        return 0 <= col < info["cols"] and 0 <= row < info["rows"]
+
+    def tile(self, level: int, col: int, row: int, fmt: str = "png") -> Optional[bytes]:
+        """
+        Encoded tile image, or None when the tile is outside the pyramid.
+        Edge tiles are cropped to the gel boundary.
+        """
+        if fmt not in GelDensityRenderer.IMAGE_FORMATS or not self.contains(
+            level, col, row
+        ):
+            return None
+
+        info = self.level_info(level)
+        return self.tiles.get_or_create(
+            (level, col, row, fmt), lambda: self._render_tile(info, col, row, fmt)
+        )
+
+    def _render_tile(self, info: Dict[str, Any], col: int, row: int, fmt: str) -> bytes:
+        size = GelTilePyramid.TILE_SIZE
+        scale = info["scale"]
+        cols = min(size, info["width"] - col * size)
+        rows = min(size, info["height"] - row * size)
+        x0 = col * size / scale
+        y0 = row * size / scale
+        x1 = x0 + cols / scale
+        y1 = y0 + rows / scale
+
+        margin = 4 * max(self.sigma_x, self.sigma_y) + 1 / scale
+        nearby = self.index.rect(x0 - margin, y0 - margin, x1 + margin, y1 + margin)
+        density = GelDensityRenderer.render(
+            self.x[nearby],
+            self.y[nearby],
+            (x0, y0, x1, y1),
+            (rows, cols),
+            self.sigma_x,
+            self.sigma_y,
+            self.weights[nearby],
+        )
+
+        # Density is mass per tile pixel; one tile pixel covers 1 / scale^2 canvas px^2.
+        return GelDensityRenderer.to_image_bytes(
+            density, fmt, vmax=self.peak_density / scale**2
+        )
+
+    @staticmethod
+    def build_for_gel(
+        proteins,
+        ph_range,
+        canvas_width,
+        canvas_height,
+        acrylamide_percentage=7.5,
+        y_axis_mode="mw",
+        sigma_x=3.0,
+        sigma_y=3.0,
+    ) -> Tuple[str, "GelTilePyramid"]:
+        """
+        Registers a pyramid for the finished gel and returns its ID and the pyramid.
+        The ID is a content hash, so tiles under it never change and can be cached forever.
+        """
+        pyramid_id = LRUCache.make_key(
+            "tiles",
+            proteins,
+            ph_range,
+            canvas_width,
+            canvas_height,
+            acrylamide_percentage,
+            y_axis_mode,
+            sigma_x,
+            sigma_y,
+        )
+
+        def build():
+            x, y = Simulation_2de.get_spot_positions(
+                proteins,
+                ph_range,
+                canvas_width,
+                canvas_height,
+                acrylamide_percentage,
+                y_axis_mode,
+            )
+            weights = [p.get("intensity", 1.0) for p in proteins]
+            return GelTilePyramid(
+                x, y, weights, canvas_width, canvas_height, sigma_x, sigma_y
+            )
+
+        return pyramid_id, GelTilePyramid.REGISTRY.get_or_create(pyramid_id, build)
+
+    @staticmethod
+    def get(pyramid_id: str) -> Optional["GelTilePyramid"]:
+        return GelTilePyramid.REGISTRY.get(pyramid_id)
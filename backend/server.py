@@ -9,6 +9,7 @@ import backend.api.two_de_routes as two_de_routes
 import backend.api.artifact_routes as artifact_routes
 import backend.api.peptide_retention_routes as peptide_retention_routes
 import backend.api.proteolytic_digestion_routes as proteolytic_digestion_routes
+import backend.api.lcms_routes as lcms_routes
 import backend.api.ion_exchange_fractionation_routes as ion_exchange_fractionation_routes
 import backend.api.size_exclusion as size_exclusion_routes
 import backend.api.hydrophobic_interaction_fractionation_routes as hydrophobic_interaction_fractionation_routes
@@ -54,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id", "X-Graph-Id"],
 )
 
 # Routers
@@ -64,6 +66,7 @@ app.include_router(two_de_routes.router)
 app.include_router(artifact_routes.router)
 app.include_router(peptide_retention_routes.router)
 app.include_router(proteolytic_digestion_routes.router)
+app.include_router(lcms_routes.router)
 app.include_router(ion_exchange_fractionation_routes.router)
 app.include_router(size_exclusion_routes.router)
 app.include_router(hydrophobic_interaction_fractionation_routes.router)
@@ -1,6 +1,12 @@
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from fastapi.testclient import TestClient
 
 from backend.logic.two_de_simulation import Simulation_2de
+from backend.server import app
 
 
 class Test2dSimulation(unittest.TestCase):
@@ -41,5 +47,125 @@ class Test2dSimulation(unittest.TestCase):
         }
         self.assertEqual(expected_keys, achual_keys)
 
+    def test_simulate_ief_is_reproducible_with_seed(self):
+        """The same seed should give identical frames, served from the frame cache on repeat"""
+        proteins = [
+            {"name": "a", "pH": 5.0, "mw": 20000.0},
+            {"name": "b", "pH": 8.5, "mw": 60000.0},
+        ]
+        first = Simulation_2de.simulate_ief(
+            proteins, {"min": 3, "max": 10}, 800, 600, steps=10, seed=42
+        )
+        second = Simulation_2de.simulate_ief(
+            proteins, {"min": 3, "max": 10}, 800, 600, steps=10, seed=42
+        )
+        uncached = Simulation_2de._run_ief(
+            proteins, {"min": 3, "max": 10}, 800, 600, 10, np.random.default_rng(42)
+        )
+        self.assertIs(first, second)
+        self.assertEqual(first, uncached)
+        self.assertEqual(len(first), 11)
+
+    def test_simulate_ief_differs_between_seeds(self):
+        proteins = [{"name": "a", "pH": 5.0, "mw": 20000.0}]
+        first = Simulation_2de.simulate_ief(
+            proteins, {"min": 3, "max": 10}, 800, 600, seed=1
+        )
+        second = Simulation_2de.simulate_ief(
+            proteins, {"min": 3, "max": 10}, 800, 600, seed=2
+        )
+        self.assertNotEqual(first[0][0]["x"], second[0][0]["x"])
+
+    def test_parse_pool_is_created_once(self):
+        previous = Simulation_2de._parse_pool
+        Simulation_2de._parse_pool = None
+        barrier = threading.Barrier(8)
+
+        def first_use():
+            barrier.wait()
+            return Simulation_2de.get_parse_pool()
+
+        try:
+            with ThreadPoolExecutor(8) as threads:
+                pools = list(threads.map(lambda _: first_use(), range(8)))
+            self.assertEqual(len({id(pool) for pool in pools}), 1)
+        finally:
+            Simulation_2de._parse_pool.shutdown()
+            Simulation_2de._parse_pool = previous
+
+    def test_parse_fasta_route_uses_worker_processes(self):
+        """Files analyzed in the pool come back in upload order and match an in-process parse"""
+        files = [
+            ">sp|P1|A_HUMAN First\nMKTAYIAKQR\n",
+            ">sp|P2|B_HUMAN Second\nMNEKAGLLPE\n>sp|P3|C_HUMAN Third\nGGKR\n",
+        ]
+        response = TestClient(app).post(
+            "/2d/parse-fasta",
+            files=[
+                ("files", (f"{i}.fasta", content)) for i, content in enumerate(files)
+            ],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("X-Session-Id", response.headers)
+        proteins = response.json()
+        expected = [
+            record
+            for content in files
+            for record in Simulation_2de.parse_fasta_content(content)
+        ]
+        self.assertEqual(
+            [p["sequence"] for p in proteins], [r["sequence"] for r in expected]
+        )
+        for protein, record in zip(proteins, expected):
+            self.assertAlmostEqual(protein["mw"], record["mw"])
+            self.assertAlmostEqual(protein["pH"], record["pH"])
+
+    def test_simulate_ief_rejects_invalid_steps(self):
+        client = TestClient(app)
+        proteins = [{"name": "a", "pH": 5.0, "mw": 20000.0}]
+        for steps in (0, -3, 2.5, "10"):
+            for mode in ("heuristic", "ipg"):
+                response = client.post(
+                    "/2d/simulate-ief",
+                    json={"proteins": proteins, "steps": steps, "mode": mode},
+                )
+                self.assertEqual(response.status_code, 400)
+        response = client.post(
+            "/2d/simulate-ief", json={"proteins": proteins, "steps": 1, "seed": 1}
+        )
+        self.assertEqual(len(response.json()), 2)
+
+    def test_simulate_ief_rejects_invalid_parameters(self):
+        client = TestClient(app)
+        proteins = [{"name": "a", "pH": 5.0, "mw": 20000.0}]
+        for bad in (
+            {"seed": "abc"},
+            {"seed": -1},
+            {"seed": 1.5},
+            {"mode": "capillary"},
+            {"canvasWidth": 0},
+            {"mode": "ipg", "voltage": 0},
+            {"mode": "ipg", "voltage": -2},
+            {"mode": "ipg", "duration": "long"},
+            {"mode": "ipg", "duration": 0},
+        ):
+            response = client.post(
+                "/2d/simulate-ief", json={"proteins": proteins, "steps": 2, **bad}
+            )
+            self.assertEqual(response.status_code, 400, bad)
+        response = client.post(
+            "/2d/simulate-ief",
+            json={
+                "proteins": proteins,
+                "steps": 2,
+                "seed": 0,
+                "mode": "ipg",
+                "voltage": 2.0,
+                "duration": 0.5,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
     if __name__ == "__name__":
         test_parse_fasta()
@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+
+from backend.logic.two_de_comigration import CoMigrationDetector
+
+
+class Test2deCoMigration(unittest.TestCase):
+    def brute_pairs(self, x, y, w, h):
+        pairs = set()
+        for i in range(len(x)):
+            for j in range(i + 1, len(x)):
+                if (
+                    abs(x[i] - x[j]) < (w[i] + w[j]) / 2
+                    and abs(y[i] - y[j]) < (h[i] + h[j]) / 2
+                ):
+                    pairs.add((i, j))
+        return pairs
+
+    def test_overlapping_pairs_match_brute_force(self):
+        """Sort-and-sweep should find exactly the pairs a full pairwise check finds"""
+        rng = np.random.default_rng(11)
+        x = rng.uniform(50, 250, 600)
+        y = rng.uniform(170, 300, 600)
+        w = rng.uniform(2, 8, 600)
+        h = rng.uniform(1, 4, 600)
+        a, b = CoMigrationDetector.overlapping_pairs(x, y, w, h)
+        found = {(min(i, j), max(i, j)) for i, j in zip(a.tolist(), b.tolist())}
+        self.assertEqual(len(found), len(a))
+        self.assertEqual(found, self.brute_pairs(x, y, w, h))
+
+    def test_connected_labels_follow_chains(self):
+        labels = CoMigrationDetector.connected_labels(
+            6, np.array([4, 3, 1]), np.array([5, 4, 2])
+        )
+        self.assertEqual(labels.tolist(), [0, 1, 1, 3, 3, 3])
+
+    def test_find_clusters_groups_identical_spots(self):
+        proteins = [
+            {"name": "a", "pH": 5.0, "mw": 20000.0},
+            {"name": "b", "pH": 5.0, "mw": 20000.0},
+            {"name": "c", "pH": 9.0, "mw": 90000.0},
+        ]
+        result = CoMigrationDetector.find_clusters(
+            proteins, {"min": 3, "max": 10}, 800, 600
+        )
+        self.assertEqual(result["counts"]["clusters"], 1)
+        self.assertEqual(result["clusters"][0]["names"], ["a", "b"])
+        self.assertEqual(result["membership"], [0, 0, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+from Bio.SeqUtils.ProtParam import ProteinAnalysis
+from fastapi.testclient import TestClient
+
+from backend.logic.two_de_ipg import IPGFocusing
+from backend.server import app
+
+
+class Test2deIPG(unittest.TestCase):
+    SEQUENCES = [
+        "MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQAPILSRVGDGTQDNLSGAEKAVQVKVKALPDAQFEVVHSLAKWKRQTLGQHDFSAGEGLYTHMKALRPDEDRLSPLHSVYVDQWDWERVMGDGERQFSTLKSTVEAIWAGIKATEAAVSEEFGLAPFLPDQIHFVHSQELLSRYPDLDAKGRERAIAKDLGAVFLVGIGGKLSDGHRHDVRAPDYDDWUAIGGRHTEPLETAVNKIH",
+        "MNEKAGLLPEDQWYGAKSTEQH",
+        "MKKAGHLPVSAQGSTLLA",
+    ]
+
+    def proteins(self):
+        return [
+            {
+                "name": str(i),
+                "sequence": seq,
+                "pH": ProteinAnalysis(seq).isoelectric_point(),
+                "mw": ProteinAnalysis(seq.replace("U", "C")).molecular_weight(),
+            }
+            for i, seq in enumerate(self.SEQUENCES)
+        ]
+
+    def test_net_charge_matches_biopython(self):
+        """Vectorized titration curves should reproduce Biopython's charge_at_pH"""
+        proteins = self.proteins()
+        counts, pks = IPGFocusing.titration_parameters(proteins)
+        for ph in (3.0, 5.5, 7.0, 9.2):
+            charge, _ = IPGFocusing.net_charge(
+                np.full(len(proteins), ph), counts, 10.0**-pks
+            )
+            for i, seq in enumerate(self.SEQUENCES):
+                self.assertAlmostEqual(
+                    charge[i], ProteinAnalysis(seq).charge_at_pH(ph), places=6
+                )
+
+    def test_proteins_focus_at_their_pi(self):
+        proteins = self.proteins()
+        for gradient in ("linear", "nonlinear"):
+            frames = IPGFocusing.simulate(
+                proteins, {"min": 3, "max": 12}, 800, 600, seed=3, gradient=gradient
+            )
+            self.assertEqual(len(frames), 26)
+            for protein, spot in zip(proteins, frames[-1]):
+                self.assertAlmostEqual(spot["currentpH"], protein["pH"], delta=0.01)
+                self.assertTrue(spot["settled"])
+
+    def test_nonlinear_gradient_stretches_mid_range(self):
+        fractions, phs = IPGFocusing.gradient_profile("nonlinear", 3, 10)
+        self.assertAlmostEqual(np.interp(5.0, phs, fractions), 0.15)
+        self.assertAlmostEqual(np.interp(7.0, phs, fractions), 0.7)
+
+    def test_invalid_gradient_raises(self):
+        with self.assertRaises(ValueError):
+            IPGFocusing.gradient_profile([[0.0, 8.0], [1.0, 4.0]], 3, 10)
+
+    def test_malformed_gradient_is_rejected(self):
+        malformed = [
+            5,
+            "steep",
+            [1, 2],
+            [[0.0, 3.0], [1.0]],
+            [[0.0, "a"], [1.0, 9.0]],
+            [[0.0, 3.0], [None, 9.0]],
+            [[0.0, 3.0], [float("nan"), 9.0]],
+        ]
+        for gradient in malformed:
+            with self.assertRaises(ValueError):
+                IPGFocusing.gradient_profile(gradient, 3, 10)
+
+        client = TestClient(app)
+        for gradient in malformed[:3] + [{"a": 1}]:
+            response = client.post(
+                "/2d/simulate-ief",
+                json={"proteins": self.proteins(), "mode": "ipg", "gradient": gradient},
+            )
+            self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
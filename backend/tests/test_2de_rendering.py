@@ -0,0 +1,179 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.logic.two_de_rendering import GelDensityRenderer
+from backend.logic.two_de_simulation import Simulation_2de
+from backend.logic.two_de_tiles import GelTilePyramid
+from backend.server import app
+
+
+class Test2deRendering(unittest.TestCase):
+    PROTEINS = [
+        {"pH": 4.2, "mw": 12000.0},
+        {"pH": 6.8, "mw": 55000.0},
+        {"pH": 9.1, "mw": 230000.0},
+    ]
+    PH_RANGE = {"min": 3, "max": 10}
+
+    def test_spot_positions_match_scalar_positions(self):
+        """get_spot_positions should agree with get_ph_position / get_mw_position / get_distance_position"""
+        mws = [p["mw"] for p in self.PROTEINS]
+        for mode, scalar in (
+            ("mw", Simulation_2de.get_mw_position),
+            ("distance", Simulation_2de.get_distance_position),
+        ):
+            x, y = Simulation_2de.get_spot_positions(
+                self.PROTEINS, self.PH_RANGE, 800, 600, 10.0, mode
+            )
+            for i, protein in enumerate(self.PROTEINS):
+                self.assertAlmostEqual(
+                    x[i], Simulation_2de.get_ph_position(protein["pH"], 800, 3, 10)
+                )
+                expected_y = min(
+                    scalar(protein["mw"], 600, 10.0, min_mw=min(mws), max_mw=max(mws)),
+                    600,
+                )
+                self.assertAlmostEqual(y[i], expected_y)
+
+    def test_render_conserves_mass_and_peaks_at_spot(self):
+        """A lone spot should keep its weight and peak at its own pixel"""
+        density = GelDensityRenderer.render(
+            [40.25], [20.75], (0, 0, 80, 60), (60, 80), 2.0, 1.0, weights=[5.0]
+        )
+        self.assertAlmostEqual(density.sum(), 5.0, delta=0.01)
+        row, col = np.unravel_index(np.argmax(density), density.shape)
+        self.assertEqual((row, col), (20, 40))
+
+    def test_render_includes_spots_just_outside_extent(self):
+        """Spots in the padding should bleed into the rendered window"""
+        density = GelDensityRenderer.render(
+            [-1.0], [10.0], (0, 0, 20, 20), (20, 20), 2.0, 2.0
+        )
+        self.assertGreater(density[10, 0], 0.0)
+
+    def test_downsample_block_sums(self):
+        density = np.arange(16, dtype=float).reshape(4, 4)
+        expected = np.array([[10.0, 18.0], [42.0, 50.0]])
+        np.testing.assert_allclose(GelDensityRenderer.downsample(density, 2), expected)
+
+    def test_to_image_bytes_is_png(self):
+        density, _ = GelDensityRenderer.render_gel(
+            self.PROTEINS, self.PH_RANGE, 200, 300
+        )
+        self.assertTrue(
+            GelDensityRenderer.to_image_bytes(density).startswith(b"\x89PNG")
+        )
+
+    def test_tile_pyramid_levels_and_edge_tiles(self):
+        """Level 0 holds the whole gel in one tile; edge tiles are cropped to the gel"""
+        _, pyramid = GelTilePyramid.build_for_gel(
+            self.PROTEINS, self.PH_RANGE, 800, 600
+        )
+        levels = pyramid.describe()["levels"]
+        self.assertEqual((levels[0]["cols"], levels[0]["rows"]), (1, 1))
+        self.assertEqual(levels[-1]["scale"], 4 * levels[-3]["scale"])
+        self.assertTrue(pyramid.tile(0, 0, 0).startswith(b"\x89PNG"))
+        self.assertIsNone(pyramid.tile(0, 1, 0))
+        self.assertIsNone(pyramid.tile(len(levels), 0, 0))
+
+    def test_tile_pyramid_peak_is_lazy_and_bounded(self):
+        with mock.patch.object(
+            GelDensityRenderer, "render", wraps=GelDensityRenderer.render
+        ) as render:
+            pyramid = GelTilePyramid(
+                *Simulation_2de.get_spot_positions(
+                    self.PROTEINS, self.PH_RANGE, 16000, 12000
+                ),
+                [1.0] * 3,
+                16000,
+                12000,
+            )
+            render.assert_not_called()
+            pyramid.tile(0, 0, 0)
+        # The tile itself, then the peak grid, which is capped at PEAK_RESOLUTION a side.
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(render.call_args_list[1].args[3], (1536, 2048))
+        self.assertGreater(pyramid.peak_density, 0)
+
+        # Below the cap the peak is measured at canvas resolution, as it was before.
+        x, y = Simulation_2de.get_spot_positions(self.PROTEINS, self.PH_RANGE, 800, 600)
+        full = GelDensityRenderer.render(
+            x, y, (0, 0, 800, 600), (600, 800), 3.0, 3.0, [1.0] * 3
+        )
+        self.assertAlmostEqual(
+            GelTilePyramid(x, y, [1.0] * 3, 800, 600).peak_density, float(full.max())
+        )
+
+    def test_tiles_route_validates_canvas(self):
+        client = TestClient(app)
+        body = {"proteins": self.PROTEINS, "phRange": self.PH_RANGE}
+        built = client.post("/2d/tiles", json=body).json()
+        self.assertEqual(built["width"], 800.0)
+        self.assertTrue(built["tileUrl"].startswith(f"/2d/tiles/{built['pyramidId']}/"))
+        for bad in ({"canvasWidth": 10**9}, {"canvasHeight": 0}, {"sigmaX": "wide"}):
+            self.assertEqual(
+                client.post("/2d/tiles", json={**body, **bad}).status_code, 400, bad
+            )
+
+    def test_render_density_route_validates_inputs(self):
+        client = TestClient(app)
+        body = {
+            "proteins": self.PROTEINS,
+            "phRange": self.PH_RANGE,
+            "canvasWidth": 200,
+            "canvasHeight": 100,
+        }
+        matrix = client.post(
+            "/2d/render-density", json={**body, "format": "matrix", "downsample": 10}
+        ).json()
+        self.assertEqual((matrix["rows"], matrix["cols"]), (10, 20))
+        image = client.post("/2d/render-density", json=body)
+        self.assertEqual(image.headers["content-type"], "image/png")
+
+        for bad in (
+            {"scale": 1000},
+            {"scale": 0},
+            {"scale": "big"},
+            {"canvasWidth": 10**6},
+            {"canvasHeight": -5},
+            {"sigmaX": 0},
+            {"sigmaY": 1000},
+            {"downsample": 0},
+            {"downsample": 2.5},
+            {"gamma": None},
+        ):
+            response = client.post("/2d/render-density", json={**body, **bad})
+            self.assertEqual(response.status_code, 400, bad)
+
+    def test_tile_route_validates_before_etag(self):
+        client = TestClient(app)
+        pyramid_id, _ = GelTilePyramid.build_for_gel(
+            self.PROTEINS, self.PH_RANGE, 800, 600
+        )
+        base = f"/2d/tiles/{pyramid_id}"
+        ok = client.get(f"{base}/0/0_0.png")
+        self.assertEqual(ok.status_code, 200)
+        cached = client.get(
+            f"{base}/0/0_0.png", headers={"If-None-Match": ok.headers["etag"]}
+        )
+        self.assertEqual(cached.status_code, 304)
+
+        # A matching ETag must not turn an invalid tile into a 304.
+        for path, status in (
+            ("0/5_0.png", 404),
+            ("99/0_0.png", 404),
+            ("0/0_0.gif", 400),
+        ):
+            level, name = path.split("/")
+            col_row, fmt = name.split(".")
+            col, row = col_row.split("_")
+            etag = f'"{pyramid_id}-{level}-{col}-{row}-{fmt}"'
+            response = client.get(f"{base}/{path}", headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, status)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+from backend.logic.two_de_session import TwoDESessionStore
+from backend.server import app
+
+
+class Test2deSession(unittest.TestCase):
+    def test_create_get_delete(self):
+        session_id = TwoDESessionStore.create([{"name": "a", "pH": 5.0, "mw": 20000.0}])
+        session = TwoDESessionStore.get(session_id)
+        self.assertEqual(len(session.proteins), 1)
+        self.assertIsNone(session.ief_final)
+        self.assertTrue(TwoDESessionStore.delete(session_id))
+        self.assertIsNone(TwoDESessionStore.get(session_id))
+        self.assertFalse(TwoDESessionStore.delete(session_id))
+
+    def test_expired_session_is_gone(self):
+        session_id = TwoDESessionStore.create([])
+        TwoDESessionStore.get(session_id).last_access -= (
+            TwoDESessionStore.TTL_SECONDS + 1
+        )
+        self.assertIsNone(TwoDESessionStore.get(session_id))
+
+    def test_session_routes(self):
+        client = TestClient(app)
+        proteins = [
+            {"name": "a", "pH": 5.0, "mw": 20000.0, "sequence": "MAGIC" * 100},
+            {"name": "b", "pH": 8.0, "mw": 60000.0, "sequence": "PEPTIDE" * 100},
+        ]
+        session_id = TwoDESessionStore.create(proteins)
+        base = f"/2d/sessions/{session_id}"
+
+        self.assertEqual(client.post(f"{base}/simulate-sds", json={}).status_code, 409)
+        frames = client.post(
+            f"{base}/simulate-ief", json={"steps": 3, "seed": 1}
+        ).json()
+        self.assertEqual(len(frames), 4)
+        self.assertEqual([p["name"] for p in frames[-1]], ["a", "b"])
+        self.assertTrue(all("sequence" not in p for frame in frames for p in frame))
+        # The session keeps the full proteins.
+        self.assertEqual(
+            TwoDESessionStore.get(session_id).proteins[0]["sequence"], "MAGIC" * 100
+        )
+        self.assertEqual(
+            client.post(f"{base}/simulate-ief", json={"steps": 0}).status_code, 400
+        )
+
+        sds = client.post(f"{base}/simulate-sds", json={"canvasHeight": 600}).json()
+        self.assertEqual([p["x"] for p in sds[-1]], [p["x"] for p in frames[-1]])
+        self.assertTrue(client.get(base).json()["hasIef"])
+
+        self.assertEqual(client.delete(base).status_code, 200)
+        for path in ("simulate-ief", "simulate-sds"):
+            self.assertEqual(client.post(f"{base}/{path}", json={}).status_code, 404)
+        self.assertEqual(client.get(base).status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from backend.logic.two_de_spatial_index import GelSpatialIndex
+
+
+class Test2deSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.x = rng.uniform(50, 750, 2000)
+        self.y = rng.uniform(170, 550, 2000)
+        self.index = GelSpatialIndex(self.x, self.y)
+
+    def brute_distances(self, qx, qy):
+        return np.hypot(self.x - qx, self.y - qy)
+
+    def test_nearest_matches_brute_force(self):
+        """nearest should return the same spots as a full scan, nearest first"""
+        for qx, qy in ((400.0, 300.0), (0.0, 0.0), (760.0, 560.0), (123.4, 456.7)):
+            expected = np.argsort(self.brute_distances(qx, qy), kind="stable")[:5]
+            np.testing.assert_array_equal(self.index.nearest(qx, qy, k=5), expected)
+
+    def test_radius_matches_brute_force(self):
+        distances = self.brute_distances(300.0, 350.0)
+        expected = set(np.nonzero(distances <= 25.0)[0])
+        self.assertEqual(set(self.index.radius(300.0, 350.0, 25.0)), expected)
+
+    def test_rect_matches_brute_force(self):
+        inside = (self.x >= 100) & (self.x <= 220) & (self.y >= 200) & (self.y <= 260)
+        np.testing.assert_array_equal(
+            self.index.rect(220, 260, 100, 200), np.nonzero(inside)[0]
+        )
+
+    def test_nearest_respects_max_distance(self):
+        self.assertEqual(
+            len(self.index.nearest(-1000.0, -1000.0, k=3, max_distance=10.0)), 0
+        )
+
+    def test_build_for_gel_registers_index(self):
+        proteins = [
+            {"name": "a", "pH": 5.0, "mw": 20000.0, "sequence": "MK"},
+            {"name": "b", "pH": 8.0, "mw": 80000.0},
+        ]
+        index_id = GelSpatialIndex.build_for_gel(
+            proteins, {"min": 3, "max": 10}, 800, 600
+        )
+        index = GelSpatialIndex.get(index_id)
+        spot = index.spots_for(index.nearest(250.0, 550.0))[0]
+        self.assertEqual(spot["name"], "a")
+        self.assertNotIn("sequence", spot)
+
+
+if __name__ == "__main__":
+    unittest.main()
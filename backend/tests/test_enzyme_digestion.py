@@ -0,0 +1,139 @@
+import re
+import random
+import unittest
+
+from fastapi.testclient import TestClient
+
+from backend.logic.enzyme_digestion import CleavageRule, EnzymeDigestion
+from backend.server import app
+
+
+def regex_digest(sequence, site, missed_cleavages, min_length=1):
+    fragments = [f for f in re.split(site, sequence) if f]
+    peptides = []
+    for start in range(len(fragments)):
+        for end in range(start, min(start + missed_cleavages + 1, len(fragments))):
+            peptide = "".join(fragments[start : end + 1])
+            if len(peptide) >= min_length:
+                peptides.append(peptide)
+    return sorted(peptides)
+
+
+class TestEnzymeDigestion(unittest.TestCase):
+    def test_trypsin_proline_rule(self):
+        digest = EnzymeDigestion.digest(["MAKPLRGGKR"])
+        self.assertEqual(list(digest.peptides()), ["MAKPLR", "GGK", "R"])
+        self.assertEqual(digest.position().tolist(), [1, 7, 10])
+
+    def test_n_terminal_rule_and_multiple_enzymes(self):
+        self.assertEqual(
+            list(EnzymeDigestion.digest(["AADKKDE"], ["asp-n"]).peptides()),
+            ["AA", "DKK", "DE"],
+        )
+        self.assertEqual(
+            list(EnzymeDigestion.digest(["AADKKDE"], ["asp-n", "lys-c"]).peptides()),
+            ["AA", "DK", "K", "DE"],
+        )
+        custom = CleavageRule("G", "N", "P")
+        self.assertEqual(
+            list(EnzymeDigestion.digest(["AGPGA"], [custom]).peptides()), ["A", "GPGA"]
+        )
+
+    def test_thermolysin_rule(self):
+        # Before L/A/F/V/M, except after D (L) or E (V) and before P2' = P (A).
+        self.assertEqual(
+            list(EnzymeDigestion.digest(["KDLAPFGEVRM"], ["thermolysin"]).peptides()),
+            ["KDLAP", "FGEVR", "M"],
+        )
+        # The next protein's first residue is not a P2'.
+        self.assertEqual(
+            list(EnzymeDigestion.digest(["KAL", "PK"], ["thermolysin"]).peptides()),
+            ["K", "A", "L", "PK"],
+        )
+        sequence = "".join(
+            random.Random(4).choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(2000)
+        )
+        self.assertEqual(
+            sorted(EnzymeDigestion.digest([sequence], ["thermolysin"], 2).peptides()),
+            regex_digest(sequence, r"(?<![DE])(?=[AFILMV](?!P))", 2),
+        )
+
+    def test_matches_regex_digest(self):
+        random.seed(3)
+        proteins = [
+            "".join(
+                random.choice("ACDEFGHIKLMNPQRSTVWY")
+                for _ in range(random.randint(0, 200))
+            )
+            for _ in range(50)
+        ]
+        digest = EnzymeDigestion.digest(
+            proteins, ["trypsin"], missed_cleavages=2, min_length=4
+        )
+        expected = sorted(
+            p
+            for protein in proteins
+            for p in regex_digest(protein, r"(?<=[KR])(?!P)", 2, 4)
+        )
+        self.assertEqual(sorted(digest.peptides()), expected)
+        for i in range(len(digest)):
+            protein = proteins[digest.protein[i]]
+            position = digest.position()[i]
+            self.assertEqual(
+                protein[position - 1 : position - 1 + digest.end[i] - digest.start[i]],
+                digest.peptide(i),
+            )
+
+    def test_masses_and_filters(self):
+        digest = EnzymeDigestion.digest(["GXGKAAAAK"], missed_cleavages=1)
+        masses = dict(zip(digest.peptides(), digest.mass.tolist()))
+        self.assertNotEqual(masses["GXGK"], masses["GXGK"])  # NaN: unknown residue
+        self.assertAlmostEqual(
+            masses["AAAAK"], 4 * 71.037114 + 128.094963 + 18.010565, places=5
+        )
+
+        filtered = EnzymeDigestion.digest(
+            ["GXGKAAAAK"], missed_cleavages=1, max_length=5, min_mass=100
+        )
+        self.assertEqual(list(filtered.peptides()), ["AAAAK"])
+
+    def test_unknown_enzyme(self):
+        with self.assertRaises(ValueError):
+            EnzymeDigestion.digest(["PEPTIDE"], ["papain"])
+
+    def test_digest_route(self):
+        client = TestClient(app)
+        response = client.post(
+            "/proteolytic_digestion/digest",
+            json={
+                "sequences": ["MAKPLRGGKR", "PEPTIDE"],
+                "enzymes": ["trypsin"],
+                "missed_cleavages": 1,
+                "min_length": 3,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        peptides = [
+            (p["protein"], p["sequence"], p["missed_cleavages"])
+            for p in response.json()
+        ]
+        self.assertEqual(
+            peptides,
+            [
+                (0, "MAKPLR", 0),
+                (0, "MAKPLRGGK", 1),
+                (0, "GGK", 0),
+                (0, "GGKR", 1),
+                (1, "PEPTIDE", 0),
+            ],
+        )
+
+        response = client.post(
+            "/proteolytic_digestion/digest",
+            json={"sequences": ["PEPTIDE"], "enzymes": ["papain"]},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import sys
+import unittest
+
+from backend.utility.lazy_import import LazyModule, lazy_import
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_already_imported_module_is_returned(self):
+        self.assertIs(lazy_import("json"), sys.modules["json"])
+
+    def test_module_loads_on_first_attribute(self):
+        sys.modules.pop("colorsys", None)
+        module = lazy_import("colorsys")
+        self.assertIsInstance(module, LazyModule)
+        self.assertNotIn("colorsys", sys.modules)
+        self.assertEqual(module.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertIn("colorsys", sys.modules)
+
+    def test_heavy_dependencies_are_not_imported_by_routers(self):
+        import subprocess
+
+        code = (
+            "import sys, backend.api.proteolytic_digestion_routes, backend.api.artifact_routes, backend.api.auth_routes;"
+            "print(','.join(m for m in ('matplotlib', 'fitz', 'cryptography', 'rdkit') if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
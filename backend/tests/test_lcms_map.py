@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.logic.enzyme_digestion import EnzymeDigestion
+from backend.logic.lcms_map import LCMSMap
+from backend.logic.peptide_retention import PeptideRetentionPredictor
+from backend.logic.proteome_store import ProteomeStore
+from backend.server import app
+
+
+PROTEINS = ["MAGICPEPTIDEKLLWVFRSSAMPLEK", "GGGGSSSSKMAGICPEPTIDEK", "ACDXEFGHIK"]
+
+
+class TestLCMSMap(unittest.TestCase):
+    def test_unique_peptides(self):
+        digest = EnzymeDigestion.digest(PROTEINS, missed_cleavages=1)
+        keys, first, inverse = LCMSMap.unique_peptides(digest)
+        peptides = list(digest.peptides())
+        self.assertEqual([key.decode() for key in keys], sorted(set(peptides)))
+        self.assertEqual([keys[i].decode() for i in inverse], peptides)
+        self.assertEqual([peptides[i] for i in first], sorted(set(peptides)))
+
+    def test_feature_map(self):
+        digest = EnzymeDigestion.digest(PROTEINS, min_length=5)
+        feature_map = LCMSMap.build(digest, charges=[1, 2], mode="fast")
+        sequences = feature_map.sequences
+        # ACDXEFGHIK has no mass, so it is not a feature.
+        self.assertNotIn("ACDXEFGHIK", {sequences[i] for i in feature_map.peptide})
+
+        features = {
+            (sequences[p], z): (rt, mz, n)
+            for p, z, rt, mz, n in zip(
+                feature_map.peptide,
+                feature_map.charge,
+                feature_map.rt,
+                feature_map.mz,
+                feature_map.intensity,
+            )
+        }
+        rt, mz, intensity = features["MAGICPEPTIDEK", 2]
+        self.assertEqual(intensity, 2)
+        self.assertAlmostEqual(
+            rt,
+            PeptideRetentionPredictor.predict("MAGICPEPTIDEK", mode="fast")[
+                "predicted_tr"
+            ],
+        )
+        mass = digest.mass[list(digest.peptides()).index("MAGICPEPTIDEK")]
+        self.assertAlmostEqual(mz, (mass + 2 * EnzymeDigestion.PROTON) / 2)
+
+        in_range = LCMSMap.build(
+            digest, charges=[1, 2], mz_range=(600, 1000), mode="fast"
+        )
+        self.assertTrue(((in_range.mz >= 600) & (in_range.mz <= 1000)).all())
+        self.assertLess(len(in_range), len(feature_map))
+
+        raster = LCMSMap.raster(feature_map, (20, 30))
+        self.assertEqual(raster["values"].shape, (20, 30))
+        self.assertAlmostEqual(
+            raster["values"].sum(),
+            feature_map.intensity.sum(),
+            delta=0.05 * feature_map.intensity.sum(),
+        )
+
+    def test_map_route(self):
+        client = TestClient(app)
+        fasta = "".join(
+            f">P{i} protein\n{sequence}\n" for i, sequence in enumerate(PROTEINS)
+        )
+        response = client.post(
+            "/lcms/map",
+            json={
+                "fasta": fasta,
+                "min_length": 5,
+                "charges": [2],
+                "raster_rt_bins": 8,
+                "raster_mz_bins": 4,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["proteins"], 3)
+        self.assertEqual(body["count"], len(body["features"]["mz"]))
+        self.assertEqual(set(body["features"]["charge"]), {2})
+        self.assertEqual(np.array(body["raster"]["values"]).shape, (4, 8))
+
+        response = client.post(
+            "/lcms/map", json={"fasta": fasta, "mz_min": 900, "mz_max": 800}
+        )
+        self.assertEqual(response.status_code, 400)
+        for charges in ([0], [-2], [], [1, 500]):
+            response = client.post(
+                "/lcms/map", json={"fasta": fasta, "charges": charges}
+            )
+            self.assertEqual(response.status_code, 422, charges)
+
+    def test_map_route_parses_off_the_event_loop(self):
+        loops = []
+
+        def parse_fasta(content):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return parse(content)
+
+        parse = ProteomeStore.parse_fasta
+        fasta = "".join(f">P{i}\n{sequence}\n" for i, sequence in enumerate(PROTEINS))
+        with mock.patch.object(ProteomeStore, "parse_fasta", side_effect=parse_fasta):
+            response = TestClient(app).post(
+                "/lcms/map", json={"fasta": fasta, "raster": False}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(loops, [None])
+
+
+if __name__ == "__main__":
+    unittest.main()
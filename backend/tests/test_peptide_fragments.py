@@ -0,0 +1,33 @@
+import unittest
+
+from rdkit import Chem
+
+from backend.logic.peptide_fragments import PeptideFragments
+
+
+class TestPeptideFragments(unittest.TestCase):
+    def test_residues_are_l_amino_acids(self):
+        expected = {aa: ["S"] for aa in PeptideFragments.RESIDUES}
+        expected.update({"G": [], "C": ["R"], "I": ["S", "S"], "T": ["S", "R"]})
+        for aa, labels in expected.items():
+            mol = Chem.MolFromSmiles(PeptideFragments.RESIDUES[aa] + "O")
+            centers = Chem.FindMolChiralCenters(
+                mol, includeUnassigned=True, useLegacyImplementation=False
+            )
+            self.assertEqual([label for _, label in centers], labels, aa)
+
+    def test_assemble_smiles_is_canonical(self):
+        smiles = PeptideFragments.assemble_smiles("ac-G-P-P-K-am")
+        expected = Chem.MolToSmiles(
+            Chem.MolFromSmiles(
+                "CC(=O)NCC(=O)N1CCC[C@H]1C(=O)N1CCC[C@H]1C(=O)N[C@@H](CCCCN)C(N)=O"
+            )
+        )
+        self.assertEqual(smiles, expected)
+
+    def test_exotic_residue_is_left_to_pypept(self):
+        self.assertIsNone(PeptideFragments.assemble_smiles("ac-A-Z-am"))
+
+
+if __name__ == "__main__":
+    unittest.main()
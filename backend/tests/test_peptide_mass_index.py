@@ -0,0 +1,95 @@
+import random
+import unittest
+from unittest import mock
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.logic.enzyme_digestion import EnzymeDigestion
+from backend.logic.peptide_mass_index import PeptideMassIndex
+from backend.server import app
+from backend.utility.lru_cache import LRUCache
+
+
+class TestPeptideMassIndex(unittest.TestCase):
+    def setUp(self):
+        random.seed(5)
+        self.proteins = [
+            "".join(random.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(300))
+            for _ in range(40)
+        ]
+        self.digest = EnzymeDigestion.digest(self.proteins, missed_cleavages=1)
+        self.index = PeptideMassIndex(self.digest)
+
+    def test_matches_brute_force(self):
+        queries = np.random.default_rng(1).uniform(300, 1500, 200)
+        hits = self.index.query_mz(queries, tolerance=20, unit="ppm")
+        for z in (1, 2, 3):
+            mz = (self.digest.mass + z * EnzymeDigestion.PROTON) / z
+            for i, query in enumerate(queries):
+                expected = set(
+                    np.flatnonzero(np.abs(mz - query) <= query * 20e-6).tolist()
+                )
+                found = hits["peptide"][(hits["query"] == i) & (hits["charge"] == z)]
+                self.assertEqual(set(self.index.rows[found].tolist()), expected)
+
+    def test_search_reports_peptides(self):
+        row = 10
+        peptide = self.digest.peptide(row)
+        mz = (self.digest.mass[row] + 2 * EnzymeDigestion.PROTON) / 2
+        result = self.index.search([mz], tolerance=0.001, unit="da", charges=[2])[0]
+        self.assertGreaterEqual(result["count"], 1)
+        match = next(m for m in result["matches"] if m["sequence"] == peptide)
+        self.assertEqual(match["charge"], 2)
+        self.assertEqual(
+            self.proteins[match["protein"]][match["position"] - 1 :].find(peptide), 0
+        )
+        self.assertAlmostEqual(match["error_ppm"], 0, places=2)
+
+        limited = self.index.search([mz, mz], tolerance=1, unit="da", limit=1)
+        self.assertEqual([len(r["matches"]) for r in limited], [1, 1])
+        self.assertGreater(limited[0]["count"], 1)
+
+    def test_routes(self):
+        client = TestClient(app)
+        fasta = "".join(
+            f">P{i} protein\n{sequence}\n" for i, sequence in enumerate(self.proteins)
+        )
+        built = client.post(
+            "/proteolytic_digestion/mass-index",
+            json={"fasta": fasta, "missed_cleavages": 1, "charges": [1, 2]},
+        ).json()
+        self.assertEqual(built["proteins"], 40)
+        self.assertEqual(built["charges"], [1, 2])
+
+        mz = self.digest.mass[3] + EnzymeDigestion.PROTON
+        results = client.post(
+            f"/proteolytic_digestion/mass-index/{built['index_id']}/query",
+            json={"mz": [mz, 50.0], "tolerance": 5},
+        ).json()
+        self.assertIn(
+            self.digest.peptide(3), [m["sequence"] for m in results[0]["matches"]]
+        )
+        self.assertEqual(results[1], {"mz": 50.0, "count": 0, "matches": []})
+
+        response = client.post(
+            "/proteolytic_digestion/mass-index/missing/query", json={"mz": [500.0]}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_build_survives_eviction(self):
+        # The registry may drop the index before the route reads it back.
+        client = TestClient(app)
+        fasta = "".join(
+            f">P{i}\n{sequence}\n" for i, sequence in enumerate(self.proteins[:3])
+        )
+        with mock.patch.object(PeptideMassIndex, "REGISTRY", LRUCache(maxsize=0)):
+            response = client.post(
+                "/proteolytic_digestion/mass-index", json={"fasta": fasta}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["proteins"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
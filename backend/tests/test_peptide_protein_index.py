@@ -0,0 +1,141 @@
+import random
+import unittest
+from collections import defaultdict
+from unittest import mock
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.logic.enzyme_digestion import EnzymeDigestion
+from backend.logic.peptide_protein_index import PeptideProteinIndex
+from backend.server import app
+from backend.utility.lru_cache import LRUCache
+
+
+class TestPeptideProteinIndex(unittest.TestCase):
+    def setUp(self):
+        random.seed(11)
+        self.proteins = [
+            "".join(random.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(300))
+            for _ in range(40)
+        ]
+        # Shared peptides: a fragment of protein 0 and a copy of protein 1.
+        self.proteins += [self.proteins[0][:120], self.proteins[1]]
+        self.digest = EnzymeDigestion.digest(self.proteins, missed_cleavages=1)
+        self.index = PeptideProteinIndex(self.digest)
+
+        self.expected = defaultdict(set)
+        for protein, peptide in zip(
+            self.digest.protein.tolist(), self.digest.peptides()
+        ):
+            self.expected[peptide].add(protein)
+
+    def test_matches_brute_force(self):
+        self.assertEqual(len(self.index), len(self.expected))
+        peptides = list(self.expected) + ["NOTINTHEDIGEST", ""]
+        entries = self.index.lookup(peptides)
+        for peptide, entry in zip(peptides, entries.tolist()):
+            if peptide in self.expected:
+                self.assertEqual(self.index.peptide(entry), peptide)
+                self.assertEqual(
+                    self.index.proteins(entry).tolist(), sorted(self.expected[peptide])
+                )
+            else:
+                self.assertEqual(entry, PeptideProteinIndex.EMPTY)
+
+    def test_unique_peptides(self):
+        for protein in (0, 1, 2, 40, 41):
+            expected = sorted(
+                p for p, owners in self.expected.items() if owners == {protein}
+            )
+            self.assertEqual(self.index.unique_peptides(protein), expected)
+        self.assertEqual(self.index.unique_peptides(41), [])
+        self.assertEqual(
+            self.index.stats()["proteotypic"],
+            sum(len(owners) == 1 for owners in self.expected.values()),
+        )
+
+    def test_key_collisions_are_verified(self):
+        # Every key collides: entries are told apart by the check hash and lookups by the bytes.
+        real_hash = PeptideProteinIndex.hash
+
+        def length_only(sequence, start, end, base=PeptideProteinIndex.BASE):
+            if base == PeptideProteinIndex.BASE:
+                return (end - start).astype(np.uint64)
+            return real_hash(sequence, start, end, base)
+
+        PeptideProteinIndex.hash = staticmethod(length_only)
+        try:
+            index = PeptideProteinIndex(EnzymeDigestion.digest(self.proteins[:5]))
+            peptides = sorted(set(EnzymeDigestion.digest(self.proteins[:5]).peptides()))
+            entries = index.lookup(peptides + ["WWWWWWW"])
+        finally:
+            PeptideProteinIndex.hash = staticmethod(real_hash)
+        self.assertEqual(len(index), len(peptides))
+        self.assertEqual([index.peptide(e) for e in entries[:-1].tolist()], peptides)
+        self.assertEqual(entries[-1], PeptideProteinIndex.EMPTY)
+
+    def test_routes(self):
+        client = TestClient(app)
+        fasta = "".join(
+            f">P{i} protein\n{sequence}\n" for i, sequence in enumerate(self.proteins)
+        )
+        built = client.post(
+            "/proteolytic_digestion/peptide-index",
+            json={"fasta": fasta, "missed_cleavages": 1},
+        ).json()
+        self.assertEqual(built["proteins"], 42)
+        self.assertEqual(built["peptides"], len(self.expected))
+        base = f"/proteolytic_digestion/peptide-index/{built['index_id']}"
+
+        shared = next(p for p, owners in self.expected.items() if owners == {1, 41})
+        self.assertEqual(
+            client.get(f"{base}/peptides/{shared}").json(),
+            {
+                "peptide": shared,
+                "found": True,
+                "proteotypic": False,
+                "proteins": ["P1", "P41"],
+            },
+        )
+
+        unique = client.get(f"{base}/proteins/P2/unique-peptides").json()
+        self.assertEqual(
+            unique["peptides"],
+            sorted(p for p, owners in self.expected.items() if owners == {2}),
+        )
+
+        results = client.post(
+            f"{base}/lookup", json={"peptides": [unique["peptides"][0], "NOPE"]}
+        ).json()
+        self.assertEqual(
+            [(r["found"], r["proteotypic"]) for r in results],
+            [(True, True), (False, False)],
+        )
+
+        self.assertEqual(
+            client.get(f"{base}/proteins/MISSING/unique-peptides").status_code, 404
+        )
+        self.assertEqual(
+            client.post(
+                "/proteolytic_digestion/peptide-index/missing/lookup",
+                json={"peptides": ["K"]},
+            ).status_code,
+            404,
+        )
+
+    def test_build_survives_eviction(self):
+        client = TestClient(app)
+        fasta = "".join(
+            f">P{i}\n{sequence}\n" for i, sequence in enumerate(self.proteins[:3])
+        )
+        with mock.patch.object(PeptideProteinIndex, "REGISTRY", LRUCache(maxsize=0)):
+            response = client.post(
+                "/proteolytic_digestion/peptide-index", json={"fasta": fasta}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["proteins"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
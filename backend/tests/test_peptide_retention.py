@@ -0,0 +1,178 @@
+import asyncio
+import json
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from backend.api import peptide_retention_routes as routes
+from backend.api.peptide_retention_routes import MultiplePeptidesRequest
+from backend.logic.peptide_retention import PeptideRetentionPredictor
+from backend.logic.peptide_retention_calibration import RetentionCalibration
+from backend.server import app
+from backend.utility.supervised_pool import SupervisedPool
+
+
+class TestPeptideRetentionPool(unittest.TestCase):
+    # Non-default conformer counts bypass the prediction cache, so every peptide is computed.
+    OPTIONS = {"num_conformers": 1}
+
+    def test_full_mode_batch_runs_in_shared_pool(self):
+        peptides = ["GG", "AG", "GG", "GA"]
+        with mock.patch.object(
+            PeptideRetentionPredictor,
+            "get_pool",
+            wraps=PeptideRetentionPredictor.get_pool,
+        ) as get_pool:
+            results = PeptideRetentionPredictor.predict_multiple(
+                peptides, **self.OPTIONS
+            )
+        get_pool.assert_called()
+        pool = PeptideRetentionPredictor.get_pool()
+        self.assertIsInstance(pool, ProcessPoolExecutor)
+        self.assertIs(pool, PeptideRetentionPredictor.get_pool())
+        # Workers are not forked from the threaded server.
+        self.assertEqual(
+            pool._mp_context.get_start_method(), SupervisedPool.START_METHOD
+        )
+        self.assertNotEqual(SupervisedPool.START_METHOD, "fork")
+
+        # Input order is kept, duplicates get the same prediction and results match an in-process run.
+        self.assertEqual([r["peptide"] for r in results], peptides)
+        self.assertEqual(results[0]["predicted_tr"], results[2]["predicted_tr"])
+        for peptide, result in zip(peptides, results):
+            expected = PeptideRetentionPredictor.compute_prediction(
+                peptide, **self.OPTIONS
+            )
+            self.assertEqual(result["smiles"], expected["smiles"])
+            self.assertEqual(result["log_sum_aa"], expected["log_sum_aa"])
+            # Conformer embedding is not seeded, so the volume term varies slightly between runs.
+            self.assertAlmostEqual(
+                result["predicted_tr"], expected["predicted_tr"], delta=0.5
+            )
+
+
+class TestPeptideRetentionStream(unittest.TestCase):
+    OPTIONS = {"num_conformers": 1}
+
+    def test_results_are_tagged_with_their_index(self):
+        # "XZ" has no fast-table entry, so it falls through to the full path and finishes last.
+        peptides = ["PEPTIDEK", "XZ", "GG", "PEPTIDEK"]
+        results = list(
+            PeptideRetentionPredictor.predict_stream(
+                peptides, mode="fast", **self.OPTIONS
+            )
+        )
+        self.assertEqual([index for index, _ in results], [0, 2, 3, 1])
+        for index, result in results:
+            self.assertEqual(result["peptide"], peptides[index])
+        by_index = dict(results)
+        self.assertEqual(
+            by_index[0], PeptideRetentionPredictor.compute_fast_prediction("PEPTIDEK")
+        )
+        self.assertEqual(by_index[0], by_index[3])
+        self.assertIn("error", by_index[1])
+
+    def test_stop_event_stops_remaining_work(self):
+        stop_event = threading.Event()
+        stop_event.set()
+        results = PeptideRetentionPredictor.predict_stream(
+            ["GG", "AG", "GA"], stop_event=stop_event, **self.OPTIONS
+        )
+        self.assertEqual(list(results), [])
+
+    def test_stoppable_runs_use_small_chunks(self):
+        peptides = ["GG", "GA", "AG", "AA", "GS", "SG", "SA", "AS", "SS"]
+        pool = PeptideRetentionPredictor.get_pool()
+        with (
+            mock.patch.object(pool, "submit", wraps=pool.submit) as submit,
+            mock.patch.object(PeptideRetentionPredictor, "WORKERS", 1),
+        ):
+            results = list(
+                PeptideRetentionPredictor.predict_stream(
+                    peptides, stop_event=threading.Event(), **self.OPTIONS
+                )
+            )
+        self.assertEqual(
+            sorted(index for index, _ in results), list(range(len(peptides)))
+        )
+        chunks = [len(call.args[1]) for call in submit.call_args_list]
+        self.assertEqual(sum(chunks), len(peptides))
+        self.assertLessEqual(max(chunks), PeptideRetentionPredictor.STOP_CHUNK)
+
+    def test_route_stops_when_client_disconnects(self):
+        class Disconnected:
+            async def is_disconnected(self):
+                return True
+
+        async def collect():
+            body = MultiplePeptidesRequest(peptides=["GG", "GA", "AG"], **self.OPTIONS)
+            response = await routes.predict_stream(body, Disconnected())
+            return [line async for line in response.body_iterator]
+
+        with mock.patch.object(
+            PeptideRetentionPredictor,
+            "predict_stream",
+            wraps=PeptideRetentionPredictor.predict_stream,
+        ) as predict_stream:
+            lines = asyncio.run(collect())
+        self.assertTrue(predict_stream.call_args.kwargs["stop_event"].is_set())
+        self.assertFalse(any('"done"' in line for line in lines))
+
+    def test_calibration_must_match_mode(self):
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            mock.patch.object(RetentionCalibration, "BASE_DIR", Path(tmp)),
+        ):
+            coefficients = (1.0, 2.0, 0.0, 0.0)
+            RetentionCalibration.save("fast-fit", coefficients, {}, mode="fast")
+            ((_, result),) = PeptideRetentionPredictor.predict_stream(
+                ["PEPTIDEK"], mode="fast", calibration="fast-fit"
+            )
+            self.assertEqual(result["calibration"], "fast-fit")
+            self.assertAlmostEqual(
+                result["predicted_tr"], 1.0 + 2.0 * result["log_sum_aa"]
+            )
+
+            with mock.patch.object(
+                PeptideRetentionPredictor, "_compute_full"
+            ) as compute_full:
+                ((_, result),) = PeptideRetentionPredictor.predict_stream(
+                    ["PEPTIDEK"], calibration="fast-fit", **self.OPTIONS
+                )
+            compute_full.assert_not_called()
+            self.assertEqual(
+                result["error"],
+                "Calibration fast-fit was fitted in fast mode, not full",
+            )
+
+    def test_route_streams_ndjson(self):
+        client = TestClient(app)
+        peptides = ["PEPTIDEK", " ", "GG", "XZ"]
+        response = client.post(
+            "/pr/predict-stream",
+            json={"peptides": peptides, "mode": "fast", **self.OPTIONS},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response.headers["content-type"].startswith("application/x-ndjson")
+        )
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(lines[-1], {"done": True, "completed": 3, "total": 3})
+        progress = lines[:-1]
+        self.assertEqual([line["completed"] for line in progress], [1, 2, 3])
+        self.assertEqual(sorted(line["index"] for line in progress), [0, 1, 2])
+        for line in progress:
+            self.assertEqual(line["total"], 3)
+            self.assertEqual(
+                line["result"]["peptide"], ["PEPTIDEK", "GG", "XZ"][line["index"]]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
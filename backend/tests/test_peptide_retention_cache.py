@@ -0,0 +1,48 @@
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from backend.logic.peptide_retention_cache import PeptideRetentionCache
+
+
+RESULT = {
+    "peptide": "PEPTIDE",
+    "smiles": "CC",
+    "log_sum_aa": 1.2,
+    "log_vdw_vol": 2.9,
+    "clog_p": -3.1,
+    "predicted_tr": 9.5,
+}
+
+
+class TestPeptideRetentionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / "cache.sqlite3"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_through_disk(self):
+        PeptideRetentionCache("model-a", self.db_path).put("P-E-P-T-I-D-E", RESULT)
+        fresh = PeptideRetentionCache("model-a", self.db_path)
+        cached = fresh.get("P-E-P-T-I-D-E")
+        self.assertEqual(cached["predicted_tr"], 9.5)
+        self.assertNotIn("peptide", cached)
+        self.assertIsNone(fresh.get("G-G"))
+
+    def test_model_change_invalidates(self):
+        PeptideRetentionCache("model-a", self.db_path).put("P-E-P-T-I-D-E", RESULT)
+        self.assertIsNone(
+            PeptideRetentionCache("model-b", self.db_path).get("P-E-P-T-I-D-E")
+        )
+
+    def test_errors_are_not_cached(self):
+        cache = PeptideRetentionCache("model-a", self.db_path)
+        cache.put("X", {"peptide": "X", "error": "Invalid peptide sequence"})
+        self.assertIsNone(cache.get("X"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import tempfile
+import time
+import unittest
+
+import numpy as np
+from pathlib import Path
+
+from backend.logic.peptide_retention_calibration import RetentionCalibration
+
+
+class TestPeptideRetentionCalibration(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.features = np.column_stack(
+            [
+                rng.uniform(0.8, 2.2, 50000),
+                rng.uniform(2.3, 3.4, 50000),
+                rng.uniform(-6, 3, 50000),
+            ]
+        )
+        self.true = np.array([6.5, 15.2, -5.1, 0.31])
+        self.rt = RetentionCalibration.design_matrix(
+            self.features
+        ) @ self.true + rng.normal(0, 0.2, 50000)
+
+    def test_least_squares_recovers_coefficients(self):
+        start = time.monotonic()
+        coefficients, stats = RetentionCalibration.fit(self.features, self.rt)
+        self.assertLess(time.monotonic() - start, 2)
+        np.testing.assert_allclose(coefficients, self.true, atol=0.05)
+        self.assertAlmostEqual(stats["rmse"], 0.2, delta=0.01)
+
+    def test_robust_fit_ignores_outliers(self):
+        rt = self.rt.copy()
+        rt[:2500] += 25
+        plain, _ = RetentionCalibration.fit(self.features, rt)
+        robust, stats = RetentionCalibration.fit(self.features, rt, robust=True)
+        self.assertGreater(np.abs(plain - self.true).max(), 0.5)
+        np.testing.assert_allclose(robust, self.true, atol=0.1)
+        self.assertTrue(stats["robust"])
+
+    def test_too_few_points(self):
+        with self.assertRaises(ValueError):
+            RetentionCalibration.fit(self.features[:3], self.rt[:3])
+
+    def test_store_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            base_dir = RetentionCalibration.BASE_DIR
+            RetentionCalibration.BASE_DIR = Path(tmp)
+            try:
+                coefficients, stats = RetentionCalibration.fit(self.features, self.rt)
+                RetentionCalibration.save("c18-30min", coefficients, stats, mode="fast")
+                self.assertEqual(RetentionCalibration.load("c18-30min")["mode"], "fast")
+                self.assertEqual(
+                    [c["name"] for c in RetentionCalibration.list()], ["c18-30min"]
+                )
+                self.assertTrue(RetentionCalibration.delete("c18-30min"))
+                self.assertIsNone(RetentionCalibration.load("c18-30min"))
+                with self.assertRaises(ValueError):
+                    RetentionCalibration.load("../secrets")
+            finally:
+                RetentionCalibration.BASE_DIR = base_dir
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import math
+import unittest
+
+from backend.logic.peptide_fragments import PeptideFragments
+from backend.logic.peptide_retention_fast import FastRetentionFeatures
+
+
+class TestPeptideRetentionFast(unittest.TestCase):
+    def test_parse_biln(self):
+        self.assertEqual(
+            PeptideFragments.parse_biln("ac-P-E-K-am"), ("ac", ["P", "E", "K"], "am")
+        )
+        self.assertEqual(PeptideFragments.parse_biln("G-G"), ("", ["G", "G"], ""))
+        self.assertIsNone(PeptideFragments.parse_biln("A-X-K"))
+
+    def test_tables_match_direct_computation(self):
+        """Summed residue contributions should equal descriptors of the assembled molecule"""
+        for biln in ["ac-P-E-P-T-I-D-E-am", "W-Y-F-H-C-M", "G-P-P-G-am", "ac-K-R", "S"]:
+            n_cap, residues, c_cap = PeptideFragments.parse_biln(biln)
+            volume, clog_p = FastRetentionFeatures.molecule_features(
+                residues, n_cap, c_cap
+            )
+            log_vdw, fast_clog_p = FastRetentionFeatures.features(biln)
+            expected = (
+                FastRetentionFeatures.VOLUME_INTERCEPT
+                + FastRetentionFeatures.VOLUME_SLOPE * math.log10(volume)
+            )
+            self.assertAlmostEqual(log_vdw, expected, places=9)
+            self.assertAlmostEqual(fast_clog_p, clog_p, places=9)
+
+    def test_non_standard_residue_is_not_covered(self):
+        self.assertIsNone(FastRetentionFeatures.features("A-B-C"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from backend.logic.peptide_retention import PeptideRetentionPredictor
+from backend.logic.peptide_retention_index import RetentionIndex, main
+
+
+def record(i):
+    return {
+        "smiles": f"C{i}",
+        "log_sum_aa": i * 1.0,
+        "log_vdw_vol": i + 0.5,
+        "clog_p": -i * 1.0,
+        "predicted_tr": i * 2.0,
+    }
+
+
+class TestPeptideRetentionIndex(unittest.TestCase):
+    def test_tryptic_peptides(self):
+        peptides = RetentionIndex.tryptic_peptides(
+            "AAAAAAKPBBBBBBRCCCCCCK", missed_cleavages=1, min_length=6
+        )
+        self.assertEqual(
+            peptides, {"AAAAAAKPBBBBBBR", "CCCCCCK", "AAAAAAKPBBBBBBRCCCCCCK"}
+        )
+        self.assertEqual(
+            RetentionIndex.tryptic_peptides(
+                "AAAAAAKPBBBBBBRCCCCCCK", missed_cleavages=0, min_length=6
+            ),
+            {"AAAAAAKPBBBBBBR", "CCCCCCK"},
+        )
+
+    def test_write_and_lookup(self):
+        peptides = ["PEPTIDEK", "AAAAK", "LLLLLR", "GGGGR", "WWK"]
+        records = {peptide: record(i) for i, peptide in enumerate(peptides)}
+        with tempfile.TemporaryDirectory() as tmp:
+            RetentionIndex.write(tmp, records, {"model_hash": "m"})
+            index = RetentionIndex(tmp)
+            self.assertEqual(len(index), 5)
+            for i, peptide in enumerate(peptides):
+                self.assertEqual(index.lookup(peptide), record(i))
+            self.assertIsNone(index.lookup("PEPTIDE"))
+            self.assertIsNone(index.lookup("ZZZZ"))
+            self.assertIsNone(index.lookup(""))
+
+    def test_get_reloads_a_rebuilt_index(self):
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            mock.patch.object(RetentionIndex, "INDEX_DIR", Path(tmp)),
+            mock.patch.object(RetentionIndex, "_loaded", None),
+        ):
+            self.assertIsNone(RetentionIndex.get("m"))
+            RetentionIndex.write(tmp, {"PEPTIDEK": record(1)}, {"model_hash": "m"})
+            self.assertEqual(RetentionIndex.get("m").lookup("PEPTIDEK"), record(1))
+            self.assertIs(RetentionIndex.get("m"), RetentionIndex.get("m"))
+
+            RetentionIndex.write(
+                tmp, {"PEPTIDEK": record(2), "WWK": record(3)}, {"model_hash": "m"}
+            )
+            index = RetentionIndex.get("m")
+            self.assertEqual(len(index), 2)
+            self.assertEqual(index.lookup("PEPTIDEK"), record(2))
+            self.assertIsNone(RetentionIndex.get("other"))
+
+    def test_rebuild_keeps_mapped_index_valid(self):
+        peptides = [f"PEPTIDE{i:06d}K" for i in range(200000)]
+        with tempfile.TemporaryDirectory() as tmp:
+            old_version = RetentionIndex.write(
+                tmp,
+                {p: record(i % 97) for i, p in enumerate(peptides)},
+                {"model_hash": "m"},
+            )
+            mapped = RetentionIndex(tmp)
+            self.assertEqual(
+                mapped.lookup(peptides[-1]), record((len(peptides) - 1) % 97)
+            )
+
+            # A smaller rebuild into the same directory must not touch the mapped files.
+            RetentionIndex.write(tmp, {"WWK": record(1)}, {"model_hash": "m"})
+            self.assertFalse(old_version.exists())
+            self.assertEqual(len(mapped), len(peptides))
+            for i in (0, 12345, len(peptides) - 1):
+                self.assertEqual(mapped.lookup(peptides[i]), record(i % 97))
+            rebuilt = RetentionIndex(tmp)
+            self.assertEqual(len(rebuilt), 1)
+            self.assertIsNone(rebuilt.lookup(peptides[0]))
+            del mapped, rebuilt
+
+    def test_failed_load_is_retried(self):
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            mock.patch.object(RetentionIndex, "INDEX_DIR", Path(tmp)),
+            mock.patch.object(RetentionIndex, "_loaded", None),
+        ):
+            version = RetentionIndex.write(
+                tmp, {"PEPTIDEK": record(1)}, {"model_hash": "m"}
+            )
+            (version / "features.npy").rename(version / "features.tmp")
+            with self.assertLogs("backend.logic.peptide_retention_index", "ERROR"):
+                self.assertIsNone(RetentionIndex.get("m"))
+            (version / "features.tmp").rename(version / "features.npy")
+            self.assertEqual(RetentionIndex.get("m").lookup("PEPTIDEK"), record(1))
+
+    def test_cli_does_not_fill_the_prediction_cache(self):
+        def compute_full(peptides, *args, **kwargs):
+            return ((i, record(i)) for i in range(len(peptides)))
+
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            mock.patch.object(
+                PeptideRetentionPredictor, "_compute_full", side_effect=compute_full
+            ),
+            mock.patch.object(PeptideRetentionPredictor, "get_cache") as get_cache,
+        ):
+            fasta = os.path.join(tmp, "proteome.fasta")
+            with open(fasta, "w") as f:
+                f.write(">P1\nAAAAAAKPBBBBBBRCCCCCCK\n")
+            self.assertEqual(
+                main(
+                    [
+                        fasta,
+                        "--out",
+                        os.path.join(tmp, "index"),
+                        "--missed-cleavages",
+                        "0",
+                    ]
+                ),
+                0,
+            )
+            get_cache.assert_not_called()
+            index = RetentionIndex(os.path.join(tmp, "index"))
+            self.assertEqual(len(index), 2)
+            self.assertEqual(index.meta["failed"], 0)
+            self.assertIsNotNone(index.lookup("CCCCCCK"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import io
+import unittest
+
+import numpy as np
+from PIL import Image
+from fastapi.testclient import TestClient
+
+from backend.logic.protein_graph_rendering import ProteinGraphRenderer
+from backend.server import app
+
+
+def decode(png):
+    return np.asarray(Image.open(io.BytesIO(png)).convert("RGBA"))
+
+
+class TestProteinGraphRenderer(unittest.TestCase):
+    def test_empty_graph(self):
+        pixels = decode(ProteinGraphRenderer.render([], size=(140, 240)))
+        self.assertEqual(pixels.shape, (240, 140, 4))
+        # Outside the funnel is transparent, the bottom center is black.
+        self.assertEqual(pixels[0, 0, 3], 0)
+        self.assertEqual(tuple(pixels[235, 70]), (0, 0, 0, 255))
+        # "EMPTY" is drawn in white.
+        self.assertTrue((pixels[..., :3].min(axis=-1) > 200).any())
+
+    def test_bands_follow_names(self):
+        names = ["first", "second", "third"]
+        pixels = decode(ProteinGraphRenderer.render(names, seed=4, size=(140, 240)))
+        colors = ProteinGraphRenderer.band_colors(3, seed=4)
+        # Band 0 at the bottom, band 2 at the top; sampled at the funnel edge, away from labels.
+        self.assertEqual(tuple(pixels[200, 40]), tuple(colors[0]))
+        self.assertEqual(tuple(pixels[40, 50]), tuple(colors[2]))
+        self.assertEqual(
+            ProteinGraphRenderer.render(names, seed=4),
+            ProteinGraphRenderer.render(names, seed=4),
+        )
+
+    def test_font_is_found_by_name(self):
+        # Resolved through the font search path, with PIL's default font as the fallback.
+        self.assertIsNotNone(ProteinGraphRenderer.font(12).getbbox("A"))
+
+    def test_graph_routes(self):
+        client = TestClient(app)
+        fasta = (
+            ">sp|P1|ONE first protein\nMAKPLR\n>sp|P2|TWO second protein\nPEPTIDEK\n"
+        )
+        response = client.post(
+            "/proteolytic_digestion/parse_fasta", files={"file": ("test.fasta", fasta)}
+        )
+        self.assertEqual(
+            [p["name"] for p in response.json()], ["first protein", "second protein"]
+        )
+        graph_id = response.headers["X-Graph-Id"]
+        self.assertEqual(
+            graph_id, ProteinGraphRenderer.register(["first protein", "second protein"])
+        )
+
+        image = client.get(f"/proteolytic_digestion/graph/{graph_id}")
+        self.assertEqual(image.headers["content-type"], "image/png")
+        self.assertIn("immutable", image.headers["cache-control"])
+        self.assertEqual(
+            image.content,
+            ProteinGraphRenderer.render(["first protein", "second protein"], seed=0),
+        )
+
+        cached = client.get(
+            f"/proteolytic_digestion/graph/{graph_id}",
+            headers={"If-None-Match": image.headers["etag"]},
+        )
+        self.assertEqual(cached.status_code, 304)
+
+        # An evicted image is rendered again from its registered spec.
+        ProteinGraphRenderer.IMAGES.clear()
+        self.assertEqual(
+            client.get(f"/proteolytic_digestion/graph/{graph_id}").content,
+            image.content,
+        )
+
+        created = client.post(
+            "/proteolytic_digestion/graph", json={"names": ["a"], "seed": 3}
+        ).json()
+        self.assertEqual(
+            client.get(created["url"]).content,
+            ProteinGraphRenderer.render(["a"], seed=3),
+        )
+        self.assertEqual(
+            client.get("/proteolytic_digestion/graph/unknown").status_code, 404
+        )
+        # A matching ETag must not turn an unknown graph into a 304.
+        self.assertEqual(
+            client.get(
+                "/proteolytic_digestion/graph/unknown",
+                headers={"If-None-Match": '"unknown"'},
+            ).status_code,
+            404,
+        )
+        self.assertEqual(
+            client.get("/proteolytic_digestion/resetProteinGraph").content,
+            ProteinGraphRenderer.render([]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
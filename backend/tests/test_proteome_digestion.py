@@ -0,0 +1,107 @@
+import asyncio
+import json
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest import mock
+from fastapi.testclient import TestClient
+
+from backend.logic.proteome_store import ProteomeStore
+from backend.server import app
+
+
+FASTA = """>sp|P1|ONE_HUMAN First protein
+MAKPLR
+GGKR
+>sp|P2|TWO_HUMAN Second protein
+PEPTIDEK*
+"""
+
+
+class TestProteomeDigestion(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base_dir = ProteomeStore.BASE_DIR
+        ProteomeStore.BASE_DIR = Path(self.tmp.name)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        ProteomeStore.BASE_DIR = self.base_dir
+        self.tmp.cleanup()
+
+    def stream(self, **body):
+        response = self.client.post("/proteolytic_digestion/digest-proteome", json=body)
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in response.text.splitlines()]
+
+    def test_parse_fasta(self):
+        proteome = ProteomeStore.parse_fasta(FASTA.replace("\n", "\r\n"))
+        self.assertEqual(proteome.accessions, ["sp|P1|ONE_HUMAN", "sp|P2|TWO_HUMAN"])
+        self.assertEqual(proteome.sequences, ["MAKPLRGGKR", "PEPTIDEK"])
+
+    def test_stream_fasta(self):
+        lines = self.stream(fasta=FASTA, min_length=3, charges=[1, 2])
+        self.assertEqual(lines[0], {"proteins": 2, "peptides": 3, "charges": [1, 2]})
+        self.assertEqual(lines[-1], {"done": True, "count": 3})
+        peptides = lines[1:-1]
+        self.assertEqual(
+            [(p["protein"], p["position"], p["sequence"]) for p in peptides],
+            [
+                ("sp|P1|ONE_HUMAN", 1, "MAKPLR"),
+                ("sp|P1|ONE_HUMAN", 7, "GGK"),
+                ("sp|P2|TWO_HUMAN", 1, "PEPTIDEK"),
+            ],
+        )
+        mass = peptides[1]["mass"]
+        self.assertAlmostEqual(mass, 2 * 57.021464 + 128.094963 + 18.010565, places=4)
+        self.assertAlmostEqual(
+            peptides[1]["mz"]["2"], (mass + 2 * 1.007276) / 2, places=4
+        )
+
+    def test_stored_proteome(self):
+        put = self.client.put(
+            "/proteolytic_digestion/proteomes/test",
+            files={"file": ("test.fasta", FASTA)},
+        )
+        self.assertEqual(put.json(), {"name": "test", "proteins": 2, "residues": 18})
+        self.assertEqual(
+            self.client.get("/proteolytic_digestion/proteomes").json(), [put.json()]
+        )
+
+        lines = self.stream(proteome="test", enzymes=["lys-c"])
+        self.assertEqual(
+            [p["sequence"] for p in lines[1:-1]], ["MAK", "PLRGGK", "R", "PEPTIDEK"]
+        )
+
+        self.assertEqual(
+            self.client.delete("/proteolytic_digestion/proteomes/test").status_code, 200
+        )
+        response = self.client.post(
+            "/proteolytic_digestion/digest-proteome", json={"proteome": "test"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_parses_off_the_event_loop(self):
+        loops = []
+
+        def parse_fasta(content):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return parse(content)
+
+        parse = ProteomeStore.parse_fasta
+        with mock.patch.object(ProteomeStore, "parse_fasta", side_effect=parse_fasta):
+            lines = self.stream(fasta=FASTA, min_length=3)
+        self.assertEqual(lines[-1], {"done": True, "count": 3})
+        self.assertEqual(loops, [None])
+
+    def test_requires_one_source(self):
+        response = self.client.post("/proteolytic_digestion/digest-proteome", json={})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import random
+import unittest
+
+from fastapi.testclient import TestClient
+
+from backend.logic.proteome_store import Proteome
+from backend.logic.proteome_suffix_array import ProteomeSuffixArray
+from backend.server import app
+
+
+class TestProteomeSuffixArray(unittest.TestCase):
+    def setUp(self):
+        random.seed(21)
+        self.sequences = [
+            "".join(random.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(200))
+            for _ in range(30)
+        ]
+        # A repeat within a protein and an isoform with one substitution.
+        self.sequences.append(self.sequences[0][10:40] * 2)
+        self.sequences.append(self.sequences[1][:100] + "W" + self.sequences[1][101:])
+        self.accessions = [f"P{i}" for i in range(len(self.sequences))]
+        self.index = ProteomeSuffixArray(
+            Proteome(self.accessions, [""] * len(self.sequences), self.sequences)
+        )
+
+    def brute_force(self, peptide, mismatches=0):
+        hits = []
+        for p, sequence in enumerate(self.sequences):
+            for i in range(len(sequence) - len(peptide) + 1):
+                if (
+                    sum(a != b for a, b in zip(sequence[i : i + len(peptide)], peptide))
+                    <= mismatches
+                ):
+                    hits.append((self.accessions[p], i + 1))
+        return hits
+
+    def test_array_is_sorted(self):
+        text, array = self.index.text, self.index.array.tolist()
+        self.assertEqual(sorted(array), list(range(len(text))))
+        self.assertTrue(all(text[a:] < text[b:] for a, b in zip(array, array[1:])))
+
+    def test_exact_search(self):
+        peptides = [
+            self.sequences[0][15:25],
+            self.sequences[5][:7],
+            self.sequences[7][-9:],
+            "WWWWWW",
+            self.sequences[2][-3:] + self.sequences[3][:3],
+        ]
+        for peptide, result in zip(peptides, self.index.search(peptides)):
+            expected = self.brute_force(peptide)
+            self.assertEqual(result["count"], len(expected))
+            self.assertEqual(
+                [(m["protein"], m["position"]) for m in result["matches"]], expected
+            )
+
+    def test_one_mismatch_search(self):
+        peptide = self.sequences[1][95:106]
+        result = self.index.search([peptide], mismatches=1)[0]
+        expected = self.brute_force(peptide, mismatches=1)
+        self.assertEqual(
+            [(m["protein"], m["position"]) for m in result["matches"]], expected
+        )
+        isoform = next(m for m in result["matches"] if m["protein"] == "P31")
+        self.assertEqual(isoform["mismatch"], {"position": 6, "residue": "W"})
+
+        with self.assertRaises(ValueError):
+            self.index.search(["K"], mismatches=1)
+
+    def test_mismatch_hits_stay_inside_proteins(self):
+        # Each query only matches across the separator, which must not count as the substitution.
+        index = ProteomeSuffixArray(Proteome(["A", "B"], ["", ""], ["MAGIC", "KPEPT"]))
+        for result in index.search(["MAGICX", "PEPTW"], mismatches=1):
+            self.assertEqual(result["count"], 0)
+            self.assertEqual(result["matches"], [])
+        self.assertEqual(
+            [
+                (m["protein"], m["position"])
+                for m in index.search(["PEPW"], mismatches=1)[0]["matches"]
+            ],
+            [("B", 2)],
+        )
+
+    def test_routes(self):
+        client = TestClient(app)
+        fasta = "".join(f">{a}\n{s}\n" for a, s in zip(self.accessions, self.sequences))
+        built = client.post(
+            "/proteolytic_digestion/suffix-array", json={"fasta": fasta}
+        ).json()
+        self.assertEqual(built["proteins"], len(self.sequences))
+        self.assertEqual(
+            built["index_id"],
+            client.post(
+                "/proteolytic_digestion/suffix-array", json={"fasta": fasta}
+            ).json()["index_id"],
+        )
+
+        peptide = self.sequences[0][12:20]
+        url = f"/proteolytic_digestion/suffix-array/{built['index_id']}/search"
+        result = client.post(url, json={"peptides": [peptide], "limit": 1}).json()[0]
+        self.assertEqual(result["count"], len(self.brute_force(peptide)))
+        self.assertEqual(len(result["matches"]), 1)
+
+        self.assertEqual(
+            client.post(url, json={"peptides": ["K"], "mismatches": 1}).status_code, 400
+        )
+        self.assertEqual(
+            client.post(
+                "/proteolytic_digestion/suffix-array/missing/search",
+                json={"peptides": ["K"]},
+            ).status_code,
+            404,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
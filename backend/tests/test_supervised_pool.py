@@ -0,0 +1,103 @@
+import threading
+import time
+import unittest
+
+from backend.utility.supervised_pool import SupervisedPool
+
+
+def _square(x):
+    return x * x
+
+
+def _sleep_then_return(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _fail(x):
+    raise ValueError(f"bad item {x}")
+
+
+class TestSupervisedPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = SupervisedPool(2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_results_in_order(self):
+        self.assertEqual(
+            self.pool.run(_square, [3, 1, 2]), [("ok", 9), ("ok", 1), ("ok", 4)]
+        )
+
+    def test_errors_are_reported(self):
+        self.assertEqual(self.pool.run(_fail, [7]), [("error", "bad item 7")])
+
+    def test_overrunning_task_is_killed(self):
+        start = time.monotonic()
+        results = self.pool.run(_sleep_then_return, [30, 0.01, 0.01, 30], timeout=0.5)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(
+            results, [("timeout", None), ("ok", 0.01), ("ok", 0.01), ("timeout", None)]
+        )
+        # Killed workers are replaced.
+        self.assertEqual(self.pool.run(_square, [4]), [("ok", 16)])
+
+    def test_paused_run_does_not_block_others(self):
+        # A consumer that stops reading mid-run must not hold up other runs while workers are free.
+        pool = SupervisedPool(2, max_workers=4)
+        self.addCleanup(pool.shutdown)
+        paused = pool.run_iter(_square, [1, 2, 3])
+        first = next(paused)
+        results = []
+        other = threading.Thread(
+            target=lambda: results.extend(pool.run(_square, [5, 6])), daemon=True
+        )
+        other.start()
+        other.join(timeout=10)
+        self.assertFalse(other.is_alive())
+        self.assertEqual(results, [("ok", 25), ("ok", 36)])
+        rest = list(paused)
+        self.assertEqual(sorted(value for _, _, value in [first] + rest), [1, 4, 9])
+
+    def test_live_workers_are_capped(self):
+        # Both workers are checked out by the paused run, so the other run waits for them.
+        paused = self.pool.run_iter(_square, [1, 2, 3])
+        next(paused)
+        results = []
+        other = threading.Thread(
+            target=lambda: results.extend(self.pool.run(_square, [5])), daemon=True
+        )
+        other.start()
+        other.join(timeout=1)
+        self.assertTrue(other.is_alive())
+        self.assertEqual(self.pool._live, 2)
+
+        list(paused)
+        other.join(timeout=10)
+        self.assertFalse(other.is_alive())
+        self.assertEqual(results, [("ok", 25)])
+        self.assertLessEqual(self.pool._live, 2)
+
+    def test_waiting_run_stops_on_stop_event(self):
+        paused = self.pool.run_iter(_square, [1, 2])
+        next(paused)
+        stop_event = threading.Event()
+        stop_event.set()
+        self.assertEqual(
+            list(self.pool.run_iter(_square, [5], stop_event=stop_event)), []
+        )
+        paused.close()
+        # The paused run's abandoned task was killed with its worker.
+        self.assertEqual(self.pool._live, len(self.pool._idle))
+
+    def test_idle_workers_are_reused(self):
+        self.pool.run(_square, [1, 2, 3])
+        workers = list(self.pool._idle)
+        self.assertEqual(len(workers), 2)
+        self.pool.run(_square, [4])
+        self.assertEqual({id(w) for w in self.pool._idle}, {id(w) for w in workers})
+
+
+if __name__ == "__main__":
+    unittest.main()
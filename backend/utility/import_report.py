@@ -0,0 +1,83 @@
+"""
+Import-time report: which modules make importing the server (or any module) slow.
+
+Runs the import in a fresh interpreter with `python -X importtime` and ranks the result.
+    python -m backend.utility.import_report                      # backend.server, top 25
+    python -m backend.utility.import_report backend.api.peptide_retention_routes --top 10
+"""
+
+import re
+import sys
+import argparse
+import subprocess
+
+from typing import Dict, List
+
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(module: str) -> List[Dict]:
+    """
+    One entry per imported module: name, self and cumulative time (microseconds), nesting depth.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append(
+                {
+                    "module": name,
+                    "self_us": int(self_us),
+                    "cumulative_us": int(cumulative_us),
+                    "depth": (len(indent) - 1) // 2,
+                }
+            )
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"import {module} failed:\n{completed.stderr.splitlines()[-1] if completed.stderr else ''}"
+        )
+    return entries
+
+
+def top_level_packages(entries: List[Dict]) -> Dict[str, int]:
+    """
+    Self time summed per top-level package (rdkit, matplotlib, ...), in microseconds.
+    """
+    totals: Dict[str, int] = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        totals[package] = totals.get(package, 0) + entry["self_us"]
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rank modules by import time.")
+    parser.add_argument("module", nargs="?", default="backend.server")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    entries = measure(args.module)
+    total = max((entry["cumulative_us"] for entry in entries), default=0)
+    print(f"import {args.module}: {total / 1000:.1f} ms, {len(entries)} modules\n")
+
+    print(f"{'package':<32}{'self ms':>10}")
+    for package, self_us in list(top_level_packages(entries).items())[: args.top]:
+        print(f"{package:<32}{self_us / 1000:>10.1f}")
+
+    print(f"\n{'module':<56}{'self ms':>10}{'cumul. ms':>12}")
+    for entry in sorted(entries, key=lambda e: -e["cumulative_us"])[: args.top]:
+        print(
+            f"{'  ' * entry['depth'] + entry['module']:<56}{entry['self_us'] / 1000:>10.1f}{entry['cumulative_us'] / 1000:>12.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import sys
+import types
+import importlib
+import threading
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Heavy scientific dependencies (RDKit, pyPept, matplotlib, PyMuPDF, PIL, cryptography) are
+    bound through this at module level, so importing a router (and starting a server worker)
+    does not pay for them until a request actually uses them.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with LazyModule._lock:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    The module itself if it is already imported, otherwise a LazyModule for it.
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
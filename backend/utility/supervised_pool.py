@@ -0,0 +1,227 @@
+import time
+import threading
+import multiprocessing
+
+from multiprocessing.connection import wait
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+
+def _worker_loop(conn, initializer):
+    if initializer is not None:
+        initializer()
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        fn, item = task
+        try:
+            conn.send(("ok", fn(item)))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class SupervisedPool:
+    """
+    Worker processes that each run one task at a time, so a task that runs past its
+    deadline can be cancelled by killing its worker (a replacement is started in its place).
+
+    run() returns one (status, value) pair per item, in order: ('ok', result),
+    ('error', message) if the task raised or its worker died, or ('timeout', None).
+    Each run checks out up to `size` workers of its own, so a run whose results are consumed
+    slowly never holds up the others while workers are free. At most `max_workers` worker
+    processes are alive at once across all runs: a run that finds none free waits until one
+    is checked in. Up to `size` idle workers are kept warm between runs.
+    """
+
+    STOP_POLL = 0.5  # seconds between stop_event checks while tasks run
+    # Pools are started from a threaded server, where a forked child could inherit a lock
+    # another thread holds; workers start from a clean interpreter instead.
+    START_METHOD = (
+        "forkserver"
+        if "forkserver" in multiprocessing.get_all_start_methods()
+        else "spawn"
+    )
+
+    def __init__(
+        self,
+        workers: int,
+        initializer: Optional[Callable[[], None]] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.size = max(1, workers)
+        self.max_workers = max(self.size, max_workers or self.size)
+        self.initializer = initializer
+        self._context = multiprocessing.get_context(SupervisedPool.START_METHOD)
+        self._idle: List[Tuple[Any, Any]] = []
+        self._live = 0  # idle and checked-out workers
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_loop, args=(child_conn, self.initializer), daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    @staticmethod
+    def _kill(worker) -> None:
+        process, conn = worker
+        process.kill()
+        process.join()
+        conn.close()
+
+    def run(
+        self,
+        fn: Callable[[Any], Any],
+        items: Sequence[Any],
+        timeout: Optional[float] = None,
+    ) -> List[Tuple[str, Any]]:
+        """
+        Applies fn to every item; each task gets at most `timeout` seconds of wall-clock time.
+        fn and the items must be picklable.
+        """
+        results: List[Tuple[str, Any]] = [None] * len(items)
+        for index, status, value in self.run_iter(fn, items, timeout):
+            results[index] = (status, value)
+        return results
+
+    def run_iter(
+        self,
+        fn: Callable[[Any], Any],
+        items: Sequence[Any],
+        timeout: Optional[float] = None,
+        stop_event: Optional[threading.Event] = None,
+    ) -> Iterator[Tuple[int, str, Any]]:
+        """
+        Like run(), but yields (index, status, value) as each task finishes.
+        Setting stop_event (or closing the generator) kills the tasks still running.
+        """
+        pending = list(range(len(items) - 1, -1, -1))
+        if not pending:
+            return
+        workers = self._checkout(min(self.size, len(items)), stop_event)
+        if not workers:
+            return
+        idle = list(range(len(workers)))
+        busy = {}  # worker slot -> (item index, deadline)
+
+        def replace(slot):
+            SupervisedPool._kill(workers[slot])
+            workers[slot] = self._spawn()
+
+        try:
+            while pending or busy:
+                if stop_event is not None and stop_event.is_set():
+                    return
+
+                while pending and idle:
+                    slot = idle.pop()
+                    index = pending.pop()
+                    workers[slot][1].send((fn, items[index]))
+                    busy[slot] = (
+                        index,
+                        None if timeout is None else time.monotonic() + timeout,
+                    )
+
+                deadlines = [
+                    deadline for _, deadline in busy.values() if deadline is not None
+                ]
+                wait_for = (
+                    None
+                    if not deadlines
+                    else max(0.0, min(deadlines) - time.monotonic())
+                )
+                if stop_event is not None:
+                    wait_for = (
+                        SupervisedPool.STOP_POLL
+                        if wait_for is None
+                        else min(wait_for, SupervisedPool.STOP_POLL)
+                    )
+                ready = wait([workers[slot][1] for slot in busy], timeout=wait_for)
+
+                for slot in list(busy):
+                    index, deadline = busy[slot]
+                    conn = workers[slot][1]
+                    if conn in ready:
+                        try:
+                            status, value = conn.recv()
+                        except (EOFError, OSError):
+                            status, value = (
+                                "error",
+                                "Worker process exited unexpectedly",
+                            )
+                            replace(slot)
+                    elif deadline is not None and time.monotonic() >= deadline:
+                        status, value = "timeout", None
+                        replace(slot)
+                    else:
+                        continue
+                    del busy[slot]
+                    idle.append(slot)
+                    yield index, status, value
+        finally:
+            # Workers with abandoned tasks are killed; the others go back to the idle list.
+            for slot in busy:
+                SupervisedPool._kill(workers[slot])
+            self._checkin(
+                [worker for slot, worker in enumerate(workers) if slot not in busy],
+                len(busy),
+            )
+
+    def _checkout(
+        self, count: int, stop_event: Optional[threading.Event] = None
+    ) -> List[Tuple[Any, Any]]:
+        """
+        Between 1 and count workers: idle ones first, then new ones while under max_workers.
+        Waits while every worker is busy; empty if stop_event is set meanwhile.
+        """
+        with self._released:
+            while True:
+                workers = self._idle[-count:]
+                del self._idle[len(self._idle) - len(workers) :]
+                new = min(count - len(workers), self.max_workers - self._live)
+                if workers or new > 0:
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    return []
+                self._released.wait(timeout=SupervisedPool.STOP_POLL)
+            self._live += new
+        # Spawning happens outside the lock, so it never delays other runs.
+        spawned = []
+        try:
+            for _ in range(new):
+                spawned.append(self._spawn())
+        finally:
+            if len(spawned) < new:
+                self._checkin(workers + spawned, new - len(spawned))
+        return workers + spawned
+
+    def _checkin(self, workers: List[Tuple[Any, Any]], killed: int = 0) -> None:
+        """
+        Returns a run's surviving workers; `killed` more of its workers are already gone.
+        """
+        with self._released:
+            keep = max(0, self.size - len(self._idle))
+            self._idle.extend(workers[:keep])
+            self._live -= killed + len(workers[keep:])
+            self._released.notify_all()
+        for worker in workers[keep:]:
+            SupervisedPool._kill(worker)
+
+    def shutdown(self) -> None:
+        with self._released:
+            workers, self._idle = self._idle, []
+            self._live -= len(workers)
+            self._released.notify_all()
+        for process, conn in workers:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            process.join(timeout=1)
+            if process.is_alive():
+                process.kill()
+            conn.close()